@@ -0,0 +1,11 @@
+-- CreateIndex
+CREATE INDEX `Player_bng_username_idx` ON `Player`(`bng_username`);
+
+-- CreateIndex
+CREATE INDEX `Activity_type_idx` ON `Activity`(`type`);
+
+-- CreateIndex
+CREATE INDEX `Activity_Stats_character_id_instance_id_weapon_id_idx` ON `Activity_Stats`(`character_id`, `instance_id`, `weapon_id`);
+
+-- CreateIndex
+CREATE INDEX `Activity_Stats_character_id_activity_name_idx` ON `Activity_Stats`(`character_id`, `activity_name`, `instance_id`, `weapon_id`);
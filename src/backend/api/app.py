@@ -1,14 +1,17 @@
+import asyncio
 import uvicorn
 import psutil
 import os
-from fastapi import FastAPI, Response, status
-from time import sleep
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from backend.data.bng_data import ActivityStatsData
-from backend.data.bng_types import ACTIVITY_TYPE
+from backend.data.bng_data import ActivityStatsData, DataFactory
 from backend.load.connector import SQLConnector
 from backend.load.managers import (
+    BNG_CONN,
     DatabasePlayerManager,
     DatabaseCharacterManager,
     DatabaseWeaponManager,
@@ -19,19 +22,35 @@ from backend.load.managers import (
     DatabaseManager
 )
 from backend.load.executor import DatabaseExecutor
+from backend.workers import BoundedExecutor
 
 host = os.environ.get("DB_HOST", "d2-stats")
 port = int(os.environ.get("DB_PORT", 3306))
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
 unix_socket = f"/cloudsql/{os.environ.get('CLOUDSQL_CONNECTION_NAME', '/destiny2-sandbox-tracker-api:us-central1:d2-sandbox-cloudsql')}"
 db_conn = SQLConnector(
     "signature", 
     port,
     host=host,
-    unix=unix_socket
+    unix=unix_socket,
+    pool_size=DB_POOL_SIZE,
+    checkout_timeout=float(os.environ.get("DB_POOL_TIMEOUT", 10))
 )
 db_exec = DatabaseExecutor(db_conn)
 
-activities = [type.value for type in ACTIVITY_TYPE]
+HISTORY_COUNT = 250  # most recent activities fetched per character, Bungie's maximum page size
+HISTORY_PER_MODE = 5  # instances kept per ACTIVITY_TYPE bucket
+STATS_PAGE_SIZE = 500  # activity stats rows per page when no limit is asked for, and the most a page can hold
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", 2))  # ingests hold at most this many connections, the rest of the pool stays free for reads
+
+# blocking database, Bungie and manifest work runs on these instead of the event loop, reads and writes on separate
+# workers so a slow ingest cannot hold up lookups
+read_pool = BoundedExecutor(
+    "read",
+    int(os.environ.get("READ_WORKERS", max(DB_POOL_SIZE - INGEST_WORKERS, 1))),
+    int(os.environ.get("READ_QUEUE", 64))
+)
+ingest_pool = BoundedExecutor("ingest", INGEST_WORKERS, int(os.environ.get("INGEST_QUEUE", 8)))
 
 player_manager = DatabasePlayerManager(db_exec)
 weapon_manager = DatabaseWeaponManager(db_exec)
@@ -90,15 +109,30 @@ activity_stats_cols = [
     "character_class"
 ]
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # let running ingests finish on their threads without stalling the loop
+    await asyncio.gather(asyncio.to_thread(ingest_pool.shutdown), asyncio.to_thread(read_pool.shutdown))
+    await DataFactory.async_bng_conn.close()
+    BNG_CONN.close()
+    db_conn.close()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "https://d2-stats-signature.pages.dev"],
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"]
 )
 
+@app.exception_handler(TimeoutError)
+async def busy_handler(request: Request, exc: TimeoutError):
+    # a saturated worker pool or no free database connection
+    return JSONResponse({"Error": str(exc)}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
 def convert_to_dict(cols: list, result):
     if len(cols) == len(result):
         resp: dict = {}
@@ -111,10 +145,12 @@ def convert_to_dict(cols: list, result):
     
 def get_character_ids(destiny_id: int, bng_char_id: int=0):
     if bng_char_id:
-        query = f"SELECT character_id FROM `Character` WHERE player_id = {destiny_id} AND bng_character_id = {bng_char_id}"
+        query = "SELECT character_id FROM `Character` WHERE player_id = %s AND bng_character_id = %s"
+        params = (destiny_id, bng_char_id)
     else:
-        query = f"SELECT character_id FROM `Character` WHERE player_id = {destiny_id}"
-    result = db_conn.execute(query)
+        query = "SELECT character_id FROM `Character` WHERE player_id = %s"
+        params = (destiny_id,)
+    result = db_conn.execute(query, params, prepared=True)
     if result:
         for i in range(len(result)):
             result[i] = result[i][0]
@@ -124,8 +160,8 @@ def get_character_ids(destiny_id: int, bng_char_id: int=0):
         return None
 
 def get_activity_ids_by_mode(mode: str):
-    query = f"SELECT activity_id FROM `Activity` WHERE type = '{mode}'"
-    result = db_conn.execute(query)
+    query = "SELECT activity_id FROM `Activity` WHERE type = %s"
+    result = db_conn.execute(query, (mode,), prepared=True)
     if result and not isinstance(result, bool):
         for i in range(len(result)):
             result[i] = result[i][0]
@@ -134,24 +170,87 @@ def get_activity_ids_by_mode(mode: str):
     else:
         return None
 
-def get_mult_activity_stats(char_id, act_id=0, act_name: str=""):
-    mult_resp = []
-    if act_id:
-        query = f"SELECT * FROM `Activity_Stats` WHERE character_id = {char_id} AND activity_id = {act_id}"
-    elif act_name:
-        query = f"SELECT * FROM `Activity_Stats` WHERE character_id = {char_id} AND activity_name = '{act_name}'"
-    else:
-        query = f"SELECT * FROM `Activity_Stats` WHERE character_id = {char_id}"
-    
-    print(query)
-    result = db_conn.execute(query)
-    if result:
-        for item in result:
-            single_resp = convert_to_dict(activity_stats_cols, item)
-            if single_resp:
-                mult_resp.append(single_resp)
+def activity_stats_query(character_ids: list[int], mode: str="", act_name: str="", count: int=0, after: Optional[tuple[int, int]]=None) -> tuple[str, tuple]:
+    """
+    One query for the activity stats of character_ids, narrowed to an activity mode or name. Rows come in
+    (instance_id, weapon_id) order starting past the after cursor, and count becomes the LIMIT. Each character is read
+    on its own through its (character_id, ...) index in that order, and several characters are merged with UNION ALL,
+    so a page reads at most count index entries per character
+    """
+    selects = []
+    params: list = []
+    for character_id in character_ids:
+        select = "SELECT " + ", ".join(f"s.{col}" for col in activity_stats_cols) + " FROM `Activity_Stats` s"
+        conditions = ["s.character_id = %s"]
+        params.append(character_id)
+
+        if mode:
+            select += " JOIN `Activity` a ON a.activity_id = s.activity_id"
+            conditions.append("a.type = %s")
+            params.append(mode)
+        elif act_name:
+            conditions.append("s.activity_name = %s")
+            params.append(act_name)
+
+        if after:
+            conditions.append("(s.instance_id > %s OR (s.instance_id = %s AND s.weapon_id > %s))")
+            params.extend((after[0], after[0], after[1]))
+
+        select += " WHERE " + " AND ".join(conditions) + " ORDER BY s.instance_id, s.weapon_id"
+        if count > 0:
+            select += " LIMIT %s"
+            params.append(count)
+        selects.append(select)
+
+    if len(selects) == 1:
+        return selects[0], tuple(params)
+
+    query = " UNION ALL ".join(f"({select})" for select in selects) + " ORDER BY instance_id, weapon_id"
+    if count > 0:
+        query += " LIMIT %s"
+        params.append(count)
+
+    return query, tuple(params)
+
+def parse_stats_cursor(cursor: str) -> Optional[tuple[int, int]]:
+    """
+    (instance_id, weapon_id) of an "instance_id:weapon_id" cursor, None if it is malformed
+    """
+    try:
+        instance_id, weapon_id = cursor.split(":")
+        return int(instance_id), int(weapon_id)
+    except ValueError:
+        return None
 
-    return mult_resp
+def add_character_with_equipment(member_id: int, platform: int, char_id: int, player_id: int) -> None:
+    """
+    Store a character and its gear, committed together. Both are fetched before the transaction opens
+    """
+    character = character_manager.fetch_character(member_id, platform, char_id, player_id)
+    equipment = db_manager.fetch_character_equipment(character)
+
+    with db_exec.transaction():
+        character_manager.store_characters({char_id: character})
+        db_manager.store_character_equipment(equipment)
+
+def add_history_stats(history: dict, instances: dict, member_id: int, platform: int, char_id: int) -> None:
+    """
+    Store the character's stats from the latest instance of each activity type in history
+    """
+    for instance in instances.values():
+        instance.create_stats()
+
+    for activity, instance_ids in history.items():
+        print(f"{member_id=}")
+        print(f"{platform=}")
+        print(f"{activity=}")
+        print(instance_ids)
+        if instance_ids:
+            db_manager.add_new_stat_block(instances[instance_ids[-1]], char_id)
+
+def add_instance_stats(instance_data, character_id: int):
+    instance_data.create_stats()
+    return db_manager.add_new_stat_block(instance_data, character_id)
 
 def verify_platform(platform: int):
     if platform > 0 and platform <= 4:
@@ -196,8 +295,8 @@ def verify_date_format(date: str) -> bool:
 @app.get("/d2/user/{bng_username}")
 async def get_user_by_id(bng_username: str, response: Response):
     if verify_bng_username(bng_username):
-        query = f"SELECT * FROM `Player` WHERE bng_username = '{bng_username}'"
-        result = db_conn.execute(query)
+        query = "SELECT * FROM `Player` WHERE bng_username = %s"
+        result = await read_pool.run(db_conn.execute, query, (bng_username,))
         if result:
             resp = convert_to_dict(player_cols, result[0])
             if resp:
@@ -215,33 +314,24 @@ async def get_user_by_id(bng_username: str, response: Response):
 @app.post("/d2/user")
 async def post_new_user(username: str, platform: int, response: Response):
     if verify_platform(platform) and verify_bng_username(username):
-        new_player = player_manager.add_player_by_username(username, platform)
+        new_player = await ingest_pool.run(player_manager.add_player_by_username, username, platform)
         if new_player:
             member_id = new_player.data["destiny_id"]
-            result = player_manager.get_character_and_player_ids(member_id)
+            result = await ingest_pool.run(player_manager.get_character_and_player_ids, member_id)
             character_ids = result[0]
             player_id = result[1]
 
             if character_ids:
                 for char_id in character_ids:
                     try:
-                        character_manager.add_new_character(member_id, platform, int(char_id), player_id)  # type: ignore
-                        db_manager.add_character_equipment(int(char_id))
-
-                        for activity in activities:
-                            print(f"{member_id=}")
-                            print(f"{platform=}")
-                            print(f"{activity=}")
-                            sleep(5)
-                            instance_ids = character_manager.get_activity_history(char_id, activity, 5)  # type: ignore
-                            print(instance_ids)
-                            if instance_ids:
-                                for id in instance_ids:
-                                    instance_manager.create_instance(id)
-                                    instance_manager.create_instance_stats(id)
-                            
-                            instance_list = instance_manager.get_instances()
-                            db_manager.add_new_stat_block(instance_list[-1], int(char_id))
+                        await ingest_pool.run(add_character_with_equipment, member_id, platform, int(char_id), player_id)  # type: ignore
+
+                        # one history request for every mode, classified locally into the ACTIVITY_TYPE buckets
+                        history = await character_manager.get_activity_history_by_mode_async(char_id, HISTORY_COUNT, HISTORY_PER_MODE)  # type: ignore
+                        if history:
+                            unique_ids = list(dict.fromkeys(id for instance_ids in history.values() for id in instance_ids))
+                            instances = {instance.instance_id: instance for instance in await instance_manager.create_instances_async(unique_ids)}
+                            await ingest_pool.run(add_history_stats, history, instances, member_id, platform, int(char_id))
                         response.status_code = status.HTTP_201_CREATED
                         return new_player.data, 201
                     except Exception as e:
@@ -256,7 +346,7 @@ async def post_new_user(username: str, platform: int, response: Response):
 @app.patch("/d2/user/{member_id}")
 async def patch_user_last_played(member_id: int, platform: int, response: Response):
     if verify_platform(platform):
-        result = player_manager.update_date_last_played(member_id, platform)
+        result = await ingest_pool.run(player_manager.update_date_last_played, member_id, platform)
         if result:
             response.status_code = status.HTTP_200_OK
             return result.data, 200
@@ -269,7 +359,7 @@ async def patch_user_last_played(member_id: int, platform: int, response: Respon
 
 @app.get("/d2/user/character/{player_id}/{bng_char_id}")
 async def get_user_character_by_id(player_id: int, bng_char_id: int, response: Response):
-    result = db_exec.select_rows("`Character`", ["*"], {"player_id": player_id, "bng_character_id": bng_char_id})
+    result = await read_pool.run(db_exec.select_rows, "`Character`", ["*"], {"player_id": player_id, "bng_character_id": bng_char_id})
     if result:
         resp = convert_to_dict(character_cols, result[0])
         if resp:
@@ -283,8 +373,8 @@ async def get_user_character_by_id(player_id: int, bng_char_id: int, response: R
 
 @app.get("/d2/weapon/{weapon_id}")
 async def get_weapon_by_id(weapon_id: int, response: Response):
-    query = f"SELECT * FROM `Weapon` WHERE weapon_id = {weapon_id}"
-    result = db_conn.execute(query)
+    query = "SELECT * FROM `Weapon` WHERE weapon_id = %s"
+    result = await read_pool.run(db_conn.execute, query, (weapon_id,))
     if result:
         resp = convert_to_dict(weapon_cols, result[0])
         if resp:
@@ -298,7 +388,7 @@ async def get_weapon_by_id(weapon_id: int, response: Response):
 
 @app.post("/d2/weapon")
 async def post_weapon(weapon_id: int, response: Response):
-    new_weapon = weapon_manager.add_new_weapon(weapon_id)
+    new_weapon = await ingest_pool.run(weapon_manager.add_new_weapon, weapon_id)
     if new_weapon:
         response.status_code = status.HTTP_201_CREATED
         return new_weapon.data, 201
@@ -308,7 +398,7 @@ async def post_weapon(weapon_id: int, response: Response):
 
 @app.put("/d2/weapon/{weapon_id}")
 async def put_weapon(weapon_id: int, response: Response):
-    update_result = weapon_manager.update_weapon(weapon_id)
+    update_result = await ingest_pool.run(weapon_manager.update_weapon, weapon_id)
     if update_result:
         response.status_code = status.HTTP_200_OK
         return update_result, 200
@@ -318,8 +408,8 @@ async def put_weapon(weapon_id: int, response: Response):
 
 @app.get("/d2/armor/{armor_id}")
 async def get_armor_by_id(armor_id: int, response: Response):
-    query = f"SELECT * FROM `Armor` WHERE armor_id = {armor_id}"
-    result = db_conn.execute(query)
+    query = "SELECT * FROM `Armor` WHERE armor_id = %s"
+    result = await read_pool.run(db_conn.execute, query, (armor_id,))
     if result:
         resp = convert_to_dict(armor_cols, result[0])
         if resp:
@@ -333,7 +423,7 @@ async def get_armor_by_id(armor_id: int, response: Response):
 
 @app.post("/d2/armor")
 async def post_armor(armor_id: int, response: Response):
-    new_armor = armor_manager.add_new_armor(armor_id)
+    new_armor = await ingest_pool.run(armor_manager.add_new_armor, armor_id)
     if new_armor:
         response.status_code = status.HTTP_201_CREATED
         return new_armor.data, 201
@@ -343,7 +433,7 @@ async def post_armor(armor_id: int, response: Response):
 
 @app.put("/d2/armor/{armor_id}")
 async def put_armor(armor_id: int, response: Response):
-    update_result = armor_manager.update_armor(armor_id)
+    update_result = await ingest_pool.run(armor_manager.update_armor, armor_id)
     if update_result:
         response.status_code = status.HTTP_200_OK
         return update_result, 200
@@ -352,103 +442,61 @@ async def put_armor(armor_id: int, response: Response):
         return {"Error": f"Armor {armor_id} not found"}, 404
 
 @app.get("/d2/user/activity_stats/{destiny_id}")
-async def get_activity_stats_by_id(destiny_id: int, response: Response, activity_name: str="", character_id: int=0, mode: str="", count: int=0):
+async def get_activity_stats_by_id(destiny_id: int, response: Response, activity_name: str="", character_id: int=0, mode: str="", count: int=0, limit: int=0, after: str=""):
+    """
+    One page of a player's activity stats in (instance_id, weapon_id) order. When the page is full, the X-Next-Cursor
+    header holds the after value that fetches the next one. count is the older name for limit
+    """
     if mode and activity_name:
         response.status_code = status.HTTP_400_BAD_REQUEST
         return {"Error": "Incompatible filters requested"}, 400
-    
-    mult_activity_ids = []
-    mult_character_ids = []
 
-    if character_id == 0:
-        mult_character_ids = get_character_ids(destiny_id)
-        if not mult_character_ids:
-            response.status_code = status.HTTP_404_NOT_FOUND
-            return {"Error": f"No characters found for the given user {destiny_id}"}, 404
+    cursor = parse_stats_cursor(after) if after else None
+    if after and cursor is None:
+        response.status_code = status.HTTP_400_BAD_REQUEST
+        return {"Error": f"Invalid cursor {after}"}, 400
 
-    if not activity_name and mode:
-        mult_activity_ids = get_activity_ids_by_mode(mode)
-        if not mult_activity_ids:
-            response.status_code = status.HTTP_404_NOT_FOUND
-            return {"Error": f"No matching activities found for the given mode {mode}"}, 404
+    if limit < 0 or count < 0:
+        response.status_code = status.HTTP_400_BAD_REQUEST
+        return {"Error": f"Invalid page size {limit or count}"}, 400
 
-    if mult_character_ids:
-        mult_resp = []
-        for char_id in mult_character_ids:
-            if mult_activity_ids:
-                for act_id in mult_activity_ids:
-                    act_resps = get_mult_activity_stats(char_id, act_id=act_id)
-                    for single_resp in act_resps:
-                        mult_resp.append(single_resp)
-            elif activity_name:
-                act_resps = get_mult_activity_stats(char_id, act_name=activity_name)
-                for single_resp in act_resps:
-                    mult_resp.append(single_resp)
-            else:
-                act_resps = get_mult_activity_stats(char_id)
-                for single_resp in act_resps:
-                    mult_resp.append(single_resp)
-        
-        if count > 0  and mult_resp:
-            response.status_code = status.HTTP_200_OK
-            return mult_resp[:count], 200
-        elif mult_resp:
-            response.status_code = status.HTTP_200_OK
-            return mult_resp, 200
-    elif character_id:
-        character_id = get_character_ids(destiny_id, character_id)[0]
+    character_ids = await read_pool.run(get_character_ids, destiny_id, character_id)
+    if not character_ids:
+        response.status_code = status.HTTP_404_NOT_FOUND
+        return {"Error": f"No characters found for the given user {destiny_id}"}, 404
+
+    page_size = min(limit or count or STATS_PAGE_SIZE, STATS_PAGE_SIZE)
+    query, params = activity_stats_query(character_ids, mode, activity_name, page_size, cursor)
+    result = await read_pool.run(db_conn.execute, query, params, prepared=True)
+    if result and not isinstance(result, bool):
         mult_resp = []
-        if mult_activity_ids:
-            for act_id in mult_activity_ids:
-                query = f"SELECT * FROM `Activity_Stats` WHERE character_id = {character_id} AND activity_id = {act_id}"
-                result = db_conn.execute(query)
-                if result and not isinstance(result, bool):
-                    for item in result:
-                        single_resp = convert_to_dict(activity_stats_cols, item)
-                        if single_resp:
-                            mult_resp.append(single_resp)
-            else:
-                if count > 0  and mult_resp:
-                    response.status_code = status.HTTP_200_OK
-                    return mult_resp[:count], 200
-                elif mult_resp:
-                    response.status_code = status.HTTP_200_OK
-                    return mult_resp, 200
-        elif activity_name:
-            query = f'SELECT * FROM `Activity_Stats` WHERE character_id = {character_id} AND activity_name = "{activity_name}"'
-            result = db_conn.execute(query)
-            if result and not isinstance(result, bool):
-                for item in result:
-                    single_resp = convert_to_dict(activity_stats_cols, item)
-                    mult_resp.append(single_resp)
-                if count > 0 and mult_resp:
-                    response.status_code = status.HTTP_200_OK
-                    return mult_resp[:count], 200
-                elif mult_resp:
-                    response.status_code = status.HTTP_200_OK
-                    return mult_resp, 200
-        else:
-            act_resps = get_mult_activity_stats(character_id)
-            for single_resp in act_resps:
+        for item in result:
+            single_resp = convert_to_dict(activity_stats_cols, item)
+            if single_resp:
                 mult_resp.append(single_resp)
-            if count > 0 and mult_resp:
-                response.status_code = status.HTTP_200_OK
-                return mult_resp[:count], 200
-            elif mult_resp:
-                response.status_code = status.HTTP_200_OK
-                return mult_resp, 200
-    else:
-        response.status_code = status.HTTP_400_BAD_REQUEST
-        return {"Error": "Account characters not found"}, 404
-    
+
+        if len(result) == page_size and mult_resp:
+            response.headers["X-Next-Cursor"] = f"{mult_resp[-1]['instance_id']}:{mult_resp[-1]['weapon_id']}"
+        response.status_code = status.HTTP_200_OK
+        return mult_resp, 200
+
+    if cursor:
+        # scrolled past the last row
+        response.status_code = status.HTTP_200_OK
+        return [], 200
+
+    # nothing matched, work out which filter came up empty
+    if mode and not await read_pool.run(get_activity_ids_by_mode, mode):
+        response.status_code = status.HTTP_404_NOT_FOUND
+        return {"Error": f"No matching activities found for the given mode {mode}"}, 404
+
     response.status_code = status.HTTP_404_NOT_FOUND
     return "Activity stats not found", 404
 
 @app.post("/d2/user/activity_stats")
 async def post_activity_stats(character_id: int, instance_id: int, response: Response):
-    instance_data = instance_manager.create_instance(instance_id)
-    instance_data.create_stats()
-    stat = db_manager.add_new_stat_block(instance_data, character_id)
+    instance_data = (await instance_manager.create_instances_async([instance_id]))[0]
+    stat = await ingest_pool.run(add_instance_stats, instance_data, character_id)
     
     if isinstance(stat, ActivityStatsData):
         response.status_code = status.HTTP_201_CREATED
@@ -459,7 +507,7 @@ async def post_activity_stats(character_id: int, instance_id: int, response: Res
 
 @app.delete("/d2/user/activity_stats")
 async def delete_activity_stats(character_id: int, instance_id: int, response: Response):
-    delete_result = db_manager.delete_stat_block(character_id, instance_id)
+    delete_result = await ingest_pool.run(db_manager.delete_stat_block, character_id, instance_id)
     if delete_result and isinstance(delete_result, list):
         delete_result = convert_to_dict(activity_stats_cols, delete_result[0])
         response.status_code = status.HTTP_200_OK
@@ -479,6 +527,14 @@ async def get_memory_usage():
         "percent": memory.percent
     }
 
+@app.get("/pools")
+async def get_pool_usage():
+    return {
+        "read": read_pool.stats,
+        "ingest": ingest_pool.stats,
+        "db": db_conn.pool_stats
+    }
+
 if __name__ == "__main__":
     # for debugging
     uvicorn.run(app, host="0.0.0.0", port=8080)
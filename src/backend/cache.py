@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+class LRUCache:
+    """
+    Thread-safe mapping bounded to maxsize entries. The least recently used entry is evicted first, and with a ttl
+    entries also expire that many seconds after they were put. on_evict(key, value) is called, with the lock held, for
+    every entry dropped by eviction or expiry
+    """
+    def __init__(self, maxsize: int=1024, ttl: Optional[float]=None, on_evict: Optional[Callable[[Hashable, Any], None]]=None) -> None:
+        self.__maxsize = maxsize
+        self.__ttl = ttl
+        self.__on_evict = on_evict
+        self.__entries: OrderedDict = OrderedDict()  # key -> (value, expiry time or None)
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+        self.__expirations = 0
+        self.__lock = threading.Lock()
+
+    def __live(self, key: Hashable) -> bool:
+        """
+        Whether key has an unexpired entry, dropping it if it has expired. Call with the lock held
+        """
+        if key not in self.__entries:
+            return False
+
+        expires = self.__entries[key][1]
+        if expires is not None and expires <= time.monotonic():
+            value = self.__entries.pop(key)[0]
+            self.__expirations += 1
+            if self.__on_evict is not None:
+                self.__on_evict(key, value)
+            return False
+
+        return True
+
+    def get(self, key: Hashable, default: Any=None) -> Any:
+        with self.__lock:
+            if self.__live(key):
+                self.__entries.move_to_end(key)
+                self.__hits += 1
+                return self.__entries[key][0]
+
+            self.__misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self.__lock:
+            self.__entries[key] = (value, time.monotonic() + self.__ttl if self.__ttl is not None else None)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__maxsize:
+                evicted_key, (evicted, _) = self.__entries.popitem(last=False)
+                self.__evictions += 1
+                if self.__on_evict is not None:
+                    self.__on_evict(evicted_key, evicted)
+
+    def pop(self, key: Hashable, default: Any=None) -> Any:
+        with self.__lock:
+            if self.__live(key):
+                return self.__entries.pop(key)[0]
+            return default
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+    def values(self) -> list:
+        """
+        Snapshot of the unexpired values, least recently used first. Does not count as a use
+        """
+        with self.__lock:
+            return [self.__entries[key][0] for key in list(self.__entries) if self.__live(key)]
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.__lock:
+            return self.__live(key)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def stats(self) -> dict:
+        total = self.__hits + self.__misses
+        return {
+            "size": len(self.__entries),
+            "maxsize": self.__maxsize,
+            "ttl": self.__ttl,
+            "hits": self.__hits,
+            "misses": self.__misses,
+            "hit_rate": round(self.__hits / total, 4) if total else 0.0,
+            "evictions": self.__evictions,
+            "expirations": self.__expirations
+        }
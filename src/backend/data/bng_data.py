@@ -4,7 +4,8 @@ from typing import Optional
 from dotenv import load_dotenv
 import os
 
-from backend.extract.bng_api_connector import BungieConnector
+from backend.extract.bng_api_connector import BungieConnector, AsyncBungieConnector
+from backend.extract.pgcr_archive import archive_from_env
 import backend.manifest.destiny_manifest as manifest
 from backend.data.bng_types import (
     PLATFORM,
@@ -14,7 +15,8 @@ from backend.data.bng_types import (
     ARMOR_SLOT_TYPE,
     AMMO_TYPE,
     DAMAGE_TYPE,
-    RARITY
+    RARITY,
+    ACTIVITY_TYPE
 )
  
 MANIFEST = manifest.DestinyManifest()
@@ -28,6 +30,9 @@ class BungieData(ABC):
     def get_data(self, path):
         return self.bng_conn.get_url_request(path)
 
+    async def get_data_async(self, path):
+        return await self.bng_conn.get_url_request(path)
+
     @abstractmethod
     def define_data(self):
         pass
@@ -64,7 +69,36 @@ class PlayerData(BungieData):
 
         bng_mem_data = self.get_data(bng_member_endpoint)
         destiny_prof_data = self.get_data(destiny_prof_endpoint)
-        
+        self.__set_data(bng_mem_data, destiny_prof_data)
+
+    async def define_data_async(self, bng_member_endpoint: str="", destiny_prof_endpoint: str="") -> None:
+        if not bng_member_endpoint:
+            bng_member_endpoint = self._bng_mem_endpoint
+
+        if not destiny_prof_endpoint:
+            destiny_prof_endpoint = self._dst_prof_endpoint
+
+        bng_mem_data, destiny_prof_data = await self.bng_conn.fetch_many([bng_member_endpoint, destiny_prof_endpoint])
+        self.__set_data(bng_mem_data, destiny_prof_data)
+
+    def define_data_from_db(self, row) -> None:
+        """
+        Fill data from a stored Player row (player_id, destiny_id, bng_id, bng_username, date_created, date_last_played,
+        platform, character_ids) instead of asking Bungie
+        """
+        try:
+            self.__data["date_created"] = str(row[4])[:10]
+            self.__data["date_last_played"] = str(row[5])[:10]
+            self.__data["bng_id"] = int(row[2])
+            self.__data["destiny_id"] = int(row[1])
+            self.__data["bng_username"] = row[3]
+            self.__data["platform"] = PLATFORM[row[6]].name
+            # stored as the text of the list, e.g. "['1', '2']"
+            self.__data["character_ids"] = [character_id.strip(" '\"") for character_id in str(row[7]).strip("[]").split(",")]
+        except (IndexError, KeyError, TypeError, ValueError):
+            self.__data.clear()
+
+    def __set_data(self, bng_mem_data, destiny_prof_data) -> None:
         if bng_mem_data and destiny_prof_data:
             try:
                 self.__data["date_created"] = bng_mem_data["bungieNetUser"]["firstAccess"][:10]
@@ -99,7 +133,16 @@ class CharacterData(PlayerData):
     def define_data(self):
         char_data = self.get_data(f"{self._char_data_endpoint}?components=Characters")
         equipped_item_ids = self.get_all_equipped_items()
-        
+        self.__set_data(char_data, equipped_item_ids)
+
+    async def define_data_async(self):
+        char_data, char_equipped_data = await self.bng_conn.fetch_many([
+            f"{self._char_data_endpoint}?components=Characters",
+            f"{self._char_data_endpoint}?components=CharacterEquipment"
+        ])
+        self.__set_data(char_data, self.__parse_equipped_items(char_equipped_data))
+
+    def __set_data(self, char_data, equipped_item_ids: list) -> None:
         if char_data:
             try:
                 self.__data["bng_character_id"] = self._character_id
@@ -118,9 +161,62 @@ class CharacterData(PlayerData):
 
     def get_activity_hist_instances(self, mode: int, count: int, path: str="") -> list[int]:
         if not path:
-            path = f"{self.root}/Destiny2/{self._type}/Account/{self._id}/Character/{self._character_id}/Stats/Activities/?count={count}&mode={mode}&page=1"
+            path = self.__activity_hist_endpoint(mode, count)
+        data = self.get_data(path)
+
+        return self.__parse_activity_hist(data)
+
+    async def get_activity_hist_instances_async(self, mode: int, count: int, path: str="") -> list[int]:
+        if not path:
+            path = self.__activity_hist_endpoint(mode, count)
+        data = await self.get_data_async(path)
+
+        return self.__parse_activity_hist(data)
+
+    def get_activity_hist_by_mode(self, count: int, per_mode: int, path: str="") -> dict[ACTIVITY_TYPE, list[int]]:
+        """
+        Fetch the character's recent history across all modes in one request and bucket the instance IDs by ACTIVITY_TYPE
+        """
+        if not path:
+            path = self.__activity_hist_endpoint(None, count)
         data = self.get_data(path)
 
+        return self.__classify_activity_hist(data, per_mode)
+
+    async def get_activity_hist_by_mode_async(self, count: int, per_mode: int, path: str="") -> dict[ACTIVITY_TYPE, list[int]]:
+        if not path:
+            path = self.__activity_hist_endpoint(None, count)
+        data = await self.get_data_async(path)
+
+        return self.__classify_activity_hist(data, per_mode)
+
+    def __activity_hist_endpoint(self, mode: Optional[int], count: int) -> str:
+        endpoint = f"{self.root}/Destiny2/{self._type}/Account/{self._id}/Character/{self._character_id}/Stats/Activities/?count={count}"
+        if mode is not None:
+            endpoint += f"&mode={mode}"
+        return f"{endpoint}&page=1"
+
+    def __classify_activity_hist(self, data, per_mode: int) -> dict[ACTIVITY_TYPE, list[int]]:
+        """
+        An instance lands in every bucket whose mode appears in its activityDetails modes, up to per_mode instances per bucket
+        """
+        instance_ids: dict[ACTIVITY_TYPE, list[int]] = {activity_type: [] for activity_type in ACTIVITY_TYPE}
+        if data:
+            for activity in data.get("activities", []):
+                try:
+                    details = activity["activityDetails"]
+                    modes = set(details.get("modes", []))
+                    modes.add(details.get("mode"))
+
+                    for activity_type in ACTIVITY_TYPE:
+                        if activity_type.value in modes and len(instance_ids[activity_type]) < per_mode:
+                            instance_ids[activity_type].append(int(details["instanceId"]))
+                except (KeyError, ValueError):
+                    continue
+
+        return instance_ids
+
+    def __parse_activity_hist(self, data) -> list[int]:
         instance_ids: list[int] = []
         if data:
             for activity in data["activities"]:
@@ -133,7 +229,10 @@ class CharacterData(PlayerData):
             char_equipped_data = self.get_data(f"{self._char_data_endpoint}?components=CharacterEquipment")
         else:
             char_equipped_data = self.get_data(equip_path)
-        
+
+        return self.__parse_equipped_items(char_equipped_data)
+
+    def __parse_equipped_items(self, char_equipped_data) -> list[str]:
         item_ids = []
         if char_equipped_data:
             try:
@@ -357,11 +456,13 @@ class ActivityData(BungieData):
         return self.__data
 
 class ActivityInstanceData(BungieData):
-    def __init__(self, connection: BungieConnector, instance_id: int) -> None:
+    def __init__(self, connection: BungieConnector, instance_id: int, pgcr: Optional[dict]=None) -> None:
         super().__init__(connection)
         self._instance_id = instance_id
-        self._pgcr_path = f"{self.root}/Destiny2/Stats/PostGameCarnageReport/{self._instance_id}/"
-        self._pgcr = self.get_data(self._pgcr_path)
+        self._pgcr_path = self.pgcr_endpoint(self._instance_id)
+        if pgcr is None:
+            pgcr = self.get_data(self._pgcr_path)
+        self._pgcr = pgcr
         self._character_pgdata = dict()
         self.__instance_stats: list[ActivityStatsData] = []
 
@@ -395,13 +496,17 @@ class ActivityInstanceData(BungieData):
     def create_stats(self, manifest: manifest.DestinyManifest=MANIFEST) -> None:
         for character, weapons in self._character_pgdata.items():
             for weapon_id in weapons:
-                new_stats = ActivityStatsData(self.bng_conn, self._instance_id, weapon_id, character, self.__activity_id, manifest)
+                new_stats = ActivityStatsData(self.bng_conn, self._instance_id, weapon_id, character, self.__activity_id, manifest, self._pgcr)
                 new_stats.define_data()
                 self.__instance_stats.append(new_stats)
 
     def get_instance_stats(self) -> list[ActivityStatsData]:
         return self.__instance_stats
 
+    @staticmethod
+    def pgcr_endpoint(instance_id: int) -> str:
+        return f"https://www.bungie.net/Platform/Destiny2/Stats/PostGameCarnageReport/{instance_id}/"
+
     @property
     def participants_data(self) -> dict:
         return self._character_pgdata
@@ -411,7 +516,7 @@ class ActivityInstanceData(BungieData):
         return self._instance_id
                         
 class ActivityStatsData(BungieData):
-    def __init__(self, connection: BungieConnector, instance_id: int, weapon_id: int, char_id: int, activity_id: int, manifest: manifest.DestinyManifest=MANIFEST) -> None:
+    def __init__(self, connection: BungieConnector, instance_id: int, weapon_id: int, char_id: int, activity_id: int, manifest: manifest.DestinyManifest=MANIFEST, pgcr: Optional[dict]=None) -> None:
         super().__init__(connection)
         self.__data: dict = dict()
         self.__og_data: dict = dict()
@@ -421,10 +526,14 @@ class ActivityStatsData(BungieData):
         self.__instance_id = instance_id
         self.__activity_id = activity_id
         self._pgcr_path = f"{self.root}/Destiny2/Stats/PostGameCarnageReport/{self.__instance_id}/"
+        self._pgcr = pgcr  # report shared by the owning ActivityInstanceData, if any
         self._manifest = manifest
 
     def define_data(self):
-        pgcr = self.get_data(self._pgcr_path)
+        if self._pgcr is not None:
+            pgcr = self._pgcr
+        else:
+            pgcr = self.get_data(self._pgcr_path)
 
         if pgcr:
             perf_report = self.__get_participating_character(pgcr)
@@ -497,7 +606,9 @@ class ActivityStatsData(BungieData):
 
 class DataFactory:
     load_dotenv()
-    bng_conn = BungieConnector(os.getenv("X_API_KEY")) 
+    pgcr_archive = archive_from_env()
+    bng_conn = BungieConnector(os.getenv("X_API_KEY"), archive=pgcr_archive) 
+    async_bng_conn = AsyncBungieConnector(os.getenv("X_API_KEY"), archive=pgcr_archive)
 
     @staticmethod
     def get_player(member_id: int, member_type: int, conn: BungieConnector=bng_conn) -> PlayerData:
@@ -535,6 +646,36 @@ class DataFactory:
         instance.define_data()
         return instance
     
+    @staticmethod
+    async def get_player_async(member_id: int, member_type: int, conn: AsyncBungieConnector=async_bng_conn) -> PlayerData:
+        player = PlayerData(conn, member_id, member_type)  # type: ignore
+        await player.define_data_async()
+        return player
+
+    @staticmethod
+    async def get_character_async(member_id: int, member_type: int, char_id: int, player_id: int, conn: AsyncBungieConnector=async_bng_conn) -> CharacterData:
+        character = CharacterData(conn, member_id, member_type, char_id, player_id)  # type: ignore
+        await character.define_data_async()
+        return character
+
+    @staticmethod
+    async def get_activity_instance_async(instance_id: int, conn: AsyncBungieConnector=async_bng_conn) -> ActivityInstanceData:
+        pgcr = await conn.get_url_request(ActivityInstanceData.pgcr_endpoint(instance_id))
+        instance = ActivityInstanceData(conn, instance_id, pgcr or {})  # type: ignore
+        instance.define_data()
+        return instance
+
+    @staticmethod
+    async def get_activity_instances_async(instance_ids: list[int], conn: AsyncBungieConnector=async_bng_conn) -> list[ActivityInstanceData]:
+        pgcrs = await conn.fetch_many([ActivityInstanceData.pgcr_endpoint(instance_id) for instance_id in instance_ids])
+
+        instances = []
+        for instance_id, pgcr in zip(instance_ids, pgcrs):
+            instance = ActivityInstanceData(conn, instance_id, pgcr or {})  # type: ignore
+            instance.define_data()
+            instances.append(instance)
+        return instances
+
     @staticmethod
     def get_equipped_weapon(weapon_data: WeaponData, bng_character_id: int, conn: BungieConnector=bng_conn, manifest: manifest.DestinyManifest=MANIFEST) -> EquippedWeaponData:
         weapon = EquippedWeaponData(conn, weapon_data, bng_character_id, manifest)
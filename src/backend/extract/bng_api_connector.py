@@ -1,25 +1,245 @@
-from urllib.request import Request, urlopen
-import json
+import asyncio
+import threading
+import time
+from typing import Optional
+from httpx import AsyncClient, Limits, Timeout
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from backend.extract.pgcr_archive import PGCRArchive, pgcr_instance_id
+
+# Bungie PlatformErrorCodes that mean the request was rejected for going too fast
+THROTTLE_ERROR_CODES = {
+    31,  # PerEndpointRequestThrottleExceeded
+    35,  # ThrottleLimitExceeded
+    36,  # ThrottleLimitExceededMinutes
+    37,  # ThrottleLimitExceededMomentarily
+    38,  # ThrottleLimitExceededSeconds
+    51,  # DestinyThrottledByGameServer
+}
+
+class RateLimiter:
+    """
+    Token bucket shared by the Bungie connectors. The refill rate is halved whenever Bungie reports throttling and creeps back up while responses come back clean
+    """
+    def __init__(self, rate: float=20.0, burst: int=10, min_rate: float=1.0, recovery: float=0.5) -> None:
+        self.__max_rate = rate
+        self.__rate = rate
+        self.__min_rate = min_rate
+        self.__recovery = recovery  # requests/second regained per clean response
+        self.__burst = burst
+        self.__tokens = float(burst)
+        self.__last_refill = time.monotonic()
+        self.__blocked_until = 0.0
+        self.__lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take a token and return how many seconds the caller must wait before sending its request
+        """
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.__burst, self.__tokens + (now - self.__last_refill) * self.__rate)
+            self.__last_refill = now
+
+            # tokens may go negative, which queues callers behind each other
+            self.__tokens -= 1
+            wait = -self.__tokens / self.__rate if self.__tokens < 0 else 0.0
+            return max(wait, self.__blocked_until - now)
+
+    def observe(self, json_out: dict) -> bool:
+        """
+        Adapt the pace to the ThrottleSeconds and ErrorCode of a Bungie response. Returns True if the request was throttled and should be retried
+        """
+        throttle_seconds = json_out.get("ThrottleSeconds") or 0
+        throttled = json_out.get("ErrorCode") in THROTTLE_ERROR_CODES
+
+        with self.__lock:
+            now = time.monotonic()
+            if throttled:
+                self.__rate = max(self.__min_rate, self.__rate / 2)
+                self.__tokens = min(self.__tokens, 0.0)
+                self.__blocked_until = max(self.__blocked_until, now + max(throttle_seconds, 1 / self.__rate))
+            else:
+                self.__rate = min(self.__max_rate, self.__rate + self.__recovery)
+                if throttle_seconds:
+                    self.__blocked_until = max(self.__blocked_until, now + throttle_seconds)
+
+        return throttled
+
+    @property
+    def rate(self) -> float:
+        return self.__rate
+
+BUNGIE_RATE_LIMITER = RateLimiter()
 
 class BungieConnector:
-    def __init__(self, x_api_key: str) -> None:
+    """
+    Keep-alive HTTP client for the Bungie API. Connections are pooled per host and reused across requests
+    """
+    def __init__(self, x_api_key: str, pool_connections: int=4, pool_maxsize: int=10, timeout: tuple[float, float]=(5.0, 30.0), limiter: RateLimiter=BUNGIE_RATE_LIMITER, max_retries: int=3, archive: Optional[PGCRArchive]=None) -> None:
         self.__request_header = {"X-API-KEY": x_api_key}
+        self.__archive = archive
+        self.__timeout = timeout  # (connect, read) seconds
+        self.__limiter = limiter
+        self.__max_retries = max_retries
+
+        # pool_connections is the number of host pools kept, pool_maxsize the connections kept alive per host
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.__session = Session()
+        self.__session.headers.update(self.__request_header)
+        self.__session.mount("https://", adapter)
+        self.__session.mount("http://", adapter)
 
     def get_url_request(self, path: str, body=None):
-        if body:
-            body = json.dumps(body)
-            body = str(body)
-            body = body.encode('utf-8')
-
-        req = Request(path, headers=self.__request_header, data=body)
-        with urlopen(req) as response:
-            json_out = json.loads(response.read())
+        instance_id = None if body else pgcr_instance_id(path)
+        report = archive_lookup(self.__archive, instance_id)
+        if report is not None:
+            return report
+
+        for attempt in range(self.__max_retries + 1):
+            time.sleep(self.__limiter.reserve())
+
+            if body:
+                response = self.__session.post(path, json=body, timeout=self.__timeout)
+            else:
+                response = self.__session.get(path, timeout=self.__timeout)
+
+            json_out = decode_response(response)
+            if not (json_out and self.__limiter.observe(json_out)) or attempt == self.__max_retries:
+                break
+
+        response.raise_for_status()
         if json_out:
+            archive_store(self.__archive, instance_id, json_out)
             return json_out["Response"]
-        
+
+    def close(self) -> None:
+        """
+        Release all pooled connections
+        """
+        self.__session.close()
+
+class AsyncBungieConnector:
+    """
+    Asyncio counterpart of BungieConnector. All requests share one pooled client and at most max_concurrency of them are in flight at once
+    """
+    def __init__(self, x_api_key: str, max_concurrency: int=8, max_connections: int=10, timeout: tuple[float, float]=(5.0, 30.0), limiter: RateLimiter=BUNGIE_RATE_LIMITER, max_retries: int=3, archive: Optional[PGCRArchive]=None) -> None:
+        self.__request_header = {"X-API-KEY": x_api_key}
+        self.__archive = archive
+        self.__limiter = limiter
+        self.__max_retries = max_retries
+        self.__timeout = Timeout(timeout[1], connect=timeout[0])
+        self.__limits = Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.__max_concurrency = max_concurrency
+
+        # the client and semaphore are bound to the event loop that first uses them
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__client: Optional[AsyncClient] = None
+        self.__semaphore: Optional[asyncio.Semaphore] = None
+        self.__closing: set[asyncio.Task] = set()  # closes of replaced clients, held so they are not collected mid-close
+
+    def __get_client(self) -> tuple[AsyncClient, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        if self.__client is None or self.__semaphore is None or self.__loop is not loop:
+            if self.__client is not None:
+                self.__discard_client(self.__client, self.__loop, loop)
+            self.__loop = loop
+            self.__client = AsyncClient(headers=self.__request_header, timeout=self.__timeout, limits=self.__limits)
+            self.__semaphore = asyncio.Semaphore(self.__max_concurrency)
+
+        return self.__client, self.__semaphore
+
+    def __discard_client(self, client: AsyncClient, old_loop: Optional[asyncio.AbstractEventLoop], loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Close a client left behind by a previous event loop, on that loop while it still runs
+        """
+        if old_loop is not None and old_loop.is_running():
+            asyncio.run_coroutine_threadsafe(close_quietly(client), old_loop)
+        else:
+            self.__closing.add(loop.create_task(close_quietly(client)))
+            for task in [task for task in self.__closing if task.done()]:
+                self.__closing.discard(task)
+
+    async def get_url_request(self, path: str, body=None):
+        instance_id = None if body else pgcr_instance_id(path)
+        archived = self.__archive is not None and instance_id is not None
+        if archived:
+            # the archive is SQLite on disk, read and written off the event loop
+            report = await asyncio.to_thread(archive_lookup, self.__archive, instance_id)
+            if report is not None:
+                return report
+
+        client, semaphore = self.__get_client()
+
+        async with semaphore:
+            for attempt in range(self.__max_retries + 1):
+                await asyncio.sleep(self.__limiter.reserve())
+
+                if body:
+                    response = await client.post(path, json=body)
+                else:
+                    response = await client.get(path)
+
+                json_out = decode_response(response)
+                if not (json_out and self.__limiter.observe(json_out)) or attempt == self.__max_retries:
+                    break
+
+        response.raise_for_status()
+        if json_out:
+            if archived:
+                await asyncio.to_thread(archive_store, self.__archive, instance_id, json_out)
+            return json_out["Response"]
+
+    async def fetch_many(self, paths: list[str]) -> list:
+        """
+        Request every path concurrently, bounded by the connector's semaphore. Results keep the order of paths
+        """
+        return list(await asyncio.gather(*(self.get_url_request(path) for path in paths)))
+
+    async def close(self) -> None:
+        """
+        Release all pooled connections
+        """
+        if self.__client is not None:
+            await self.__client.aclose()
+            self.__client = None
+            self.__semaphore = None
+            self.__loop = None
+
+async def close_quietly(client: AsyncClient) -> None:
+    """
+    Close a replaced client. Its transports may already be gone with the loop that opened them
+    """
+    try:
+        await client.aclose()
+    except Exception:
+        pass
+
+def decode_response(response):
+    """
+    Decode a Bungie JSON body. Throttled requests still carry a JSON body, so the HTTP status is only raised when there is nothing to decode
+    """
+    try:
+        return response.json()
+    except ValueError:
+        response.raise_for_status()
+        raise
+
+def archive_lookup(archive: Optional[PGCRArchive], instance_id: Optional[int]) -> Optional[dict]:
+    if archive is not None and instance_id is not None:
+        return archive.get(instance_id)
+
+def archive_store(archive: Optional[PGCRArchive], instance_id: Optional[int], json_out: dict) -> None:
+    """
+    Archive a successful PostGameCarnageReport response. ErrorCode 1 is Bungie's Success
+    """
+    if archive is not None and instance_id is not None and json_out.get("ErrorCode", 1) == 1 and json_out.get("Response"):
+        archive.put(instance_id, json_out["Response"])
+
 # def main():
 #     conn = BungieConnector("6250b4fbc6044931b45897c8109d692e")
 #     conn.get_url_request("https://www.bungie.net/Platform/User/GetMembershipsById/4611686018441248186/1/")
 
 # if __name__ == "__main__":
-#     main()
\ No newline at end of file
+#     main()
@@ -0,0 +1,116 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+
+PGCR_PATH_PATTERN = re.compile(r"/Destiny2/Stats/PostGameCarnageReport/(\d+)/?")
+ACCESS_FLUSH_EVERY = 256  # hits whose access times are held in memory before they are written in one commit
+
+class PGCRArchive:
+    """
+    Local store of PostGameCarnageReports keyed by instance ID. Reports never change once an instance exists, so a stored
+    report is always valid. Reports are zlib-compressed JSON in a SQLite file, evicted least-recently-used past max_bytes.
+    Access times of hits are written in batches, on the next put or every ACCESS_FLUSH_EVERY hits
+    """
+    def __init__(self, path: str, max_bytes: int=512 * 1024 * 1024) -> None:
+        self.__max_bytes = max_bytes
+        self.__hits = 0
+        self.__misses = 0
+        self.__lock = threading.Lock()
+        self.__accessed: dict[int, float] = {}  # instance id -> last hit not yet written
+
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+        self.__db.execute(
+            "CREATE TABLE IF NOT EXISTS pgcr ("
+            "instance_id INTEGER PRIMARY KEY, "
+            "report BLOB NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "last_access REAL NOT NULL)"
+        )
+        self.__db.execute("CREATE INDEX IF NOT EXISTS pgcr_last_access ON pgcr(last_access)")
+        self.__db.commit()
+        self.__size = self.__db.execute("SELECT COALESCE(SUM(size), 0) FROM pgcr").fetchone()[0]
+
+    def get(self, instance_id: int) -> Optional[dict]:
+        with self.__lock:
+            row = self.__db.execute("SELECT report FROM pgcr WHERE instance_id = ?", (instance_id,)).fetchone()
+            if row is None:
+                self.__misses += 1
+                return None
+
+            self.__hits += 1
+            self.__accessed[instance_id] = time.time()
+            if len(self.__accessed) >= ACCESS_FLUSH_EVERY:
+                self.__flush_access()
+                self.__db.commit()
+
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, instance_id: int, report: dict) -> None:
+        blob = zlib.compress(json.dumps(report, separators=(",", ":")).encode("utf-8"))
+
+        with self.__lock:
+            replaced = self.__db.execute("SELECT size FROM pgcr WHERE instance_id = ?", (instance_id,)).fetchone()
+            self.__db.execute(
+                "INSERT OR REPLACE INTO pgcr(instance_id, report, size, last_access) VALUES(?, ?, ?, ?)",
+                (instance_id, blob, len(blob), time.time())
+            )
+            self.__accessed.pop(instance_id, None)
+            self.__size += len(blob) - (replaced[0] if replaced else 0)
+
+            self.__flush_access()
+            self.__evict()
+            self.__db.commit()
+
+    def __flush_access(self) -> None:
+        if self.__accessed:
+            self.__db.executemany("UPDATE pgcr SET last_access = ? WHERE instance_id = ?", [(accessed, instance_id) for instance_id, accessed in self.__accessed.items()])
+            self.__accessed.clear()
+
+    def __evict(self) -> None:
+        """
+        Drop the least recently used reports until the archive fits in max_bytes
+        """
+        if self.__size <= self.__max_bytes:
+            return
+
+        for instance_id, size in self.__db.execute("SELECT instance_id, size FROM pgcr ORDER BY last_access"):
+            self.__db.execute("DELETE FROM pgcr WHERE instance_id = ?", (instance_id,))
+            self.__size -= size
+            if self.__size <= self.__max_bytes:
+                break
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__flush_access()
+            self.__db.commit()
+            self.__db.close()
+
+    @property
+    def stats(self) -> dict:
+        with self.__lock:
+            count = self.__db.execute("SELECT COUNT(*) FROM pgcr").fetchone()[0]
+            return {"hits": self.__hits, "misses": self.__misses, "reports": count, "bytes": self.__size}
+
+def pgcr_instance_id(path: str) -> Optional[int]:
+    """
+    Instance ID of a PostGameCarnageReport endpoint, or None for any other endpoint
+    """
+    match = PGCR_PATH_PATTERN.search(path)
+    if match:
+        return int(match.group(1))
+
+def archive_from_env() -> Optional[PGCRArchive]:
+    """
+    Open the archive in PATH_TO_PGCR_ARCHIVE, if that variable is set. PGCR_ARCHIVE_MAX_MB caps its size
+    """
+    path = os.getenv("PATH_TO_PGCR_ARCHIVE")
+    if not path:
+        return None
+
+    max_mb = int(os.getenv("PGCR_ARCHIVE_MAX_MB", 512))
+    return PGCRArchive(f"{path}/pgcr_archive.sqlite", max_mb * 1024 * 1024)
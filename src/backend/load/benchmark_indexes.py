@@ -0,0 +1,184 @@
+'''
+Compare the API's queries before and after the api access indexes migration:
+
+    python -m backend.load.benchmark_indexes [--scale N] [--runs N] [--keep]
+
+Loads d2-stats-dump.sql into a scratch database, copies its Player and Activity_Stats rows scale times over,
+then prints each query's plan and median latency, applies the migration and prints them again. Connects with DB_HOST,
+DB_PORT, DB_USER and DB_PASSWORD. The dump's own database is never touched
+'''
+
+import os
+import statistics
+import sys
+import time
+from mysql import connector
+from dotenv import load_dotenv
+
+REPO_ROOT = os.path.join(os.path.dirname(__file__), '..', '..', '..')
+DUMP_PATH = os.path.join(REPO_ROOT, 'd2-stats-dump.sql')
+MIGRATION_PATH = os.path.join(REPO_ROOT, 'prisma', 'migrations', '20261017000000_added_api_access_indexes', 'migration.sql')
+BENCH_DB = 'signature_index_bench'
+ID_OFFSET = 10 ** 12  # added per copy to every unique id so copied rows never collide
+
+STATS_COLS = "s.character_id, s.activity_id, s.instance_id, s.activity_name, s.weapon_id, s.weapon_name, s.kills, s.precision_kills, s.precision_kills_percent, s.character_class"
+
+# the statements behind the API endpoints, filled with values picked from the loaded data. Stats are read one
+# character at a time, several characters are merged with UNION ALL
+QUERIES = {
+    "player by username": "SELECT * FROM `Player` WHERE bng_username = %(username)s",
+    "activities by mode": "SELECT activity_id FROM `Activity` WHERE type = %(mode)s",
+    "character stats page": (
+        f"SELECT {STATS_COLS} FROM `Activity_Stats` s WHERE s.character_id = %(character_id)s ORDER BY s.instance_id, s.weapon_id LIMIT 25"
+    ),
+    "character stats next page": (
+        f"SELECT {STATS_COLS} FROM `Activity_Stats` s WHERE s.character_id = %(character_id)s"
+        " AND (s.instance_id > %(after)s OR (s.instance_id = %(after)s AND s.weapon_id > 0)) ORDER BY s.instance_id, s.weapon_id LIMIT 25"
+    ),
+    "stats by activity name": (
+        f"SELECT {STATS_COLS} FROM `Activity_Stats` s WHERE s.character_id = %(character_id)s AND s.activity_name = %(activity_name)s"
+        " ORDER BY s.instance_id, s.weapon_id LIMIT 25"
+    ),
+    "stats by mode": (
+        f"SELECT {STATS_COLS} FROM `Activity_Stats` s JOIN `Activity` a ON a.activity_id = s.activity_id"
+        " WHERE s.character_id = %(character_id)s AND a.type = %(mode)s ORDER BY s.instance_id, s.weapon_id LIMIT 25"
+    ),
+    "player stats page": (
+        f"(SELECT {STATS_COLS} FROM `Activity_Stats` s WHERE s.character_id = %(character_id)s ORDER BY s.instance_id, s.weapon_id LIMIT 25)"
+        f" UNION ALL (SELECT {STATS_COLS} FROM `Activity_Stats` s WHERE s.character_id = %(other_character_id)s ORDER BY s.instance_id, s.weapon_id LIMIT 25)"
+        " ORDER BY instance_id, weapon_id LIMIT 25"
+    ),
+}
+
+def sql_statements(path: str) -> list[str]:
+    """
+    Statements of a mysqldump or migration file, one per ";" line ending, without comments
+    """
+    statements = []
+    statement = []
+    with open(path, encoding='utf-8') as sql_file:
+        for line in sql_file:
+            if line.startswith('--') or not line.strip():
+                continue
+
+            statement.append(line)
+            if line.rstrip().endswith(';'):
+                statements.append(''.join(statement).strip().rstrip(';'))
+                statement = []
+
+    return statements
+
+def load_dump(cursor, scale: int) -> None:
+    cursor.execute(f"DROP DATABASE IF EXISTS `{BENCH_DB}`")
+    cursor.execute(f"CREATE DATABASE `{BENCH_DB}`")
+    cursor.execute(f"USE `{BENCH_DB}`")
+
+    for statement in sql_statements(DUMP_PATH):
+        # the dump creates and switches to its own database, keep everything in the scratch one
+        if statement.startswith(('CREATE DATABASE', 'USE ')):
+            continue
+        cursor.execute(statement)
+
+    # copies of every player and their stat history, so lookups have to get past many rows that do not match
+    for copy in range(1, scale):
+        offset = copy * ID_OFFSET
+        cursor.execute(
+            "INSERT INTO `Player`(destiny_id, bng_id, bng_username, date_created, date_last_played, platform, character_ids)"
+            f" SELECT destiny_id + {offset}, bng_id + {offset}, CONCAT(bng_username, '-', {copy}), date_created, date_last_played, platform, CONCAT(character_ids, '-', {copy})"
+            " FROM `Player` WHERE destiny_id < %s",
+            (ID_OFFSET,)
+        )
+        cursor.execute(
+            "INSERT INTO `Activity_Stats` SELECT character_id, activity_id, instance_id + %s, activity_name, weapon_id, weapon_name, kills,"
+            " precision_kills, precision_kills_percent, character_class FROM `Activity_Stats` WHERE instance_id < %s",
+            (offset, ID_OFFSET)
+        )
+    cursor.execute("ANALYZE TABLE `Player`, `Activity`, `Activity_Stats`")
+
+def pick_params(cursor) -> dict:
+    """
+    Values for QUERIES taken from the busiest character in the loaded data
+    """
+    cursor.execute(
+        "SELECT c.player_id, c.character_id, MIN(s.instance_id), MAX(s.activity_name) FROM `Activity_Stats` s"
+        " JOIN `Character` c ON c.character_id = s.character_id GROUP BY c.character_id ORDER BY COUNT(*) DESC LIMIT 1"
+    )
+    player_id, character_id, after, activity_name = cursor.fetchone()
+    cursor.execute("SELECT character_id FROM `Character` WHERE player_id = %s AND character_id <> %s LIMIT 1", (player_id, character_id))
+    other = cursor.fetchone()
+    cursor.execute("SELECT bng_username FROM `Player` WHERE player_id = %s", (player_id,))
+    username = cursor.fetchone()[0]
+    cursor.execute("SELECT type FROM `Activity` GROUP BY type ORDER BY COUNT(*) DESC LIMIT 1")
+    mode = cursor.fetchone()[0]
+
+    return {
+        "username": username,
+        "mode": mode,
+        "character_id": character_id,
+        "other_character_id": other[0] if other else character_id,
+        "after": after,
+        "activity_name": activity_name
+    }
+
+def measure(cursor, params: dict, runs: int) -> dict:
+    results = {}
+    for name, query in QUERIES.items():
+        cursor.execute("EXPLAIN " + query, params)
+        columns = [column[0] for column in cursor.description]
+        plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            cursor.execute(query, params)
+            cursor.fetchall()
+            timings.append(time.perf_counter() - start)
+
+        results[name] = {
+            "plan": ", ".join(f"{step['table']}:{step['type']}/{step['key'] or '-'}/{step['rows']}" for step in plan),
+            "median_ms": round(statistics.median(timings) * 1000, 3)
+        }
+
+    return results
+
+def benchmark(cursor, scale: int, runs: int) -> tuple[dict, dict]:
+    load_dump(cursor, scale)
+    params = pick_params(cursor)
+
+    before = measure(cursor, params, runs)
+    for statement in sql_statements(MIGRATION_PATH):
+        cursor.execute(statement)
+    cursor.execute("ANALYZE TABLE `Player`, `Activity`, `Activity_Stats`")
+    after = measure(cursor, params, runs)
+
+    return before, after
+
+def main():
+    load_dotenv()
+    args = sys.argv[1:]
+    scale = int(args[args.index('--scale') + 1]) if '--scale' in args else 50
+    runs = int(args[args.index('--runs') + 1]) if '--runs' in args else 20
+
+    db = connector.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(os.getenv('DB_PORT', 3306)),
+        user=os.getenv('DB_USER', 'root'),
+        password=os.getenv('DB_PASSWORD', 'pass'),
+        autocommit=True
+    )
+    cursor = db.cursor(buffered=True)
+    try:
+        before, after = benchmark(cursor, scale, runs)
+    finally:
+        if '--keep' not in args:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{BENCH_DB}`")
+        db.close()
+
+    print(f"{'query':<28}{'before ms':>11}{'after ms':>10}  plan (table:access/key/rows)")
+    for name in QUERIES:
+        print(f"{name:<28}{before[name]['median_ms']:>11}{after[name]['median_ms']:>10}")
+        print(f"{'':<28}before  {before[name]['plan']}")
+        print(f"{'':<28}after   {after[name]['plan']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from functools import lru_cache
 
 from backend.load.connector import SQLConnector
 from backend.data.bng_data import BungieData
@@ -15,6 +16,92 @@ class Command(ABC):
     def set_command(self):
         pass
 
+def sql_value(value):
+    """
+    Parameter value for a column. Lists and dicts are stored as their text form, like character_ids
+    """
+    if isinstance(value, (list, tuple, dict, set)):
+        return str(value)
+    return value
+
+@lru_cache(maxsize=256)
+def insert_statement(table_name: str, columns: tuple[str, ...], rows: int=1) -> str:
+    """
+    INSERT statement text for rows rows of columns, with a %s placeholder per value
+    """
+    row = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    return f"INSERT INTO {table_name}({', '.join(columns)}) VALUES" + ", ".join([row] * rows)
+
+# the unique key every ingested table is deduplicated on, besides its auto increment id
+NATURAL_KEYS: dict[str, tuple[str, ...]] = {
+    "Player": ("destiny_id",),
+    "Character": ("bng_character_id",),
+    "Weapon": ("bng_weapon_id",),
+    "Armor": ("bng_armor_id",),
+    "Activity": ("bng_activity_id",),
+    "Activity_Stats": ("weapon_id", "character_id", "instance_id"),
+    "Equipped_Weapons": ("character_id", "weapon_id"),
+    "Equipped_Armor": ("character_id", "armor_id"),
+}
+
+# the auto increment id other tables reference, for the tables with a single column natural key
+SURROGATE_KEYS: dict[str, str] = {
+    "Player": "player_id",
+    "Character": "character_id",
+    "Weapon": "weapon_id",
+    "Armor": "armor_id",
+    "Activity": "activity_id",
+}
+
+def natural_key(table_name: str) -> tuple[str, ...]:
+    """
+    Natural key columns of a table, whether or not its name is quoted. Raises ValueError for tables without one
+    """
+    key = NATURAL_KEYS.get(table_name.strip("`"))
+    if key is None:
+        raise ValueError(f"No natural key known for {table_name}")
+    return key
+
+@lru_cache(maxsize=256)
+def upsert_statement(table_name: str, columns: tuple[str, ...], update_columns: tuple[str, ...]=()) -> str:
+    """
+    INSERT statement text for one row of columns that does not fail on an existing key. The existing row has its
+    update_columns overwritten, or is left alone if there are none
+    """
+    if not update_columns:
+        return insert_statement(table_name, columns).replace("INSERT INTO", "INSERT IGNORE INTO", 1)
+
+    return insert_statement(table_name, columns) + " ON DUPLICATE KEY UPDATE " + ", ".join(f"{k} = VALUES({k})" for k in update_columns)
+
+@lru_cache(maxsize=256)
+def key_select_statement(table_name: str, fields: tuple[str, ...], key: tuple[str, ...], rows: int) -> str:
+    """
+    SELECT statement text for fields of every row whose key is one of rows key values
+    """
+    if len(key) == 1:
+        return f"SELECT {', '.join(fields)} FROM {table_name} WHERE {key[0]} IN (" + ", ".join(["%s"] * rows) + ")"
+
+    row = "(" + ", ".join(["%s"] * len(key)) + ")"
+    return f"SELECT {', '.join(fields)} FROM {table_name} WHERE ({', '.join(key)}) IN (" + ", ".join([row] * rows) + ")"
+
+@lru_cache(maxsize=256)
+def select_statement(table_name: str, fields: tuple[str, ...], conditions: tuple[str, ...]) -> str:
+    """
+    SELECT statement text for fields (every column if empty), filtered by equality on each column of conditions
+    """
+    query = f"SELECT {', '.join(fields) if fields else '*'} FROM {table_name}"
+    if conditions:
+        query += " WHERE " + " AND ".join(f"{k} = %s" for k in conditions)
+    return query
+
+@lru_cache(maxsize=256)
+def update_statement(table_name: str, columns: tuple[str, ...], conditions: tuple[str, ...]) -> str:
+    return f"UPDATE {table_name} SET " + ", ".join(f"{k} = %s" for k in columns) + " WHERE " + " AND ".join(f"{k} = %s" for k in conditions)
+
+@lru_cache(maxsize=256)
+def delete_statement(table_name: str, conditions: tuple[str, ...]) -> str:
+    return f"DELETE FROM {table_name} WHERE " + " AND ".join(f"{k} = %s" for k in conditions)
+
 class InsertCommand(Command):
     """
     Insert command, handles adding rows to the given table. Allows for multiple rows to be added
@@ -28,26 +115,15 @@ class InsertCommand(Command):
         """
         Executes an insert query based on the class' attributes.
         """
-        query = f"INSERT INTO {self.__table_name}("  # construct base query by populating the column names
-        for k in self.__data[0].keys():
-            query += f"{k}, "
-
-        query = f"{query[:-2]}) VALUES"
-
-        for value in self.__data:  # populate the query with all rows in the data list
-            query += "("
-            for attr in value.values():
-                if isinstance(attr, float) or isinstance(attr, int):
-                    query += f"{attr}, "
-                else:
-                    query += f'"{attr}", '
-            else:
-                query = f"{query[:-2]}), "
-        else:
-            query = f"{query[:-2]}"
-        
+        columns = tuple(self.__data[0].keys())
+        if not columns:
+            return False
+
+        query = insert_statement(self.__table_name, columns, len(self.__data))
+        params = tuple(sql_value(value) for row in self.__data for value in row.values())
+
         print(query)  # print to debug
-        self.__obj.execute(query)  # execute
+        return self.__obj.execute(query, params, prepared=True)  # execute
 
     def set_command(self, table_name: str, data: BungieData) -> None:
         """
@@ -71,27 +147,11 @@ class SelectCommand(Command):
         """
         Executes the select query based on the given class' attributes
         """
-        query = "SELECT "
-        if self.__fields:
-            for field in self.__fields:
-                query += f"{field}, "
-            else:
-                query = f"{query[:-2]} FROM {self.__table_name}"
-        else:
-            query += f"* FROM {self.__table_name}"
-
-        if self.__conditions:
-            query += " WHERE "
-            for k, v, in self.__conditions.items():
-                if isinstance(v, int) or isinstance(v, float):
-                    query += f"{k} = {v}"
-                else:
-                    query += f'{k} = "{v}"'
-                query += " AND "
-            query = query[:-5]  # remove last AND
+        query = select_statement(self.__table_name, tuple(self.__fields), tuple(self.__conditions.keys()))
+        params = tuple(self.__conditions.values())
 
         print(query)
-        result = self.__obj.execute(query)
+        result = self.__obj.execute(query, params, prepared=True)
         return result
 
     def set_command(self, table_name: str, fields: list[str], condition: dict) -> None:
@@ -115,12 +175,9 @@ class DeleteCommand(Command):
         """
         Executes the delete command based on the class' attributes
         """
-        query = "DELETE FROM " + self.__table_name + " WHERE "
-        for key, value in self.__data.items():
-            query += key + " = " + str(value) + " AND "
-        query = query[:-5]
+        query = delete_statement(self.__table_name, tuple(self.__data.keys()))
         print(query)
-        return self.__obj.execute(query)
+        return self.__obj.execute(query, tuple(self.__data.values()))
 
     def set_command(self):
         """
@@ -128,5 +185,5 @@ class DeleteCommand(Command):
         """
         self.__table_name = input("Enter the name of the table you want to delete from: ")
 
-        condition = input("Enter the column and its value for the delete condition, separate by a semicolon (;). Include \"\" for any TEXT data types!: ")
+        condition = input("Enter the column and its value for the delete condition, separate by a semicolon (;): ")
         self.__data[condition.split(";")[0]] = condition.split(";")[1]
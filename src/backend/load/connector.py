@@ -1,38 +1,182 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from queue import LifoQueue, Empty
 from mysql import connector
+from mysql.connector.errors import InterfaceError, OperationalError
+
+from backend.cache import LRUCache
+
+# client errors meaning the server dropped the connection, e.g. Cloud SQL closing it after sitting idle
+CONNECTION_LOST_ERRNOS = {
+    2006,  # CR_SERVER_GONE_ERROR
+    2013,  # CR_SERVER_LOST
+    2055,  # CR_SERVER_LOST_EXTENDED
+}
+
+class HeldConnection:
+    """
+    The connection a thread or asyncio task has checked out, and whether it is inside a transaction
+    """
+    def __init__(self, db) -> None:
+        self.db = db
+        self.transaction = False
 
 class SQLConnector:
     """
-    Utility class that creates a MySQL database connection. Allows for executing queries, as well as commits and rollbacks
+    Utility class that manages a pool of MySQL database connections. Allows for executing queries, as well as commits and rollbacks.
+    Every statement checks a connection out of the pool, so concurrent requests never share a cursor
     """
-    def __init__(self, db_name: str, port: int, user: str="root", password: str="pass", host: str="localhost", unix: str="") -> None:
+    def __init__(self, db_name: str, port: int, user: str="root", password: str="pass", host: str="localhost", unix: str="", pool_size: int=5, checkout_timeout: float=10.0, health_check_interval: float=30.0, statement_cache_size: int=64) -> None:
+        self.__connect_args = {
+            "host": host,
+            "user": user,
+            "password": password,
+            "database": db_name,
+            "port": port
+        }
         if unix:
-            self.db = connector.connect(
-                host=host,
-                user=user,
-                password=password,
-                database=db_name,
-                port = port,
-                unix_socket=unix
-            )
-        else:
-            self.db = connector.connect(
-                host=host,
-                user=user,
-                password=password,
-                database=db_name,
-                port = port
-            )
-
-    def execute(self, query: str, params=None):
-        cursor = self.db.cursor(buffered=True)
+            self.__connect_args["unix_socket"] = unix
+
+        self.__pool_size = pool_size
+        self.__checkout_timeout = checkout_timeout
+        self.__health_check_interval = health_check_interval  # seconds a connection may sit idle before it is pinged
+
+        self.__idle: LifoQueue = LifoQueue(maxsize=pool_size)
+        self.__opened = 0
+        self.__checkouts = 0
+        self.__reconnects = 0
+        self.__lock = threading.Lock()
+        self.__held: ContextVar[Optional[HeldConnection]] = ContextVar(f"held_connection_{id(self)}", default=None)
+        self.__statement_cache_size = statement_cache_size  # prepared statements kept per connection
+        self.__prepared: dict[int, LRUCache] = {}
+
+        # open the first connection straight away so bad settings fail at start-up
+        self.db = self.__connect()
+        self.__opened = 1
+        self.__idle.put((self.db, time.monotonic()))
+
+    def __connect(self):
+        return connector.connect(**self.__connect_args)
 
+    def __checkout(self):
+        """
+        Take an idle connection, opening a new one while the pool is below pool_size. Waits up to checkout_timeout otherwise
+        """
+        try:
+            db, last_used = self.__idle.get_nowait()
+        except Empty:
+            with self.__lock:
+                can_open = self.__opened < self.__pool_size
+                if can_open:
+                    self.__opened += 1
+            if can_open:
+                try:
+                    db = self.__connect()
+                except Exception:
+                    with self.__lock:
+                        self.__opened -= 1
+                    raise
+                last_used = time.monotonic()
+            else:
+                try:
+                    db, last_used = self.__idle.get(timeout=self.__checkout_timeout)
+                except Empty:
+                    raise TimeoutError(f"No database connection free after {self.__checkout_timeout}s, all {self.__pool_size} are checked out")
+
+        with self.__lock:
+            self.__checkouts += 1
+
+        if time.monotonic() - last_used > self.__health_check_interval:
+            db = self.__health_check(db)
+        return db
+
+    def __checkin(self, db) -> None:
+        self.__idle.put((db, time.monotonic()))
+
+    def __health_check(self, db):
+        """
+        Ping a connection that sat idle, reconnecting if the server dropped it. A connection that cannot be revived is replaced
+        """
+        try:
+            db.ping(reconnect=True, attempts=2, delay=0.5)
+            return db
+        except (InterfaceError, OperationalError):
+            return self.__replace(db)
+
+    def __replace(self, db):
+        with self.__lock:
+            self.__prepared.pop(id(db), None)
+        try:
+            db.close()
+        except Exception:
+            pass
+
+        with self.__lock:
+            self.__reconnects += 1
+        return self.__connect()
+
+    @contextmanager
+    def connection(self):
+        """
+        Check a connection out for the duration of the block. Nested blocks in the same thread or asyncio task reuse the connection already held
+        """
+        held = self.__held.get()
+        if held is not None:
+            yield held.db
+            return
+
+        held = HeldConnection(self.__checkout())
+        token = self.__held.set(held)
+        try:
+            yield held.db
+        finally:
+            self.__held.reset(token)
+            # a statement may have swapped in a fresh connection after a dropped one, check in whichever is held now
+            self.__checkin(held.db)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Unit of work: every statement in the block runs on one connection and is committed once when the block exits,
+        or rolled back together if it raises. A failing statement only undoes itself and returns False, like outside a
+        transaction. Nested transactions join the outer one
+        """
+        held = self.__held.get()
+        if held is not None and held.transaction:
+            yield self
+            return
+
+        with self.connection():
+            held = self.__held.get()
+            held.transaction = True
+            try:
+                yield self
+            except BaseException:
+                self.__rollback(held.db)
+                raise
+            else:
+                held.db.commit()
+                print("Transaction committed\n")
+            finally:
+                held.transaction = False
+
+    def execute(self, query: str, params=None, prepared: bool=False, return_id: bool=False):
+        """
+        Run a statement with %s placeholders filled from params. prepared reuses a server-side prepared statement per
+        connection, for statements the load layer runs over and over. With return_id a write that generated an
+        AUTO_INCREMENT id returns that id instead of True
+        """
         if params is None:
             params = []
 
-        try:
+        def statement(cursor):
             cursor.execute(query, params)
 
-            if query.startswith("SELECT"):
+            # decided by whether a result set came back, so parenthesised UNIONs and WITH queries are read too
+            if cursor.with_rows:
                 result = cursor.fetchall()
                 if result:
                     return result
@@ -41,19 +185,142 @@ class SQLConnector:
 
             print(query)
             print("Query executed successfully\n")
-            self.commit()
+            if return_id and cursor.lastrowid:
+                return cursor.lastrowid
             return True
-        except Exception as e:
-            self.rollback()
-            print(f"{e}")
-            print("Query execution failed\n")
-            return False
+
+        if prepared:
+            return self.__run(query, lambda db: self.__prepared_cursor(db, query), statement)
+        return self.__run(query, lambda db: db.cursor(buffered=True), statement)
+
+    def execute_many(self, query: str, rows: list[tuple]) -> bool:
+        """
+        Run one INSERT for every parameter tuple of rows. mysql.connector folds them into a single multi-row statement,
+        so the whole batch is one round trip and one commit
+        """
+        def statement(cursor):
+            cursor.executemany(query, rows)
+            print(f"{query} x{len(rows)}")
+            print("Query executed successfully\n")
+            return True
+
+        return self.__run(query, lambda db: db.cursor(buffered=True), statement)
+
+    def __run(self, query: str, make_cursor, statement):
+        """
+        Run statement on a cursor of the held connection. Writes are committed straight away unless a transaction is open.
+        Failed statements return False, a dropped connection is replaced and the statement retried once
+        """
+        with self.connection():
+            held = self.__held.get()
+            for attempt in range(2):
+                cursor = make_cursor(held.db)
+
+                try:
+                    result = statement(cursor)
+                    if not held.transaction and not cursor.with_rows:
+                        held.db.commit()
+                    return result
+                except (InterfaceError, OperationalError) as e:
+                    self.__drop_prepared(held.db, query)
+                    if e.errno in CONNECTION_LOST_ERRNOS:
+                        if held.transaction:
+                            # the server already threw away the transaction's earlier writes, so the whole unit has to fail
+                            raise
+                        if attempt == 0:
+                            # the statement never reached the server, run it again on a fresh connection
+                            print(f"{e}, reconnecting")
+                            held.db = self.__replace(held.db)
+                            continue
+
+                    self.__fail(held, e)
+                    return False
+                except Exception as e:
+                    self.__drop_prepared(held.db, query)
+                    self.__fail(held, e)
+                    return False
+
+    def __fail(self, held: "HeldConnection", e: Exception) -> None:
+        # inside a transaction MySQL has already undone just the failed statement, the rest of the unit stays
+        if not held.transaction:
+            self.__rollback(held.db)
+        print(f"{e}")
+        print("Query execution failed\n")
+
+    def __prepared_cursor(self, db, query: str):
+        """
+        The prepared cursor of query on db. A connection is only used by whoever checked it out, so its cursors are too
+        """
+        with self.__lock:
+            cursors = self.__prepared.get(id(db))
+            if cursors is None:
+                # an evicted statement is closed so the server frees it, rather than holding it for the connection's life
+                cursors = self.__prepared[id(db)] = LRUCache(self.__statement_cache_size, on_evict=lambda query, cursor: close_cursor(cursor))
+
+        cursor = cursors.get(query)
+        if cursor is None:
+            cursor = db.cursor(prepared=True)
+            cursors.put(query, cursor)
+        return cursor
+
+    def __drop_prepared(self, db, query: str) -> None:
+        cursors = self.__prepared.get(id(db))
+        if cursors is not None:
+            cursor = cursors.pop(query)
+            if cursor is not None:
+                close_cursor(cursor)
+
+    def __rollback(self, db) -> None:
+        try:
+            db.rollback()
+        except (InterfaceError, OperationalError):
+            pass
 
     def commit(self) -> None:
-        self.db.commit()
+        """
+        Commit the work of the current transaction so far, the transaction carries on
+        """
+        self.__transaction_held("commit").db.commit()
 
     def rollback(self) -> None:
-        self.db.rollback()
+        """
+        Undo the work of the current transaction so far, the transaction carries on
+        """
+        self.__transaction_held("rollback").db.rollback()
+
+    def __transaction_held(self, action: str) -> "HeldConnection":
+        # outside a transaction every statement has already been committed or rolled back on its own connection
+        held = self.__held.get()
+        if held is None or not held.transaction:
+            raise RuntimeError(f"Cannot {action} outside a transaction")
+        return held
+
+    def close(self) -> None:
+        """
+        Close every idle connection
+        """
+        while True:
+            try:
+                db, _ = self.__idle.get_nowait()
+            except Empty:
+                break
+            try:
+                db.close()
+            except Exception:
+                pass
+            with self.__lock:
+                self.__opened -= 1
+                self.__prepared.pop(id(db), None)
+
+    @property
+    def pool_stats(self) -> dict:
+        return {
+            "size": self.__pool_size,
+            "opened": self.__opened,
+            "idle": self.__idle.qsize(),
+            "checkouts": self.__checkouts,
+            "reconnects": self.__reconnects
+        }
 
     def retrieve_all(self, table_name: str):
         """
@@ -64,6 +331,15 @@ class SQLConnector:
         if result:
             return result
 
+def close_cursor(cursor) -> None:
+    """
+    Close a cursor, ignoring a connection that is already gone
+    """
+    try:
+        cursor.close()
+    except Exception:
+        pass
+
 # def main():
 #     db = SQLConnector("test", 33061)
 #     sql = "SELECT * FROM Armor"
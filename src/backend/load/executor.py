@@ -1,58 +1,195 @@
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+from backend.cache import LRUCache
 from backend.load.connector import SQLConnector
-from backend.load.commands import InsertCommand, SelectCommand
+from backend.load.commands import SURROGATE_KEYS, insert_statement, select_statement, update_statement, delete_statement, upsert_statement, key_select_statement, natural_key, sql_value
 from backend.data.bng_data import BungieData
 
+INSERT_BATCH_SIZE = 500  # rows per multi-row INSERT
+ID_CACHE_SIZE = 50000  # natural key to surrogate id entries shared by every manager
+
+class UpsertResult:
+    """
+    Rows an upsert wrote as new, rows whose key already existed, and rows that could not be written
+    """
+    def __init__(self) -> None:
+        self.new: list[BungieData] = []
+        self.existing: list[BungieData] = []
+        self.failed: list[BungieData] = []
+
+    def __bool__(self) -> bool:
+        return not self.failed
+
+    def __repr__(self) -> str:
+        return f"UpsertResult(new={len(self.new)}, existing={len(self.existing)}, failed={len(self.failed)})"
+
 class DatabaseExecutor:
     """
     Handles executing basic queries on the D2 stats database. 
     """
-    def __init__(self, db: SQLConnector) -> None:
+    def __init__(self, db: SQLConnector, id_cache_size: int=ID_CACHE_SIZE) -> None:
         self.__db = db
-        self.__insert_command: InsertCommand = InsertCommand(db)
-        self.__select_command: SelectCommand = SelectCommand(db)
+        self.__ids = LRUCache(id_cache_size)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run every query in a with block as one unit of work, committed once on exit and rolled back if it raises
+        """
+        try:
+            with self.__db.transaction():
+                yield self
+        except BaseException:
+            # ids cached inside the unit may belong to rows that were just rolled back
+            self.__ids.clear()
+            raise
+
+    def resolve_ids(self, table_name: str, natural_ids: Iterable, batch_size: int=INSERT_BATCH_SIZE) -> dict:
+        """
+        Map natural ids, like bng_weapon_id, to the surrogate ids of the rows stored for them. Cached ids are reused,
+        the rest are looked up with one IN query per batch and cached. Ids with no stored row are left out
+        """
+        key = natural_key(table_name)
+        surrogate = SURROGATE_KEYS[table_name.strip("`")]
+        table = table_name.strip("`")
+
+        resolved = {}
+        missing = []
+        for natural_id in dict.fromkeys(natural_ids):
+            id = self.__ids.get((table, str(natural_id)))
+            if id is None:
+                missing.append(natural_id)
+            else:
+                resolved[natural_id] = id
+
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            found = self.__db.execute(key_select_statement(table_name, (key[0], surrogate), key, len(batch)), tuple(batch))
+            if found:
+                ids = {str(natural_id): id for natural_id, id in found}  # type: ignore
+                for natural_id in batch:
+                    if str(natural_id) in ids:
+                        resolved[natural_id] = ids[str(natural_id)]
+                        self.__ids.put((table, str(natural_id)), ids[str(natural_id)])
+
+        return resolved
+
+    def resolve_id(self, table_name: str, natural_id) -> Optional[int]:
+        return self.resolve_ids(table_name, [natural_id]).get(natural_id)
+
+    @property
+    def id_cache_stats(self) -> dict:
+        return self.__ids.stats
 
     def insert_row(self, table_name: str, data: BungieData):
         """
-        Insert row(s) into a table
+        Insert a row into a table
+        """
+        # built per call, the executor is shared by every worker thread of the API
+        query = insert_statement(table_name, tuple(data.data.keys()))
+        return self.__db.execute(query, tuple(sql_value(value) for value in data.data.values()), prepared=True)
+
+    def upsert_rows(self, table_name: str, rows: list[BungieData], update: bool=True, batch_size: int=INSERT_BATCH_SIZE) -> UpsertResult:
+        """
+        Write rows in batches without failing on ones whose natural key already exists. Existing rows get their other
+        columns overwritten, or are left as they are if update is False. Each batch is one keyed SELECT, to tell new
+        rows from existing ones, and one multi-row INSERT. The surrogate ids of new rows are cached for resolve_ids, from
+        the insert itself for a single row, or with one keyed lookup per batch
         """
-        self.__insert_command.set_command(table_name, data)
-        self.__insert_command.execute()
+        key = natural_key(table_name)
+        table = table_name.strip("`")
+        surrogate = SURROGATE_KEYS.get(table) if len(key) == 1 else None
+        result = UpsertResult()
+
+        shapes: dict[tuple, list[BungieData]] = {}
+        for row in rows:
+            if row.data:
+                shapes.setdefault(tuple(row.data.keys()), []).append(row)
+
+        for columns, shape_rows in shapes.items():
+            update_columns = tuple(column for column in columns if column not in key) if update else ()
+            query = upsert_statement(table_name, columns, update_columns)
+            for start in range(0, len(shape_rows), batch_size):
+                batch = shape_rows[start:start + batch_size]
+                existing = self.__existing_keys(table_name, key, batch) if set(key) <= set(columns) else set()
+
+                values = [tuple(sql_value(value) for value in row.data.values()) for row in batch]
+                if len(batch) == 1:
+                    outcome = self.__db.execute(query, values[0], prepared=True, return_id=True)
+                    written = batch if outcome else []
+                    if not outcome:
+                        result.failed.extend(batch)
+                    elif surrogate and outcome is not True and self.__row_key(batch[0], key) not in existing:
+                        self.__ids.put((table, str(batch[0].data[key[0]])), outcome)
+                elif self.__db.execute_many(query, values):
+                    written = batch
+                else:
+                    # a row the batch could not take, e.g. one with a missing foreign key, should not hold back the rest
+                    written = []
+                    for row, row_values in zip(batch, values):
+                        if self.__db.execute(query, row_values, prepared=True):
+                            written.append(row)
+                        else:
+                            result.failed.append(row)
+
+                new_rows = []
+                for row in written:
+                    if self.__row_key(row, key) in existing:
+                        result.existing.append(row)
+                    else:
+                        new_rows.append(row)
+                result.new.extend(new_rows)
+
+                if surrogate and new_rows:
+                    # ids already cached, like a single row's from its insert, are not looked up again
+                    self.resolve_ids(table_name, [row.data[key[0]] for row in new_rows], batch_size)
+
+        print(f"Upserted {table_name}: {len(result.new)} new, {len(result.existing)} existing, {len(result.failed)} failed")
+        return result
+
+    def __existing_keys(self, table_name: str, key: tuple[str, ...], rows: list[BungieData]) -> set[tuple]:
+        keys = list(dict.fromkeys(tuple(sql_value(row.data[column]) for column in key) for row in rows))
+        surrogate = SURROGATE_KEYS.get(table_name.strip("`"))
+        fields = key + (surrogate,) if surrogate else key
+        found = self.__db.execute(key_select_statement(table_name, fields, key, len(keys)), tuple(value for row_key in keys for value in row_key))
+        if not found:
+            return set()
+
+        existing = set()
+        for row in found:  # type: ignore
+            existing.add(tuple(str(value) for value in row[:len(key)]))
+            if surrogate:
+                # the lookup already paid for the ids of stored rows, keep them for resolve_ids
+                self.__ids.put((table_name.strip("`"), str(row[0])), row[-1])
+
+        return existing
+
+    @staticmethod
+    def __row_key(row: BungieData, key: tuple[str, ...]) -> tuple:
+        # compared as text, ids can come back from the database as a different int type than the Bungie data holds
+        return tuple(str(row.data[column]) for column in key)
 
     def select_rows(self, table_name: str, fields: list[str], condition: dict):
         """
         Retrieve rows or sepcfifc columns of a row from a table
         """
-        self.__select_command.set_command(table_name, fields, condition)
-        return self.__select_command.execute()
+        query = select_statement(table_name, tuple(fields), tuple(condition.keys()))
+        return self.__db.execute(query, tuple(condition.values()), prepared=True)
 
     def update_row(self, table_name: str, data: dict, conditions: dict):
         """
         Update a row in a table
         """
-        query = "UPDATE " + table_name + " SET "
-        for key, value in data.items():
-            if isinstance(value, str):
-                query += key + " = '" + value + "', "
-            else:
-                query += key + " = " + str(value) + ", "
-        
-        query = query[:-2] + " WHERE "
-        for key, value in conditions.items():
-            query += key + " = " + str(value) + " AND "
-        query = query[:-5]
-
-        return self.__db.execute(query)
+        query = update_statement(table_name, tuple(data.keys()), tuple(conditions.keys()))
+        return self.__db.execute(query, (*map(sql_value, data.values()), *conditions.values()))
 
     def delete_row(self, table_name: str, conditions: dict):
         """
         Delete a row from a table
         """
-        query = "DELETE FROM " + table_name + " WHERE "
-        for key, value in conditions.items():
-            query += key + " = " + str(value) + " AND "
-        query = query[:-5]
-        
-        return self.__db.execute(query)
+        query = delete_statement(table_name, tuple(conditions.keys()))
+        return self.__db.execute(query, tuple(conditions.values()))
 
     def retrieve_all(self, table_name: str):
         return self.__db.retrieve_all(table_name)
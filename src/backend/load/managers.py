@@ -1,8 +1,11 @@
 from typing import Optional
 from time import sleep
+from datetime import date, timedelta
 from dotenv import load_dotenv
 import os
+import threading
 
+from backend.cache import LRUCache
 from backend.extract.bng_api_connector import BungieConnector
 from backend.load.executor import DatabaseExecutor
 from backend.load.connector import SQLConnector
@@ -24,17 +27,61 @@ load_dotenv()
 
 BNG_CONN = BungieConnector(os.getenv("X_API_KEY"))
 
+# entities the managers keep between requests, keyed by Bungie id. Manifest definitions never go stale, while profile
+# data and match reports are re-fetched from Bungie once they expire
+DEFINITION_CACHE_SIZE = 10000
+PROFILE_CACHE_SIZE = 5000
+PROFILE_CACHE_TTL = 60 * 60  # seconds
+INSTANCE_CACHE_SIZE = 1000
+INSTANCE_CACHE_TTL = 30 * 60  # seconds
+
 class DatabasePlayerManager:
     def __init__(self, db_control: DatabaseExecutor) -> None:
         self.__control: DatabaseExecutor = db_control
-        self.__players: list[PlayerData] = []
+        self.__players = LRUCache(PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL)  # destiny id -> PlayerData
     
-    def read_data(self) -> None:
+    def read_data(self, refresh_stale_after: Optional[int]=None) -> Optional[threading.Thread]:
+        """
+        Index every stored player straight from their Player row, one query and no Bungie requests. With
+        refresh_stale_after, players whose row says they last played more than that many days ago are re-fetched from
+        Bungie on a background thread, which is returned
+        """
         db_data = self.__control.retrieve_all("`Player`")
         
+        stale = []
         if db_data:
-            for tuple in db_data:
-                self.add_existing_player(tuple)
+            cutoff = str(date.today() - timedelta(days=refresh_stale_after)) if refresh_stale_after is not None else ""
+            for row in db_data:
+                player = self.hydrate_player(row)
+                if player.data.get("date_last_played", "") < cutoff:
+                    stale.append(player)
+
+        if stale:
+            refresh = threading.Thread(target=self.refresh_players, args=(stale,), name="player-refresh", daemon=True)
+            refresh.start()
+            return refresh
+
+    def hydrate_player(self, row) -> PlayerData:
+        player = PlayerData(BNG_CONN, row[1], PLATFORM[row[6]].value)  # type: ignore
+        player.define_data_from_db(row)
+        self.__players.put(row[1], player)
+        return player
+
+    def refresh_players(self, players: list[PlayerData]) -> None:
+        """
+        Re-fetch players from Bungie, writing back and re-indexing the ones Bungie still knows
+        """
+        for player in players:
+            fresh_player = PlayerData(BNG_CONN, player._id, player._type)
+            try:
+                fresh_player.define_data()
+            except Exception as e:
+                print(f"Could not refresh player {player._id}: {e}")
+                continue
+
+            if fresh_player.data:
+                self.__players.put(player._id, fresh_player)
+                self.__control.upsert_rows("`Player`", [fresh_player])
 
     def update_date_last_played(self, member_id: int, platform: int):
         player = PlayerData(BNG_CONN, member_id, platform)
@@ -61,10 +108,9 @@ class DatabasePlayerManager:
         if resp:
             member_id = int(resp[0]["membershipId"])
             player = DataFactory.get_player(member_id, platform)
-            if player not in self.__players:
-                self.__players.append(player)
+            self.__players.put(member_id, player)
             
-            self.__control.insert_row("`Player`", player)
+            self.__control.upsert_rows("`Player`", [player])
             return player
         else:
             return None
@@ -72,20 +118,23 @@ class DatabasePlayerManager:
     def add_existing_player(self, data) -> None:
         player = PlayerData(BNG_CONN, data[1], PLATFORM[data[6]].value) # type: ignore
         player.define_data()
-        if player not in self.__players:
-            self.__players.append(player)
+        self.__players.put(data[1], player)
 
     def add_new_player(self, member_id: int, member_type: int) -> None:
-        # existing_player = self.__control.select_rows("`Player`", ["*"], {"destiny_id": member_id})
-        
-        # if not existing_player:
-            new_player = DataFactory.get_player(member_id, member_type)
-            if new_player not in self.__players:
-                self.__players.append(new_player)
+        self.store_players({member_id: self.fetch_player(member_id, member_type)})
+
+    def fetch_player(self, member_id: int, member_type: int) -> PlayerData:
+        return DataFactory.get_player(member_id, member_type)
+
+    def store_players(self, players: dict[int, PlayerData]) -> None:
+        """
+        Index and write players already fetched from Bungie, keyed by destiny id
+        """
+        for member_id, player in players.items():
+            self.__players.put(member_id, player)
 
-            self.__control.insert_row("`Player`", new_player)
-        # else:
-        #     self.add_existing_player(existing_player)
+        # a player seen before gets the fresh Bungie data written over their row
+        self.__control.upsert_rows("`Player`", list(players.values()))
 
     def get_character_and_player_ids(self, member_id: int):
         result = self.__control.select_rows("`Player`", ["character_ids", "player_id"], {"destiny_id": member_id})
@@ -102,24 +151,49 @@ class DatabasePlayerManager:
         else:
             return None, None
 
+    @property
+    def cache_stats(self) -> dict:
+        return self.__players.stats
+
 class DatabaseCharacterManager:
     def __init__(self, db_control: DatabaseExecutor) -> None:
         self.__control: DatabaseExecutor = db_control
-        self.__characters: list[CharacterData] = []
+        self.__characters = LRUCache(PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL)  # bng character id -> CharacterData
 
     def add_new_character(self, member_id: int, member_type: int, character_id: int, player_id: int=-1) -> None:
         if player_id == -1:
-            player = self.__control.select_rows("`Player`", ["player_id"], {"destiny_id": member_id})
-            if player:
-                player_id = player[0][0]  # type: ignore
+            player_id = self.__control.resolve_id("`Player`", member_id) or -1
         
         if player_id != -1:
-            new_char = DataFactory.get_character(member_id, member_type, character_id, player_id)
-            
-            if new_char not in self.__characters:
-                self.__characters.append(new_char)
-
-            self.__control.insert_row("`Character`", new_char)
+            self.store_characters({character_id: self.fetch_character(member_id, member_type, character_id, player_id)})
+
+    def fetch_character(self, member_id: int, member_type: int, character_id: int, player_id: int=-1) -> CharacterData:
+        """
+        Fetch a character from Bungie. A player_id of -1 is filled in by store_characters once the player is stored
+        """
+        return DataFactory.get_character(member_id, member_type, character_id, player_id)
+
+    def store_characters(self, characters: dict[int, CharacterData]) -> None:
+        """
+        Index and write characters already fetched from Bungie, keyed by bng character id. Characters whose player has no
+        stored row are left out
+        """
+        player_ids = self.__control.resolve_ids("`Player`", [character._id for character in characters.values() if character._player_id == -1])
+
+        stored = []
+        for character_id, character in characters.items():
+            if character._player_id == -1:
+                if character._id not in player_ids:
+                    continue
+                character._player_id = player_ids[character._id]
+                if character.data:
+                    character.data["player_id"] = character._player_id
+
+            self.__characters.put(character_id, character)
+            stored.append(character)
+
+        if stored:
+            self.__control.upsert_rows("`Character`", stored)
 
     def get_activity_history(self, character_id: int, mode: int, count: int):
         character = self.find_character(character_id)
@@ -127,15 +201,39 @@ class DatabaseCharacterManager:
             instance_ids = character.get_activity_hist_instances(mode, count)
             return instance_ids
 
+    async def get_activity_history_async(self, character_id: int, mode: int, count: int):
+        async_character = self.__find_async_character(character_id)
+        if async_character:
+            instance_ids = await async_character.get_activity_hist_instances_async(mode, count)
+            return instance_ids
+
+    def get_activity_history_by_mode(self, character_id: int, count: int, per_mode: int):
+        character = self.find_character(character_id)
+        if character:
+            return character.get_activity_hist_by_mode(count, per_mode)
+
+    async def get_activity_history_by_mode_async(self, character_id: int, count: int, per_mode: int):
+        async_character = self.__find_async_character(character_id)
+        if async_character:
+            return await async_character.get_activity_hist_by_mode_async(count, per_mode)
+
+    def __find_async_character(self, character_id: int) -> Optional[CharacterData]:
+        character = self.find_character(character_id)
+        if character:
+            # the stored character is bound to the blocking connector, so query through an async twin
+            return CharacterData(DataFactory.async_bng_conn, character._id, character._type, character_id, character._player_id)  # type: ignore
+
     def find_character(self, character_id: int) -> Optional[CharacterData]:
-        for character in self.__characters:
-            if character.character_id == character_id:
-                return character
+        return self.__characters.get(character_id)
+
+    @property
+    def cache_stats(self) -> dict:
+        return self.__characters.stats
 
 class DatabaseWeaponManager:
     def __init__(self, db_control: DatabaseExecutor) -> None:
         self.__control: DatabaseExecutor = db_control
-        self.__weapons: list[WeaponData] = []
+        self.__weapons = LRUCache(DEFINITION_CACHE_SIZE)  # bng weapon id -> WeaponData
 
     def update_weapon(self, weapon_id: int):
         bng_weapon_id = self.__control.select_rows("`Weapon`", ["bng_weapon_id"], {"weapon_id": weapon_id})
@@ -147,26 +245,38 @@ class DatabaseWeaponManager:
                 return weapon.data
 
     def add_new_weapon(self, weapon_id: int) -> WeaponData:
-        # exisiting_weapon = self.__control.select_rows("`Weapon`", ["weapon_id"], {"bng_weapon_id": weapon_id})
-        
-        # if not exisiting_weapon:
-        new_weapon = DataFactory.get_weapon(weapon_id)  
-        if new_weapon not in self.__weapons:
-            self.__weapons.append(new_weapon)
-
-        self.__control.insert_row("`Weapon`", new_weapon)
+        new_weapon = self.fetch_weapon(weapon_id)
+        self.store_weapons({weapon_id: new_weapon})
 
         return new_weapon
 
+    def add_new_weapons(self, weapon_ids: list[int]) -> list[WeaponData]:
+        new_weapons = {weapon_id: self.fetch_weapon(weapon_id) for weapon_id in weapon_ids}
+        self.store_weapons(new_weapons)
+
+        return list(new_weapons.values())
+
+    def fetch_weapon(self, weapon_id: int) -> WeaponData:
+        return DataFactory.get_weapon(weapon_id)
+
+    def store_weapons(self, weapons: dict[int, WeaponData]) -> None:
+        for weapon_id, weapon in weapons.items():
+            self.__weapons.put(weapon_id, weapon)
+
+        # definitions come from the manifest, a weapon already stored is left as it is
+        self.__control.upsert_rows("`Weapon`", list(weapons.values()), update=False)
+
     def get_weapon(self, bng_weapon_id: int) -> Optional[WeaponData]:
-        for weapon in self.__weapons:
-            if weapon.data["bng_weapon_id"] == bng_weapon_id:
-                return weapon
+        return self.__weapons.get(bng_weapon_id)
+
+    @property
+    def cache_stats(self) -> dict:
+        return self.__weapons.stats
 
 class DatabaseArmorManager:
     def __init__(self, db_control: DatabaseExecutor) -> None:
         self.__control: DatabaseExecutor = db_control
-        self.__armor: list[ArmorData] = []
+        self.__armor = LRUCache(DEFINITION_CACHE_SIZE)  # bng armor id -> ArmorData
 
     def update_armor(self, armor_id: int):
         bng_armor_id = self.__control.select_rows("`Armor`", ["bng_armor_id"], {"armor_id": armor_id})
@@ -178,54 +288,75 @@ class DatabaseArmorManager:
                 return armor.data
 
     def add_new_armor(self, armor_id: int) -> ArmorData:
-        # existing_armor = self.__control.select_rows("`Armor`", ["armor_id"], {"bng_armor_id": armor_id})
-        
-        # if not existing_armor:
-        new_armor = DataFactory.get_armor(armor_id)
-        if new_armor not in self.__armor:
-            self.__armor.append(new_armor)
-
-        self.__control.insert_row("`Armor`", new_armor)
+        new_armor = self.fetch_armor(armor_id)
+        self.store_armors({armor_id: new_armor})
 
         return new_armor
 
+    def add_new_armors(self, armor_ids: list[int]) -> list[ArmorData]:
+        new_armor = {armor_id: self.fetch_armor(armor_id) for armor_id in armor_ids}
+        self.store_armors(new_armor)
+
+        return list(new_armor.values())
+
+    def fetch_armor(self, armor_id: int) -> ArmorData:
+        return DataFactory.get_armor(armor_id)
+
+    def store_armors(self, armor: dict[int, ArmorData]) -> None:
+        for armor_id, armor_piece in armor.items():
+            self.__armor.put(armor_id, armor_piece)
+
+        self.__control.upsert_rows("`Armor`", list(armor.values()), update=False)
+
     def get_armor(self, bng_armor_id: int) -> Optional[ArmorData]:
-        for armor in self.__armor:
-            if armor.data["bng_armor_id"] == bng_armor_id:
-                return armor
+        return self.__armor.get(bng_armor_id)
+
+    @property
+    def cache_stats(self) -> dict:
+        return self.__armor.stats
 
 class DatabaseActivityManager:
     def __init__(self, db_control: DatabaseExecutor) -> None:
         self.__control: DatabaseExecutor = db_control
-        self.__activities: list[ActivityData] = []
+        self.__activities = LRUCache(DEFINITION_CACHE_SIZE)  # bng activity id -> ActivityData
 
     def add_new_activity(self, activitiy_id: int) -> None:
-        # existing_activity = self.__control.select_rows("`Activity`", ["activitiy_id"], {"bng_activitiy_id": activitiy_id})
+        self.store_activities({activitiy_id: self.fetch_activity(activitiy_id)})
 
-        # if not existing_activity:
-            new_activity = DataFactory.get_activity(activitiy_id)
-            if new_activity not in self.__activities:
-                self.__activities.append(new_activity)
+    def fetch_activity(self, activity_id: int) -> ActivityData:
+        return DataFactory.get_activity(activity_id)
 
-            self.__control.insert_row("`Activity`", new_activity)
+    def store_activities(self, activities: dict[int, ActivityData]) -> None:
+        for activity_id, activity in activities.items():
+            self.__activities.put(activity_id, activity)
+
+        self.__control.upsert_rows("`Activity`", list(activities.values()), update=False)
+
+    @property
+    def cache_stats(self) -> dict:
+        return self.__activities.stats
 
 class DatabaseActivityInstanceManager:
     def __init__(self, db_control: DatabaseExecutor) -> None:
         self.__control: DatabaseExecutor = db_control
-        self.__instances: list[ActivityInstanceData] = []
+        self.__instances = LRUCache(INSTANCE_CACHE_SIZE, INSTANCE_CACHE_TTL)  # instance id -> ActivityInstanceData
     
     def create_instance(self, instance_id: int) -> ActivityInstanceData:
         new_instance = DataFactory.get_activity_instance(instance_id)
-
-        if new_instance not in self.__instances:
-            self.__instances.append(new_instance)
+        self.__instances.put(instance_id, new_instance)
 
         return new_instance
+
+    async def create_instances_async(self, instance_ids: list[int]) -> list[ActivityInstanceData]:
+        new_instances = await DataFactory.get_activity_instances_async(instance_ids)
+
+        for new_instance in new_instances:
+            self.__instances.put(new_instance.instance_id, new_instance)
+
+        return new_instances
     
     def find_instance(self, instance_id: int) -> Optional[ActivityInstanceData]:
-        for instance in self.__instances:
-            if instance.instance_id == instance_id:
-                return instance
+        return self.__instances.get(instance_id)
 
     def create_instance_stats(self, instance_id: int):
         instance = self.find_instance(instance_id)
@@ -234,13 +365,17 @@ class DatabaseActivityInstanceManager:
             instance.create_stats()
 
     def get_instances(self) -> list[ActivityInstanceData]:
-        return self.__instances
+        return self.__instances.values()
+
+    @property
+    def cache_stats(self) -> dict:
+        return self.__instances.stats
 
 class EquipmentManager:
     def __init__(self, db_control: DatabaseExecutor, w_control: DatabaseWeaponManager, a_control: DatabaseArmorManager) -> None:
         self.__control: DatabaseExecutor = db_control
-        self.__weapons: list[EquippedWeaponData] = []
-        self.__armor: list[EquippedArmorData] = []
+        self.__weapons = LRUCache(PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL)  # (bng weapon id, bng character id) -> EquippedWeaponData
+        self.__armor = LRUCache(PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL)  # (bng armor id, bng character id) -> EquippedArmorData
         self.__w_manager: DatabaseWeaponManager = w_control
         self.__a_manager: DatabaseArmorManager = a_control
 
@@ -252,16 +387,15 @@ class EquipmentManager:
             weapon = self.__w_manager.get_weapon(bng_weapon_id)
 
         weapon_equipment = DataFactory.get_equipped_weapon(weapon, bng_character_id)  # type: ignore
-        if weapon_equipment not in self.__weapons:
-            self.__weapons.append(weapon_equipment)
+        self.__weapons.put((bng_weapon_id, bng_character_id), weapon_equipment)
 
-        char_id = self.__control.select_rows("`Character`", ["character_id"], {"bng_character_id": bng_character_id})
-        weapon_id = self.__control.select_rows("`Weapon`", ["weapon_id"], {"bng_weapon_id": bng_weapon_id})
+        char_id = self.__control.resolve_id("`Character`", bng_character_id)
+        weapon_id = self.__control.resolve_id("`Weapon`", bng_weapon_id)
         if char_id and weapon_id:
-            weapon_equipment.data["character_id"] = char_id[0][0]  # type: ignore
-            weapon_equipment.data["weapon_id"] = weapon_id[0][0]  # type: ignore
+            weapon_equipment.data["character_id"] = char_id
+            weapon_equipment.data["weapon_id"] = weapon_id
 
-            self.__control.insert_row("`Equipped_Weapons`", weapon_equipment)
+            self.__control.upsert_rows("`Equipped_Weapons`", [weapon_equipment])
 
     def add_new_armor(self, bng_armor_id: int, bng_character_id: int) -> None:
         armor = self.__a_manager.get_armor(bng_armor_id)
@@ -273,16 +407,97 @@ class EquipmentManager:
 
         armor_equipment = DataFactory.get_equipped_armor(armor, bng_character_id)  # type: ignore
 
-        if armor_equipment not in self.__armor:
-            self.__armor.append(armor_equipment)
-
-        char_id = self.__control.select_rows("`Character`", ["character_id"], {"bng_character_id": bng_character_id})
-        armor_id = self.__control.select_rows("`Armor`", ["armor_id"], {"bng_armor_id": bng_armor_id})
-        if char_id:
-            armor_equipment.data["character_id"] = char_id[0][0]  # type: ignore
-            armor_equipment.data["armor_id"] = armor_id[0][0]  # type: ignore
-
-            self.__control.insert_row("`Equipped_Armor`", armor_equipment)
+        self.__armor.put((bng_armor_id, bng_character_id), armor_equipment)
+
+        char_id = self.__control.resolve_id("`Character`", bng_character_id)
+        armor_id = self.__control.resolve_id("`Armor`", bng_armor_id)
+        if char_id and armor_id:
+            armor_equipment.data["character_id"] = char_id
+            armor_equipment.data["armor_id"] = armor_id
+
+            self.__control.upsert_rows("`Equipped_Armor`", [armor_equipment])
+
+    def add_new_weapons(self, bng_weapon_ids: list[int], bng_character_id: int) -> None:
+        """
+        Equip several weapons on a character, adding the ones not seen yet. Both tables are written in one batch each
+        """
+        self.store_weapons(*self.fetch_weapons(bng_weapon_ids, bng_character_id), bng_character_id)
+
+    def fetch_weapons(self, bng_weapon_ids: list[int], bng_character_id: int) -> tuple[dict[int, WeaponData], dict[int, EquippedWeaponData]]:
+        """
+        Build the definitions of weapons not seen yet and the character's equipment for every weapon, without writing
+        """
+        weapons = {bng_weapon_id: self.__w_manager.get_weapon(bng_weapon_id) for bng_weapon_id in bng_weapon_ids}
+        new_weapons = {bng_weapon_id: self.__w_manager.fetch_weapon(bng_weapon_id) for bng_weapon_id, weapon in weapons.items() if not weapon}
+        weapons.update(new_weapons)
+
+        equipment = {bng_weapon_id: DataFactory.get_equipped_weapon(weapon, bng_character_id) for bng_weapon_id, weapon in weapons.items()}  # type: ignore
+        return new_weapons, equipment
+
+    def store_weapons(self, new_weapons: dict[int, WeaponData], equipment: dict[int, EquippedWeaponData], bng_character_id: int) -> None:
+        if new_weapons:
+            self.__w_manager.store_weapons(new_weapons)
+
+        char_id = self.__control.resolve_id("`Character`", bng_character_id)
+        if not char_id:
+            return
+        weapon_ids = self.__control.resolve_ids("`Weapon`", list(equipment))
+
+        rows = []
+        for bng_weapon_id, weapon_equipment in equipment.items():
+            self.__weapons.put((bng_weapon_id, bng_character_id), weapon_equipment)
+
+            if bng_weapon_id in weapon_ids:
+                weapon_equipment.data["character_id"] = char_id
+                weapon_equipment.data["weapon_id"] = weapon_ids[bng_weapon_id]
+                rows.append(weapon_equipment)
+
+        self.__control.upsert_rows("`Equipped_Weapons`", rows)
+
+    def add_new_armors(self, bng_armor_ids: list[int], bng_character_id: int) -> None:
+        """
+        Equip several armor pieces on a character, adding the ones not seen yet. Both tables are written in one batch each
+        """
+        self.store_armors(*self.fetch_armors(bng_armor_ids, bng_character_id), bng_character_id)
+
+    def fetch_armors(self, bng_armor_ids: list[int], bng_character_id: int) -> tuple[dict[int, ArmorData], dict[int, EquippedArmorData]]:
+        """
+        Build the definitions of armor not seen yet and the character's equipment for every piece, without writing
+        """
+        armor = {bng_armor_id: self.__a_manager.get_armor(bng_armor_id) for bng_armor_id in bng_armor_ids}
+        new_armor = {bng_armor_id: self.__a_manager.fetch_armor(bng_armor_id) for bng_armor_id, armor_piece in armor.items() if not armor_piece}
+        armor.update(new_armor)
+
+        equipment = {bng_armor_id: DataFactory.get_equipped_armor(armor_piece, bng_character_id) for bng_armor_id, armor_piece in armor.items()}  # type: ignore
+        return new_armor, equipment
+
+    def store_armors(self, new_armor: dict[int, ArmorData], equipment: dict[int, EquippedArmorData], bng_character_id: int) -> None:
+        if new_armor:
+            self.__a_manager.store_armors(new_armor)
+
+        char_id = self.__control.resolve_id("`Character`", bng_character_id)
+        if not char_id:
+            return
+        armor_ids = self.__control.resolve_ids("`Armor`", list(equipment))
+
+        rows = []
+        for bng_armor_id, armor_equipment in equipment.items():
+            self.__armor.put((bng_armor_id, bng_character_id), armor_equipment)
+
+            if bng_armor_id in armor_ids:
+                armor_equipment.data["character_id"] = char_id
+                armor_equipment.data["armor_id"] = armor_ids[bng_armor_id]
+                rows.append(armor_equipment)
+
+        self.__control.upsert_rows("`Equipped_Armor`", rows)
+
+    @property
+    def cache_stats(self) -> dict:
+        return {
+            "armor": self.__a_manager.cache_stats,
+            "equipped_weapons": self.__weapons.stats,
+            "equipped_armor": self.__armor.stats
+        }
 
 class DatabaseManager:
     def __init__(
@@ -301,78 +516,116 @@ class DatabaseManager:
         self.__p_manager: DatabasePlayerManager = p_control
         self.__e_manager: EquipmentManager = e_control
 
-        self.__stats_data: list[ActivityStatsData] = []
+        self.__stats_data = LRUCache(PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL)  # (instance id, bng character id, bng weapon id) -> ActivityStatsData
 
     def add_new_stat_block(self, instance: ActivityInstanceData, bng_char_id: int=0) -> ActivityStatsData | bool:
-        def define_stats(stat: ActivityStatsData):
-            if stat.data:
-                self.__a_manager.add_new_activity(stat.og_data["bng_activity_id"])
-                self.__w_manager.add_new_weapon(stat.og_data["bng_weapon_id"])
-                self.__p_manager.add_new_player(stat.participant["destiny_id"], stat.participant["member_type"])
-                self.__c_manager.add_new_character(stat.participant["destiny_id"], stat.participant["member_type"], stat.og_data["bng_character_id"])
-
-                # figure out a better way to do this :(
-                activity_id_result = self.__control.select_rows("`Activity`", ["activity_id"], {"bng_activity_id": stat.og_data["bng_activity_id"]})
-                if activity_id_result:
-                    stat.data["activity_id"] = activity_id_result[0][0]  # type: ignore
-                
-                weapon_id_result = self.__control.select_rows("`Weapon`", ["weapon_id"], {"bng_weapon_id": stat.og_data["bng_weapon_id"]})
-                if weapon_id_result:
-                    stat.data["weapon_id"] = weapon_id_result[0][0]   # type: ignore
-
-                character_id_result = self.__control.select_rows("`Character`", ["character_id"], {"bng_character_id": stat.og_data["bng_character_id"]})
-                if character_id_result:
-                    stat.data["character_id"] = character_id_result[0][0]   # type: ignore
-                
-                if stat not in self.__stats_data:
-                    self.__stats_data.append(stat)
-
-                self.__control.insert_row("`Activity_Stats`", stat)
-                return stat
-
+        def resolve_ids(stats: list[ActivityStatsData]) -> None:
+            # one cached, batched lookup per table for the whole match instead of three SELECTs per stat block
+            activity_ids = self.__control.resolve_ids("`Activity`", [stat.og_data["bng_activity_id"] for stat in stats])
+            weapon_ids = self.__control.resolve_ids("`Weapon`", [stat.og_data["bng_weapon_id"] for stat in stats])
+            character_ids = self.__control.resolve_ids("`Character`", [stat.og_data["bng_character_id"] for stat in stats])
+
+            for stat in stats:
+                if stat.og_data["bng_activity_id"] in activity_ids:
+                    stat.data["activity_id"] = activity_ids[stat.og_data["bng_activity_id"]]
+                if stat.og_data["bng_weapon_id"] in weapon_ids:
+                    stat.data["weapon_id"] = weapon_ids[stat.og_data["bng_weapon_id"]]
+                if stat.og_data["bng_character_id"] in character_ids:
+                    stat.data["character_id"] = character_ids[stat.og_data["bng_character_id"]]
+
+        stats = [stat for stat in instance.get_instance_stats() if stat.data and (not bng_char_id or stat.og_data["bng_character_id"] == bng_char_id)]
         if bng_char_id:
-            result = self.__control.select_rows("Activity_Stats", ["*"], {"instance_id": instance.instance_id, "bng_character_id": bng_char_id})
-            if result:
-                return False
-
-        instance_stats = instance.get_instance_stats()
-        for stat in instance_stats:
-            if bng_char_id and stat.og_data["bng_character_id"] == bng_char_id:
-                defined_stat_block = define_stats(stat)
-                if defined_stat_block:
-                    return defined_stat_block
-            elif not bng_char_id:
-                define_stats(stat)
-        else:
+            stats = stats[:1]
+        if not stats:
+            return True
+
+        # everything the match brings in is fetched before the transaction opens, once per id, so no connection is held
+        # through Bungie requests
+        activities, weapons, players, characters = {}, {}, {}, {}
+        for stat in stats:
+            destiny_id, member_type = stat.participant["destiny_id"], stat.participant["member_type"]
+            if stat.og_data["bng_activity_id"] not in activities:
+                activities[stat.og_data["bng_activity_id"]] = self.__a_manager.fetch_activity(stat.og_data["bng_activity_id"])
+            if stat.og_data["bng_weapon_id"] not in weapons:
+                weapons[stat.og_data["bng_weapon_id"]] = self.__w_manager.fetch_weapon(stat.og_data["bng_weapon_id"])
+            if destiny_id not in players:
+                players[destiny_id] = self.__p_manager.fetch_player(destiny_id, member_type)
+            if stat.og_data["bng_character_id"] not in characters:
+                characters[stat.og_data["bng_character_id"]] = self.__c_manager.fetch_character(destiny_id, member_type, stat.og_data["bng_character_id"])
+
+        # the activities, weapons, players and characters a match brings in land with its stats in one commit, or not at all
+        with self.__control.transaction():
+            self.__a_manager.store_activities(activities)
+            self.__w_manager.store_weapons(weapons)
+            self.__p_manager.store_players(players)
+            self.__c_manager.store_characters(characters)
+
+            for stat in stats:
+                self.__stats_data.put((instance.instance_id, stat.og_data["bng_character_id"], stat.og_data["bng_weapon_id"]), stat)
+            resolve_ids(stats)
+
+            if bng_char_id:
+                result = self.__control.upsert_rows("`Activity_Stats`", stats)
+                if result.existing and not result.new:
+                    # the character's stats for this match were logged before
+                    return False
+                return stats[0]
+
+            # every participant's stats for the match go in as one batch
+            self.__control.upsert_rows("`Activity_Stats`", stats)
             return True
 
     def add_character_equipment(self, character_id: int) -> None:
         character = self.__c_manager.find_character(character_id)
         if character:
-            equipped_weapons = character.equipment["weapons"]
-            equipped_armor = character.equipment["armor"]
-            bng_character_id = character.data["bng_character_id"]
-            
-            if equipped_weapons:
-                for weapon_id in equipped_weapons:
-                    self.__e_manager.add_new_weapon(weapon_id, bng_character_id)
+            self.store_character_equipment(self.fetch_character_equipment(character))
+
+    def fetch_character_equipment(self, character: CharacterData) -> tuple:
+        """
+        Build a character's equipped gear and any definitions not seen yet, ready for store_character_equipment
+        """
+        bng_character_id = character.data.get("bng_character_id", character._character_id)
+        equipped_weapons = character.equipment.get("weapons")
+        equipped_armor = character.equipment.get("armor")
 
-            if equipped_armor:
-                for armor_id in equipped_armor:
-                    self.__e_manager.add_new_armor(armor_id, bng_character_id)
+        weapons = self.__e_manager.fetch_weapons(equipped_weapons, bng_character_id) if equipped_weapons else None
+        armor = self.__e_manager.fetch_armors(equipped_armor, bng_character_id) if equipped_armor else None
+        return bng_character_id, weapons, armor
+
+    def store_character_equipment(self, equipment: tuple) -> None:
+        bng_character_id, weapons, armor = equipment
+        with self.__control.transaction():
+            if weapons:
+                self.__e_manager.store_weapons(*weapons, bng_character_id)
+
+            if armor:
+                self.__e_manager.store_armors(*armor, bng_character_id)
 
     def delete_stat_block(self, character_id: int, instance_id: int):
         existing_stat_block = self.__control.select_rows("Activity_Stats", ["*"], {"character_id": character_id, "instance_id": instance_id})
         if existing_stat_block:
             delete_result = self.__control.delete_row("Activity_Stats", {"character_id": character_id, "instance_id": instance_id})
             if delete_result:
-                for stat in self.__stats_data:
+                for stat in self.__stats_data.values():
                     if stat.data["character_id"] == character_id and stat.data["instance_id"] == instance_id:
-                        self.__stats_data.remove(stat)
-                        break
+                        self.__stats_data.pop((instance_id, stat.og_data["bng_character_id"], stat.og_data["bng_weapon_id"]))
                     
                 return existing_stat_block
 
+    @property
+    def cache_stats(self) -> dict:
+        """
+        Size and hit rate of every entity cache the managers keep
+        """
+        return {
+            "players": self.__p_manager.cache_stats,
+            "characters": self.__c_manager.cache_stats,
+            "activities": self.__a_manager.cache_stats,
+            "weapons": self.__w_manager.cache_stats,
+            **self.__e_manager.cache_stats,
+            "stats": self.__stats_data.stats
+        }
+
 # def main():
 #     connection = SQLConnector("test", 33061)
 #     control = DatabaseExecutor(connection)
@@ -0,0 +1,86 @@
+'''
+Compare manifest table formats against a real Manifest.content:
+
+    python -m backend.manifest.benchmark_manifest [table ...]
+
+Every available serializer writes each table once, then each file is loaded in a fresh interpreter so load time and
+peak RSS are not skewed by whatever the benchmark itself has in memory
+'''
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import psutil
+from dotenv import load_dotenv
+
+from backend.manifest.create_manifest import build_dict
+from backend.manifest.serializers import SERIALIZERS, get_serializer
+
+DEFAULT_TABLES = ['DestinyInventoryItemDefinition', 'DestinyActivityDefinition']
+
+def load_table(format: str, table_path: str) -> None:
+    """
+    Run in the child interpreter: load one table file and print its load time, the process's peak RSS and the resident
+    memory the loaded table added on top of the interpreter and imports
+    """
+    serializer = get_serializer(format)
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    start = time.perf_counter()
+    with open(table_path, 'rb') as data:
+        table = serializer.load(data)
+    seconds = time.perf_counter() - start
+
+    # ru_maxrss is reported in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    print(f"{seconds} {peak_rss} {process.memory_info().rss - rss_before} {len(table)}")
+
+def measure_load(format: str, table_path: str) -> tuple[float, int, int, int]:
+    out = subprocess.run(
+        [sys.executable, '-m', 'backend.manifest.benchmark_manifest', '--load', format, table_path],
+        capture_output=True, text=True, check=True
+    ).stdout.split()
+    return float(out[0]), int(out[1]), int(out[2]), int(out[3])
+
+def benchmark(manifest_path: str | None, tables: list[str]) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for table_name, table in build_dict({table_name: 'hash' for table_name in tables}, manifest_path).items():
+            for serializer in SERIALIZERS.values():
+                if serializer.available is False:
+                    print(f"Skipping {serializer.name}, not installed")
+                    continue
+
+                table_path = f'{tmp_dir}/{table_name}{serializer.extension}'
+                with open(table_path, 'wb') as data:
+                    serializer.dump(table, data)
+
+                seconds, peak_rss, load_rss, rows = measure_load(serializer.name, table_path)
+                results.append({
+                    "table": table_name,
+                    "format": serializer.name,
+                    "rows": rows,
+                    "file_mb": round(os.path.getsize(table_path) / 2 ** 20, 2),
+                    "load_seconds": round(seconds, 4),
+                    "peak_rss_mb": round(peak_rss / 2 ** 20, 1),
+                    "load_rss_mb": round(load_rss / 2 ** 20, 1)
+                })
+
+    return results
+
+def main():
+    if sys.argv[1:2] == ['--load']:
+        load_table(sys.argv[2], sys.argv[3])
+        return
+
+    load_dotenv()
+    tables = sys.argv[1:] or DEFAULT_TABLES
+    print(f"{'table':<36}{'format':<10}{'rows':>8}{'file MB':>10}{'load s':>10}{'peak RSS MB':>14}{'load RSS MB':>14}")
+    for result in benchmark(os.getenv('PATH_TO_MANIFEST'), tables):
+        print(f"{result['table']:<36}{result['format']:<10}{result['rows']:>8}{result['file_mb']:>10}{result['load_seconds']:>10}{result['peak_rss_mb']:>14}{result['load_rss_mb']:>14}")
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,10 @@ import zipfile
 import os
 import json
 import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,59 +21,147 @@ load_dotenv()
 PATH = os.getenv('PATH_TO_MANIFEST')
 X_API_KEY = os.getenv('X_API_KEY')
 
-def create_manifest(path: str | None=PATH, x_api_key: str | None=X_API_KEY):
-    manifest_url = 'http://www.bungie.net/Platform/Destiny2/Manifest/'
-
+MANIFEST_URL = 'http://www.bungie.net/Platform/Destiny2/Manifest/'
+VERSION_FILE = 'manifest.version'
+CHUNK_SIZE = 1024 * 1024
+
+# files built from Manifest.content, stale as soon as a new version is downloaded
+DERIVED_SUFFIXES = ('.pickle', '.marshal', '.msgpack', '.mmap')
+
+def get_manifest_info(x_api_key: str | None=X_API_KEY) -> dict:
+    """
+    The Manifest endpoint's response: the current version and the paths of its content files
+    """
+    r = requests.get(MANIFEST_URL, headers={'X-API-KEY': x_api_key})
+    r.raise_for_status()
+    return r.json()['Response']
+
+def read_manifest_version(path: str | None=PATH) -> str | None:
+    """
+    Version of the Manifest.content on disk, or None if it was never recorded
+    """
+    try:
+        with open(f'{path}/{VERSION_FILE}') as version_file:
+            return json.load(version_file)['version']
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+def update_manifest(path: str | None=PATH, x_api_key: str | None=X_API_KEY) -> bool:
+    """
+    Download the manifest only if Bungie's version differs from the recorded one. Returns True if it was downloaded
+    """
+    info = get_manifest_info(x_api_key)
+    if os.path.isfile(f'{path}/Manifest.content') and read_manifest_version(path) == info['version']:
+        print(f"Manifest {info['version']} is up to date")
+        return False
+
+    create_manifest(path, x_api_key, info)
+    return True
+
+def create_manifest(path: str | None=PATH, x_api_key: str | None=X_API_KEY, info: dict | None=None):
     #get the manifest location from the json
-    r = requests.get(manifest_url, headers={'X-API-KEY': x_api_key})
-    manifest = r.json()
-    mani_url = 'http://www.bungie.net' + manifest['Response']['mobileWorldContentPaths']['en']
-
-    #Download the file, write it to 'MANZIP'
-    r = requests.get(mani_url)
-    with open(f"{path}/MANZIP", "wb") as zip:
-        zip.write(r.content)
+    if info is None:
+        info = get_manifest_info(x_api_key)
+    mani_url = 'http://www.bungie.net' + info['mobileWorldContentPaths']['en']
+
+    #Stream the file to 'MANZIP' in chunks instead of holding it in memory
+    with requests.get(mani_url, stream=True) as r:
+        r.raise_for_status()
+        with open(f"{path}/MANZIP.part", "wb") as zip:
+            for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                zip.write(chunk)
+    os.replace(f"{path}/MANZIP.part", f"{path}/MANZIP")
     print("Download Complete!")
 
-    #Extract the file contents, and rename the extracted file
-    # to 'Manifest.content'
-    with zipfile.ZipFile(f"{path}/MANZIP") as zip:
-        name = zip.namelist()
-        zip.extractall()
-    os.rename(name[0], f'{path}/Manifest.content')
+    #Extract into a temporary directory next to the destination, then swap it in as 'Manifest.content'
+    # so readers never see a partly extracted file
+    with tempfile.TemporaryDirectory(dir=path) as tmp_dir:
+        with zipfile.ZipFile(f"{path}/MANZIP") as zip:
+            name = zip.namelist()
+            extracted = zip.extract(name[0], tmp_dir)
+        os.replace(extracted, f'{path}/Manifest.content')
     print('Unzipped!')
 
-def build_dict(hash_dict, path: str | None=PATH):
-    #connect to the manifest
+    remove_derived_files(path)
+    write_manifest_version(path, info)
+
+def write_manifest_version(path: str | None, info: dict) -> None:
+    tmp_path = f'{path}/{VERSION_FILE}.tmp'
+    with open(tmp_path, 'w') as version_file:
+        json.dump({'version': info['version'], 'path': info['mobileWorldContentPaths']['en']}, version_file)
+    os.replace(tmp_path, f'{path}/{VERSION_FILE}')
+
+def remove_derived_files(path: str | None) -> None:
+    """
+    Delete the table files built from the previous Manifest.content so they are rebuilt from the new one
+    """
+    for file_name in os.listdir(path):
+        if file_name.endswith(DERIVED_SUFFIXES):
+            os.remove(f'{path}/{file_name}')
+            print(f"Removed stale '{file_name}'")
+
+def decode_table(table_name: str, hash: str, path: str | None=PATH) -> dict:
+    #connect to the manifest, each worker process opens its own connection
     con = sqlite3.connect(f'{path}/Manifest.content')
-    print('Connected')
     #create a cursor object
     cur = con.cursor()
 
-    all_data = {}
-    #for every table name in the dictionary
-    for table_name in hash_dict.keys():
-        #get a list of all the jsons from the table
-        cur.execute('SELECT json from '+table_name)
-        print('Generating '+table_name+' dictionary....')
+    #get a list of all the jsons from the table
+    cur.execute('SELECT json from '+table_name)
+    print('Generating '+table_name+' dictionary....')
 
-        #this returns a list of tuples: the first item in each tuple is our json
-        items = cur.fetchall()
+    #create a dictionary with the hashes as keys
+    #and the jsons as values
+    item_dict = {}
+    for item in cur:
+        item_json = json.loads(item[0])
+        item_dict[item_json[hash]] = item_json
 
-        #create a list of jsons
-        item_jsons = [json.loads(item[0]) for item in items]
+    con.close()
+    return item_dict
 
-        #create a dictionary with the hashes as keys
-        #and the jsons as values
-        item_dict = {}
-        hash = hash_dict[table_name]
-        for item in item_jsons:
-            item_dict[item[hash]] = item
-
-        #add that dictionary to our all_data using the name of the table
-        #as a key.
-        all_data[table_name] = item_dict
+def build_dict(hash_dict, path: str | None=PATH, max_workers: int | None=None):
+    print('Connected')
+    #decode a single table in this process, several tables in parallel
+    if len(hash_dict) == 1 or max_workers == 1:
+        all_data = {table_name: decode_table(table_name, hash, path) for table_name, hash in hash_dict.items()}
+    else:
+        jobs = {table_name: (table_name, hash, path) for table_name, hash in hash_dict.items()}
+        all_data = build_in_pool(decode_table, jobs, max_workers=max_workers)
 
     print('Dictionary Generated!')
     return all_data
 
+def timed_build(build: Callable, *args) -> tuple[Any, float]:
+    start = time.perf_counter()
+    result = build(*args)
+    return result, time.perf_counter() - start
+
+def build_in_pool(build: Callable, jobs: dict[str, tuple], count: Callable[[Any], int]=len, max_workers: int | None=None) -> dict[str, Any]:
+    """
+    Run build(*args) for every table of jobs in a process pool and merge the results by table name.
+    Each table's time and row count, taken from its result by count, is printed as it finishes
+    """
+    results = {}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(timed_build, build, *args): table_name for table_name, args in jobs.items()}
+        for future in as_completed(futures):
+            table_name = futures[future]
+            result, seconds = future.result()
+            results[table_name] = result
+            print(f"Built {table_name}: {count(result)} rows in {seconds:.2f}s")
+
+    print(f"Built {len(jobs)} tables in {time.perf_counter() - start:.2f}s")
+    return results
+
+def unsigned_to_signed(num):
+    """
+    Manifest.content stores each definition under the signed 32-bit form of its hash
+    """
+    max = 2 ** 31 - 1
+    if num <= max:
+        return num
+    else:
+        return num - 2 ** 32
@@ -1,12 +1,90 @@
-import pickle
 import os
+import threading
+import time
+from collections.abc import Mapping
+import psutil
 from dotenv import load_dotenv
 
-from backend.manifest.create_manifest import create_manifest, build_dict
+from backend.manifest.create_manifest import create_manifest, update_manifest, build_dict, build_in_pool, unsigned_to_signed
+from backend.manifest.sqlite_manifest import SQLiteManifestData
+from backend.manifest.projected_manifest import ProjectedManifestData, build_projected_manifest, PROJECTED_FILE
+from backend.manifest.mmap_manifest import MMapManifestData, build_table_mmap
+from backend.manifest.serializers import Serializer, SERIALIZERS, get_serializer
+
+class LazyManifestData(Mapping):
+    """
+    Definition tables keyed by table name. Each table lives in its own file, written by serializer, and is only loaded
+    the first time it is read
+    """
+    def __init__(self, manifest_path: str | None, hashes: dict, serializer: Serializer=SERIALIZERS['pickle']) -> None:
+        self.__manifest_path = manifest_path
+        self.__hashes = hashes
+        self.__serializer = serializer
+        self.__tables: dict[str, dict] = {}
+        self.__load_stats: dict[str, dict] = {}
+        self.__lock = threading.Lock()
+
+    def __getitem__(self, table_name: str) -> dict:
+        if table_name not in self.__hashes:
+            raise KeyError(table_name)
+
+        table = self.__tables.get(table_name)
+        if table is None:
+            with self.__lock:
+                if table_name not in self.__tables:
+                    self.__load(table_name)
+            table = self.__tables[table_name]
+
+        return table
+
+    def __iter__(self):
+        return iter(self.__hashes)
+
+    def __len__(self) -> int:
+        return len(self.__hashes)
+
+    def __load(self, table_name: str) -> None:
+        table_path = f"{self.__manifest_path}/{table_name}{self.__serializer.extension}"
+        if not os.path.isfile(table_path):
+            build_table_cache(table_name, self.__hashes[table_name], self.__manifest_path, self.__serializer)
+
+        process = psutil.Process()
+        rss_before = process.memory_info().rss
+        start = time.perf_counter()
+
+        with open(table_path, 'rb') as data:
+            self.__tables[table_name] = self.__serializer.load(data)
+
+        self.__load_stats[table_name] = {
+            "seconds": round(time.perf_counter() - start, 4),
+            "rss_bytes": process.memory_info().rss - rss_before,
+            "rows": len(self.__tables[table_name])
+        }
+        print(f"Loaded {table_name}: {self.__load_stats[table_name]}")
+
+    @property
+    def loaded_tables(self) -> list[str]:
+        return list(self.__tables)
+
+    @property
+    def load_stats(self) -> dict[str, dict]:
+        """
+        Load time, resident memory growth and row count of every table loaded so far
+        """
+        return dict(self.__load_stats)
 
 class DestinyManifest:
-    def __init__(self) -> None:
+    """
+    Destiny 2 definitions. backend selects where lookups are answered from: "pickle" keeps whole tables in memory,
+    "sqlite" runs indexed point queries against Manifest.content behind a bounded cache, "projected" keeps only the fields
+    the pipeline reads in a compact struct-of-arrays store and "mmap" reads memory-mapped tables shared by every worker
+    process through the page cache. Defaults to MANIFEST_BACKEND.
+    format picks the serializer of the "pickle" backend's table files (pickle, marshal or msgpack), defaulting to MANIFEST_FORMAT
+    """
+    def __init__(self, backend: str | None=None, format: str | None=None) -> None:
         self.__manifest_path = os.getenv('PATH_TO_MANIFEST')
+        self.backend = backend or os.getenv('MANIFEST_BACKEND', 'pickle')
+        self.serializer = get_serializer(format or os.getenv('MANIFEST_FORMAT', 'pickle'))
 
         self.hashes = {
             'DestinyAchievementDefinition': 'hash',
@@ -31,32 +109,80 @@ class DestinyManifest:
             'DestinyFactionDefinition': 'hash'
         }
 
-        self.define_manifest_data()
+        # nothing is read from disk until a table is first accessed
+        cache_size = int(os.getenv('MANIFEST_CACHE_SIZE', 4096))
+        if self.backend == 'sqlite':
+            self.all_data = SQLiteManifestData(self.__manifest_path, self.hashes, cache_size)
+        elif self.backend == 'mmap':
+            self.all_data = MMapManifestData(self.__manifest_path, self.hashes, cache_size)
+        elif self.backend == 'projected':
+            self.all_data = ProjectedManifestData(self.__manifest_path)
+        elif self.backend == 'pickle':
+            self.all_data = LazyManifestData(self.__manifest_path, self.hashes, self.serializer)
+        else:
+            raise ValueError(f"Unknown manifest backend {self.backend}")
 
-    def define_manifest_data(self):
+    def define_manifest_data(self, max_workers: int | None=None):
+        """
+        Eagerly build the files the backend reads that are missing, one table per worker process. A new manifest is
+        downloaded only if Bungie's version changed, which also clears the files built from the old one
+        """
         load_dotenv()
+        update_manifest(self.__manifest_path)
 
-        if os.path.isfile(f'{self.__manifest_path}/manifest.content') is False:
-            create_manifest()
-            self.all_data = build_dict(self.hashes)
-            with open(f'{self.__manifest_path}/manifest.pickle', 'wb') as data:
-                pickle.dump(self.all_data, data)
-                print("'manifest.pickle' created!\nDONE!")
-        else:
-            print('Pickle Exists')
+        if self.backend == 'projected':
+            if os.path.isfile(f'{self.__manifest_path}/{PROJECTED_FILE}') is False:
+                build_projected_manifest(self.__manifest_path, max_workers)
+            else:
+                print(f"'{PROJECTED_FILE}' exists")
+            return
+
+        jobs = {}
+        for table_name, hash in self.hashes.items():
+            if self.backend == 'mmap':
+                if hash != 'hash':
+                    continue
+                table_file = f'{table_name}.mmap'
+                job = (table_name, self.__manifest_path)
+            else:
+                table_file = f'{table_name}{self.serializer.extension}'
+                job = (table_name, hash, self.__manifest_path, self.serializer)
+
+            if os.path.isfile(f'{self.__manifest_path}/{table_file}') is False:
+                jobs[table_name] = job
+            else:
+                print(f"'{table_file}' exists")
+
+        if jobs:
+            build = build_table_mmap if self.backend == 'mmap' else build_table_cache
+            build_in_pool(build, jobs, count=int, max_workers=max_workers)
+
+    @property
+    def load_stats(self) -> dict[str, dict]:
+        if isinstance(self.all_data, (LazyManifestData, SQLiteManifestData, MMapManifestData)):
+            return self.all_data.load_stats
+        return {}
+
+def build_table_cache(table_name: str, hash: str, manifest_path: str | None, serializer: Serializer=SERIALIZERS['pickle']) -> int:
+    """
+    Decode a single table out of Manifest.content and write it on its own with serializer. Returns the number of rows
+    """
+    if os.path.isfile(f'{manifest_path}/Manifest.content') is False:
+        create_manifest(manifest_path)
 
-        with open(f'{self.__manifest_path}/manifest.pickle', 'rb') as data:
-            self.all_data = pickle.load(data)
+    table = build_dict({table_name: hash}, manifest_path)[table_name]
 
-def unsigned_to_signed(num):
-    max = 2 ** 31 - 1
-    if num < max:
-        return num
-    else:
-        return num - 2 ** 32
+    # written beside the final file and swapped in, so a reader never loads a half written table
+    tmp_path = f'{manifest_path}/{table_name}{serializer.extension}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as data:
+        serializer.dump(table, data)
+    os.replace(tmp_path, f'{manifest_path}/{table_name}{serializer.extension}')
+    print(f"'{table_name}{serializer.extension}' created!")
+    return len(table)
 
 def main():
     manifest = DestinyManifest()
+    manifest.define_manifest_data()
 
     hash = unsigned_to_signed(1363886209)
     ghorn = manifest.all_data["DestinyInventoryItemDefinition"][hash]
@@ -67,4 +193,4 @@ def main():
     print(ghorn['flavorText'])
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,153 @@
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+from backend.cache import LRUCache
+from backend.manifest.create_manifest import create_manifest
+
+# file layout: header | sorted uint32 hashes | padding to 8 bytes | (count + 1) uint64 offsets | concatenated JSON
+MMAP_MAGIC = b'D2MM'
+MMAP_HEADER = struct.Struct('<4sIQ')  # magic, count, blob size
+
+def padded(size: int) -> int:
+    return (size + 7) & ~7
+
+class MMapManifestTable(Mapping):
+    """
+    One definition table read straight out of a memory-mapped file. Only the hash index is touched to find a
+    definition and only that definition's JSON is decoded, so every worker process maps the same pages from the
+    OS page cache instead of holding its own unpickled copy
+    """
+    def __init__(self, table_path: str, cache_size: int) -> None:
+        with open(table_path, 'rb') as data:
+            self.__mmap = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count, blob_size = MMAP_HEADER.unpack_from(self.__mmap, 0)
+        if magic != MMAP_MAGIC:
+            raise ValueError(f"{table_path} is not a memory-mapped manifest table")
+
+        view = memoryview(self.__mmap)
+        hashes_start = MMAP_HEADER.size
+        offsets_start = padded(hashes_start + count * 4)
+        blob_start = offsets_start + (count + 1) * 8
+
+        self.__hashes = view[hashes_start:hashes_start + count * 4].cast('I')
+        self.__offsets = view[offsets_start:blob_start].cast('Q')
+        self.__blob = view[blob_start:blob_start + blob_size]
+        self.__cache = LRUCache(cache_size)
+
+    def __getitem__(self, definition_hash):
+        definition = self.__cache.get(definition_hash)
+        if definition is not None:
+            return definition
+
+        if not isinstance(definition_hash, int):
+            raise KeyError(definition_hash)
+
+        i = bisect_left(self.__hashes, definition_hash)
+        if i == len(self.__hashes) or self.__hashes[i] != definition_hash:
+            raise KeyError(definition_hash)
+
+        definition = json.loads(self.__blob[self.__offsets[i]:self.__offsets[i + 1]].tobytes())
+        self.__cache.put(definition_hash, definition)
+        return definition
+
+    def __iter__(self):
+        return iter(self.__hashes.tolist())
+
+    def __len__(self) -> int:
+        return len(self.__hashes)
+
+    def close(self) -> None:
+        self.__hashes.release()
+        self.__offsets.release()
+        self.__blob.release()
+        self.__mmap.close()
+
+    @property
+    def cache_stats(self) -> dict:
+        return self.__cache.stats
+
+class MMapManifestData(Mapping):
+    """
+    Hash keyed definition tables keyed by table name, each mapped from its own {table}.mmap file on first access
+    """
+    def __init__(self, manifest_path: str | None, hashes: dict, cache_size: int=4096) -> None:
+        self.__manifest_path = manifest_path
+        # the mmap index is a uint32 hash index, so tables keyed by anything else are left out
+        self.__table_names = [table_name for table_name, hash in hashes.items() if hash == 'hash']
+        self.__cache_size = cache_size
+        self.__tables: dict[str, MMapManifestTable] = {}
+        self.__lock = threading.Lock()
+
+    def __getitem__(self, table_name: str) -> MMapManifestTable:
+        if table_name not in self.__table_names:
+            raise KeyError(table_name)
+
+        table = self.__tables.get(table_name)
+        if table is None:
+            with self.__lock:
+                if table_name not in self.__tables:
+                    table_path = f'{self.__manifest_path}/{table_name}.mmap'
+                    if os.path.isfile(table_path) is False:
+                        build_table_mmap(table_name, self.__manifest_path)
+                    self.__tables[table_name] = MMapManifestTable(table_path, self.__cache_size)
+            table = self.__tables[table_name]
+
+        return table
+
+    def __iter__(self):
+        return iter(self.__table_names)
+
+    def __len__(self) -> int:
+        return len(self.__table_names)
+
+    @property
+    def load_stats(self) -> dict[str, dict]:
+        """
+        Row count, cache size and hit rate of every table mapped so far
+        """
+        return {table_name: {"rows": len(table), **table.cache_stats} for table_name, table in self.__tables.items()}
+
+def build_table_mmap(table_name: str, manifest_path: str | None) -> int:
+    """
+    Write one hash keyed table of Manifest.content as {table}.mmap. The raw JSON is copied as is, nothing is decoded.
+    Returns the number of rows
+    """
+    if os.path.isfile(f'{manifest_path}/Manifest.content') is False:
+        create_manifest(manifest_path)
+
+    con = sqlite3.connect(f'{manifest_path}/Manifest.content')
+    # ids are the signed form of each hash, masking gives back the unsigned hash
+    rows = sorted((id & 0xFFFFFFFF, json_text) for id, json_text in con.execute(f'SELECT id, json FROM {table_name}'))
+    con.close()
+
+    hashes = array('I', (hash for hash, _ in rows))
+    offsets = array('Q', [0])
+    blobs = []
+    for _, json_text in rows:
+        blob = json_text.encode('utf-8') if isinstance(json_text, str) else bytes(json_text)
+        blobs.append(blob)
+        offsets.append(offsets[-1] + len(blob))
+
+    hashes_start = MMAP_HEADER.size
+    padding = padded(hashes_start + len(hashes) * 4) - (hashes_start + len(hashes) * 4)
+
+    # written beside the final file and swapped in, so a worker never maps a half written table
+    tmp_path = f'{manifest_path}/{table_name}.mmap.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as data:
+        data.write(MMAP_HEADER.pack(MMAP_MAGIC, len(hashes), offsets[-1]))
+        data.write(hashes.tobytes())
+        data.write(b'\0' * padding)
+        data.write(offsets.tobytes())
+        for blob in blobs:
+            data.write(blob)
+    os.replace(tmp_path, f'{manifest_path}/{table_name}.mmap')
+    print(f"'{table_name}.mmap' created!")
+    return len(rows)
@@ -0,0 +1,182 @@
+import json
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+from backend.manifest.create_manifest import create_manifest, build_in_pool
+
+# The only definition fields the pipeline reads. A "[]" step projects every element of a list
+PROJECTIONS: dict[str, list[tuple[str, ...]]] = {
+    'DestinyInventoryItemDefinition': [
+        ('displayProperties', 'name'),
+        ('itemTypeDisplayName',),
+        ('itemTypeAndTierDisplayName',),
+        ('equippingBlock', 'ammoType'),
+        ('equippingBlock', 'equipmentSlotTypeHash'),
+        ('damageTypes',),
+        ('stats', 'stats', '2961396640', 'value'),  # charge time
+        ('stats', 'stats', '2837207746', 'value'),  # swing speed
+        ('stats', 'stats', '4284893193', 'value'),  # rounds per minute
+    ],
+    'DestinyActivityDefinition': [
+        ('displayProperties', 'name'),
+        ('matchmaking', 'maxPlayers'),
+        ('activityTypeHash',),
+        ('modifiers', '[]', 'activityModifierHash'),
+    ],
+    'DestinyActivityTypeDefinition': [
+        ('displayProperties', 'name'),
+    ],
+    'DestinyActivityModifierDefinition': [
+        ('displayProperties', 'name'),
+    ],
+    'DestinyClassDefinition': [
+        ('displayProperties', 'name'),
+    ],
+}
+
+PROJECTED_FILE = 'manifest.projected.pickle'
+
+_MISSING = None  # marks a field the definition does not have
+
+def project(definition: dict, path: tuple[str, ...]):
+    """
+    Follow path through a definition. Returns _MISSING if any step is absent
+    """
+    value = definition
+    for i, step in enumerate(path):
+        if step == '[]':
+            if not isinstance(value, list):
+                return _MISSING
+            return tuple(project(element, path[i + 1:]) for element in value)
+        if not isinstance(value, dict) or step not in value:
+            return _MISSING
+        value = value[step]
+
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+def unproject(record: dict, path: tuple[str, ...], value) -> None:
+    """
+    Write a projected value back into a nested definition shaped like the original JSON
+    """
+    for i, step in enumerate(path[:-1]):
+        if path[i + 1] == '[]':
+            record[step] = [unproject_element(path[i + 2:], element) for element in value]
+            return
+        record = record.setdefault(step, {})
+
+    record[path[-1]] = list(value) if isinstance(value, tuple) else value
+
+def unproject_element(path: tuple[str, ...], value) -> dict:
+    element: dict = {}
+    if value is not _MISSING:
+        unproject(element, path, value)
+    return element
+
+class ProjectedTable(Mapping):
+    """
+    A projected definition table stored as struct-of-arrays: a sorted array of hashes plus one column per projected field.
+    Lookups binary search the hashes and rebuild a small definition holding only the projected fields
+    """
+    def __init__(self, hashes: array, columns: dict[tuple[str, ...], tuple]) -> None:
+        self.__hashes = hashes
+        self.__columns = columns
+
+    def __getitem__(self, definition_hash):
+        if not isinstance(definition_hash, int):
+            raise KeyError(definition_hash)
+
+        i = bisect_left(self.__hashes, definition_hash)
+        if i == len(self.__hashes) or self.__hashes[i] != definition_hash:
+            raise KeyError(definition_hash)
+
+        definition: dict = {'hash': definition_hash}
+        for path, column in self.__columns.items():
+            if column[i] is not _MISSING:
+                unproject(definition, path, column[i])
+        return definition
+
+    def __iter__(self):
+        return iter(self.__hashes)
+
+    def __len__(self) -> int:
+        return len(self.__hashes)
+
+class ProjectedManifestData(Mapping):
+    """
+    Projected definition tables keyed by table name, loaded from manifest.projected.pickle on first access
+    """
+    def __init__(self, manifest_path: str | None) -> None:
+        self.__manifest_path = manifest_path
+        self.__tables: dict[str, ProjectedTable] | None = None
+        self.__lock = threading.Lock()
+
+    def __getitem__(self, table_name: str) -> ProjectedTable:
+        return self.__load()[table_name]
+
+    def __iter__(self):
+        return iter(PROJECTIONS)
+
+    def __len__(self) -> int:
+        return len(PROJECTIONS)
+
+    def __load(self) -> dict[str, ProjectedTable]:
+        if self.__tables is None:
+            with self.__lock:
+                if self.__tables is None:
+                    projected_path = f'{self.__manifest_path}/{PROJECTED_FILE}'
+                    if os.path.isfile(projected_path) is False:
+                        build_projected_manifest(self.__manifest_path)
+
+                    with open(projected_path, 'rb') as data:
+                        store = pickle.load(data)
+                    self.__tables = {
+                        table_name: ProjectedTable(table['hashes'], table['columns']) for table_name, table in store.items()
+                    }
+
+        return self.__tables
+
+def project_table(table_name: str, manifest_path: str | None) -> dict:
+    """
+    Decode one table of Manifest.content into struct-of-arrays form
+    """
+    paths = PROJECTIONS[table_name]
+    con = sqlite3.connect(f'{manifest_path}/Manifest.content')
+    definitions = sorted((json.loads(row[0]) for row in con.execute(f'SELECT json FROM {table_name}')), key=lambda d: d['hash'])
+    con.close()
+
+    return {
+        'hashes': array('L', (definition['hash'] for definition in definitions)),
+        'columns': {path: tuple(project(definition, path) for definition in definitions) for path in paths}
+    }
+
+def build_projected_manifest(manifest_path: str | None, max_workers: int | None=None) -> None:
+    """
+    Project every used table of Manifest.content into manifest.projected.pickle, one table per worker process
+    """
+    if os.path.isfile(f'{manifest_path}/Manifest.content') is False:
+        create_manifest(manifest_path)
+
+    jobs = {table_name: (table_name, manifest_path) for table_name in PROJECTIONS}
+    store = build_in_pool(project_table, jobs, count=lambda table: len(table['hashes']), max_workers=max_workers)
+
+    # written beside the final file and swapped in, so a worker never loads a half written store
+    tmp_path = f'{manifest_path}/{PROJECTED_FILE}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as data:
+        pickle.dump(store, data, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, f'{manifest_path}/{PROJECTED_FILE}')
+    print(f"'{PROJECTED_FILE}' created!")
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    build_projected_manifest(os.getenv('PATH_TO_MANIFEST'))
@@ -0,0 +1,85 @@
+import marshal
+import pickle
+from abc import ABC, abstractmethod
+from typing import Any, BinaryIO
+
+try:
+    import msgpack
+except ImportError:  # optional, only needed for the msgpack format
+    msgpack = None
+
+class Serializer(ABC):
+    """
+    Reads and writes one manifest table file. name is what MANIFEST_FORMAT selects, extension is the file suffix
+    """
+    name = ''
+    extension = ''
+
+    @abstractmethod
+    def dump(self, table: Any, data: BinaryIO) -> None:
+        pass
+
+    @abstractmethod
+    def load(self, data: BinaryIO) -> Any:
+        pass
+
+    @property
+    def available(self) -> bool:
+        return True
+
+class PickleSerializer(Serializer):
+    name = 'pickle'
+    extension = '.pickle'
+
+    def __init__(self, protocol: int=5) -> None:
+        self.__protocol = protocol
+
+    def dump(self, table: Any, data: BinaryIO) -> None:
+        pickle.dump(table, data, protocol=self.__protocol)
+
+    def load(self, data: BinaryIO) -> Any:
+        return pickle.load(data)
+
+class MarshalSerializer(Serializer):
+    """
+    CPython's internal format. Fast and compact, but only readable by the same Python version that wrote it
+    """
+    name = 'marshal'
+    extension = '.marshal'
+
+    def dump(self, table: Any, data: BinaryIO) -> None:
+        marshal.dump(table, data)
+
+    def load(self, data: BinaryIO) -> Any:
+        return marshal.load(data)
+
+class MsgpackSerializer(Serializer):
+    name = 'msgpack'
+    extension = '.msgpack'
+
+    def dump(self, table: Any, data: BinaryIO) -> None:
+        msgpack.pack(table, data, use_bin_type=True)
+
+    def load(self, data: BinaryIO) -> Any:
+        # definition tables are keyed by integer hashes
+        return msgpack.unpack(data, raw=False, strict_map_key=False)
+
+    @property
+    def available(self) -> bool:
+        return msgpack is not None
+
+SERIALIZERS: dict[str, Serializer] = {
+    serializer.name: serializer for serializer in (PickleSerializer(), MarshalSerializer(), MsgpackSerializer())
+}
+
+def get_serializer(name: str) -> Serializer:
+    """
+    Serializer registered under name. Raises ValueError for unknown formats or ones whose library is not installed
+    """
+    serializer = SERIALIZERS.get(name)
+    if serializer is None:
+        raise ValueError(f"Unknown manifest format {name}")
+    if serializer.available is False:
+        raise ValueError(f"Manifest format {name} needs the {name} package")
+
+    return serializer
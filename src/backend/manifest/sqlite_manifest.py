@@ -0,0 +1,101 @@
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+
+from backend.cache import LRUCache
+from backend.manifest.create_manifest import create_manifest, unsigned_to_signed
+
+class SQLiteManifestTable(Mapping):
+    """
+    One definition table answered by point queries against Manifest.content. Definitions are keyed by their unsigned
+    hash, like the pickled tables, and decoded definitions are kept in a bounded LRU cache
+    """
+    def __init__(self, db: sqlite3.Connection, lock: threading.Lock, table_name: str, hash: str, cache_size: int) -> None:
+        self.__db = db
+        self.__lock = lock
+        self.__table_name = table_name
+        # hash keyed tables use the signed 32-bit hash as their integer id, the rest are keyed by a text key
+        self.__hashed = hash == 'hash'
+        self.__column = 'id' if self.__hashed else 'key'
+        self.__cache = LRUCache(cache_size)
+
+    def __getitem__(self, definition_hash):
+        definition = self.__cache.get(definition_hash)
+        if definition is not None:
+            return definition
+
+        key = unsigned_to_signed(definition_hash) if self.__hashed and isinstance(definition_hash, int) else definition_hash
+        with self.__lock:
+            row = self.__db.execute(f"SELECT json FROM {self.__table_name} WHERE {self.__column} = ?", (key,)).fetchone()
+
+        if row is None:
+            raise KeyError(definition_hash)
+
+        definition = json.loads(row[0])
+        self.__cache.put(definition_hash, definition)
+        return definition
+
+    def __iter__(self):
+        with self.__lock:
+            keys = [row[0] for row in self.__db.execute(f"SELECT {self.__column} FROM {self.__table_name}")]
+
+        for key in keys:
+            yield key & 0xFFFFFFFF if self.__hashed else key
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return self.__db.execute(f"SELECT COUNT(*) FROM {self.__table_name}").fetchone()[0]
+
+    @property
+    def cache_stats(self) -> dict:
+        return self.__cache.stats
+
+class SQLiteManifestData(Mapping):
+    """
+    Definition tables keyed by table name, backed by a read-only connection to Manifest.content
+    """
+    def __init__(self, manifest_path: str | None, hashes: dict, cache_size: int=4096) -> None:
+        self.__manifest_path = manifest_path
+        self.__hashes = hashes
+        self.__cache_size = cache_size
+        self.__db: sqlite3.Connection | None = None
+        self.__tables: dict[str, SQLiteManifestTable] = {}
+        self.__lock = threading.Lock()
+
+    def __getitem__(self, table_name: str) -> SQLiteManifestTable:
+        if table_name not in self.__hashes:
+            raise KeyError(table_name)
+
+        table = self.__tables.get(table_name)
+        if table is None:
+            db = self.__connect()
+            table = SQLiteManifestTable(db, self.__lock, table_name, self.__hashes[table_name], self.__cache_size)
+            self.__tables.setdefault(table_name, table)
+
+        return self.__tables[table_name]
+
+    def __iter__(self):
+        return iter(self.__hashes)
+
+    def __len__(self) -> int:
+        return len(self.__hashes)
+
+    def __connect(self) -> sqlite3.Connection:
+        with self.__lock:
+            if self.__db is None:
+                content_path = f"{self.__manifest_path}/Manifest.content"
+                if os.path.isfile(content_path) is False:
+                    create_manifest(self.__manifest_path)
+
+                self.__db = sqlite3.connect(f"file:{content_path}?mode=ro", uri=True, check_same_thread=False)
+
+        return self.__db
+
+    @property
+    def load_stats(self) -> dict[str, dict]:
+        """
+        Cache size and hit rate of every table read so far
+        """
+        return {table_name: table.cache_stats for table_name, table in self.__tables.items()}
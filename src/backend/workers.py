@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+class BoundedExecutor:
+    """
+    Thread pool for blocking work awaited from the event loop. At most max_workers calls run at once and max_queued
+    more may wait for a worker, past that run raises TimeoutError instead of queueing without limit
+    """
+    def __init__(self, name: str, max_workers: int, max_queued: int) -> None:
+        self.__name = name
+        self.__max_workers = max_workers
+        self.__max_queued = max_queued
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.__pending = 0  # submitted and not finished, running or waiting for a worker
+        self.__active = 0
+        self.__peak_pending = 0
+        self.__completed = 0
+        self.__failed = 0
+        self.__rejected = 0
+        self.__wait_total = 0.0
+        self.__wait_max = 0.0
+        self.__lock = threading.Lock()
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) on a worker thread and wait for its result without blocking the loop
+        """
+        with self.__lock:
+            if self.__pending >= self.__max_workers + self.__max_queued:
+                self.__rejected += 1
+                raise TimeoutError(f"{self.__name} pool saturated, {self.__pending} calls already running or queued")
+            self.__pending += 1
+            self.__peak_pending = max(self.__peak_pending, self.__pending)
+
+        try:
+            future = self.__executor.submit(self.__call, time.monotonic(), fn, args, kwargs)
+        except BaseException:
+            self.__finished(None)
+            raise
+        # released when the work itself ends, or is cancelled before a worker took it, not when the caller stops waiting
+        future.add_done_callback(self.__finished)
+        return await asyncio.wrap_future(future)
+
+    def __finished(self, future: Optional[Future]) -> None:
+        with self.__lock:
+            self.__pending -= 1
+
+    def __call(self, submitted: float, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        waited = time.monotonic() - submitted
+        with self.__lock:
+            self.__active += 1
+            self.__wait_total += waited
+            self.__wait_max = max(self.__wait_max, waited)
+
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            with self.__lock:
+                self.__failed += 1
+            raise
+        finally:
+            with self.__lock:
+                self.__active -= 1
+                self.__completed += 1
+
+    def shutdown(self) -> None:
+        self.__executor.shutdown(wait=True)
+
+    @property
+    def stats(self) -> dict:
+        with self.__lock:
+            started = self.__completed + self.__active
+            return {
+                "workers": self.__max_workers,
+                "max_queued": self.__max_queued,
+                "active": self.__active,
+                "queued": self.__pending - self.__active,
+                "peak_pending": self.__peak_pending,
+                "saturation": round(self.__pending / (self.__max_workers + self.__max_queued), 4),
+                "completed": self.__completed,
+                "failed": self.__failed,
+                "rejected": self.__rejected,
+                "avg_wait_ms": round(self.__wait_total / started * 1000, 3) if started else 0.0,
+                "max_wait_ms": round(self.__wait_max * 1000, 3)
+            }
@@ -1,4 +1,4 @@
-import { UserData, FilterValues, StatsData, ActivityStatsApiResponse, CharacterDetails, CharacterDetailsApiResponse } from '../types';
+import { UserData, FilterValues, StatsData, StatsPage, ActivityStatsApiResponse, CharacterDetails, CharacterDetailsApiResponse } from '../types';
 
 const API_BASE_URL = import.meta.env.VITE_D2_SANDBOX_API_URL;
 
@@ -186,9 +186,16 @@ export async function fetchCharacterDetails(playerId: number, bngCharacterId: st
 }
 
 /**
- * Fetches activity stats based on selected filters and player ID.
+ * Fetches the first page of activity stats based on selected filters and player ID.
  */
 export async function fetchGearActivityStats(filters: FilterValues, playerId: number): Promise<StatsData> { // Return type is still StatsData (ActivityStatEntry[])
+    return (await fetchGearActivityStatsPage(filters, playerId)).stats;
+}
+
+/**
+ * Fetches one page of activity stats. Pass the previous page's nextCursor as `after` to scroll further.
+ */
+export async function fetchGearActivityStatsPage(filters: FilterValues, playerId: number, after?: string): Promise<StatsPage> {
     if (!ACTIVITY_STATS_ENDPOINT) {
         throw new Error("Activity Stats API Endpoint is not configured.");
     }
@@ -203,8 +210,9 @@ export async function fetchGearActivityStats(filters: FilterValues, playerId: nu
     params.append('character_id', filters.characterId);
     if (filters.mode) { params.append('mode', filters.mode); } // Send string label
     else if (filters.activityName) { params.append('activity_name', filters.activityName); }
-    const count = filters.count || 25;
-    params.append('count', count.toString());
+    const limit = filters.count || 25;
+    params.append('limit', limit.toString());
+    if (after) { params.append('after', after); }
 
     const apiUrl = `${ACTIVITY_STATS_ENDPOINT}/${playerId}?${params.toString()}`;
     console.log("Calling GET Activity Stats API:", apiUrl);
@@ -242,7 +250,8 @@ export async function fetchGearActivityStats(filters: FilterValues, playerId: nu
             if (statusCode >= 200 && statusCode < 300) {
                  // Validate the inner array elements (optional but good practice)
                  if (statsArray.every(item => typeof item === 'object' && item !== null && 'activity_name' in item)) {
-                    return statsArray as StatsData; // Return the inner array containing stats objects
+                    // The cursor for the next page comes back in a header, null once the last page is reached
+                    return { stats: statsArray as StatsData, nextCursor: response.headers.get('X-Next-Cursor') };
                  } else {
                      console.error("Inner array elements do not match expected ActivityStatEntry structure.");
                      throw new Error("Unexpected structure within stats data array.");
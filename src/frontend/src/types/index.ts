@@ -53,4 +53,8 @@ export type StatsData = ActivityStatEntry[];
 export type GetUserApiResponse = [UserData, number];
 export type CharacterDetailsApiResponse = [CharacterDetails, number];
 export type ActivityStatsApiResponse = [ActivityStatEntry[], number]; // [ array_of_stats, status_code ]
+export interface StatsPage {
+    stats: StatsData;
+    nextCursor: string | null; // pass as `after` to fetch the next page, null on the last page
+}
 
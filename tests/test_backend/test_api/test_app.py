@@ -0,0 +1,167 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from fastapi import Response
+
+# the app opens its database connection at import
+with patch("backend.load.connector.connector"):
+    from backend.api import app
+from backend.load.connector import SQLConnector
+
+class ImmediatePool:
+    """
+    Runs pool work inline so handlers can be awaited without worker threads
+    """
+    async def run(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+class StubCursor:
+    """
+    Cursor that, like a real one, has a result set for any statement that returns rows, whatever it starts with
+    """
+    def __init__(self, rows: list) -> None:
+        self.rows = rows
+        self.with_rows = False
+        self.statements: list = []
+
+    def execute(self, query: str, params=()) -> None:
+        self.statements.append((query, params))
+        self.with_rows = "SELECT" in query
+
+    def fetchall(self) -> list:
+        return self.rows
+
+    def close(self) -> None:
+        pass
+
+def stats_row(instance_id: int, weapon_id: int) -> tuple:
+    return (1, 2, instance_id, "Crota's End", weapon_id, "Riptide", 10, 5, 50.0, "HUNTER")
+
+class ActivityStatsQueryTestCase(unittest.TestCase):
+    def test_activity_stats_query_character(self):
+        query, params = app.activity_stats_query([7])
+
+        assert query.startswith("SELECT s.character_id, s.activity_id, s.instance_id")
+        assert query.endswith("FROM `Activity_Stats` s WHERE s.character_id = %s ORDER BY s.instance_id, s.weapon_id")
+        assert "UNION" not in query
+        assert params == (7,)
+
+    def test_activity_stats_query_mode(self):
+        query, params = app.activity_stats_query([7], mode="raid")
+
+        assert "FROM `Activity_Stats` s JOIN `Activity` a ON a.activity_id = s.activity_id WHERE s.character_id = %s AND a.type = %s" in query
+        assert params == (7, "raid")
+
+    def test_activity_stats_query_activity_name(self):
+        query, params = app.activity_stats_query([7], act_name="Crota's End")
+
+        assert "JOIN `Activity`" not in query
+        assert "WHERE s.character_id = %s AND s.activity_name = %s ORDER BY" in query
+        assert params == (7, "Crota's End")
+
+    def test_activity_stats_query_mode_over_activity_name(self):
+        query, params = app.activity_stats_query([7], mode="raid", act_name="Crota's End")
+
+        assert "s.activity_name" not in query.split("WHERE")[1]
+        assert params == (7, "raid")
+
+    def test_activity_stats_query_count(self):
+        query, params = app.activity_stats_query([7, 8], act_name="Crota's End", count=25)
+
+        assert query.count("LIMIT %s") == 3
+        assert params == (7, "Crota's End", 25, 8, "Crota's End", 25, 25)
+
+        query, params = app.activity_stats_query([7], count=0)
+        assert "LIMIT" not in query
+        assert params == (7,)
+
+    def test_get_character_ids_by_character(self):
+        db_conn = MagicMock()
+        db_conn.execute.return_value = [(7,)]
+        with patch.object(app, "db_conn", db_conn):
+            assert app.get_character_ids(1, 4611686018) == [7]
+
+        db_conn.execute.assert_called_once_with(
+            "SELECT character_id FROM `Character` WHERE player_id = %s AND bng_character_id = %s", (1, 4611686018), prepared=True
+        )
+
+class StatsPaginationTestCase(unittest.IsolatedAsyncioTestCase):
+    def test_parse_stats_cursor(self):
+        assert app.parse_stats_cursor("12345:67") == (12345, 67)
+        assert app.parse_stats_cursor("12345") is None
+        assert app.parse_stats_cursor("a:b") is None
+        assert app.parse_stats_cursor("1:2:3") is None
+
+    def test_activity_stats_query_cursor(self):
+        query, params = app.activity_stats_query([7], count=25, after=(100, 20))
+
+        assert "WHERE s.character_id = %s AND (s.instance_id > %s OR (s.instance_id = %s AND s.weapon_id > %s))" in query
+        assert query.endswith("ORDER BY s.instance_id, s.weapon_id LIMIT %s")
+        assert params == (7, 100, 100, 20, 25)
+
+    def test_activity_stats_query_merges_characters(self):
+        query, params = app.activity_stats_query([7, 8], count=25, after=(100, 20))
+
+        assert query.count("ORDER BY s.instance_id, s.weapon_id LIMIT %s) ") == 2
+        assert ") UNION ALL (" in query
+        assert query.endswith(") ORDER BY instance_id, weapon_id LIMIT %s")
+        assert params == (7, 100, 100, 20, 25, 8, 100, 100, 20, 25, 25)
+
+    async def call_endpoint(self, rows, **kwargs):
+        response = Response()
+        db_conn = MagicMock()
+        db_conn.execute.return_value = rows
+        with patch.object(app, "read_pool", ImmediatePool()), patch.object(app, "db_conn", db_conn), \
+                patch.object(app, "get_character_ids", return_value=[7, 8]):
+            result = await app.get_activity_stats_by_id(1, response, **kwargs)
+
+        return result, response, db_conn
+
+    async def test_stats_full_page_sets_next_cursor(self):
+        result, response, db_conn = await self.call_endpoint([stats_row(100, 20), stats_row(101, 5)], limit=2)
+
+        assert response.status_code == 200
+        assert response.headers["X-Next-Cursor"] == "101:5"
+        assert [row["instance_id"] for row in result[0]] == [100, 101]
+        assert db_conn.execute.call_args[0][1][-1] == 2
+
+    async def test_stats_last_page_has_no_cursor(self):
+        result, response, _ = await self.call_endpoint([stats_row(100, 20)], limit=2, after="99:1")
+
+        assert response.status_code == 200
+        assert "X-Next-Cursor" not in response.headers
+        assert len(result[0]) == 1
+
+    async def test_stats_past_last_page_is_empty(self):
+        result, response, _ = await self.call_endpoint([], after="101:5")
+
+        assert response.status_code == 200
+        assert result == ([], 200)
+
+    async def test_stats_page_size_capped(self):
+        _, _, db_conn = await self.call_endpoint([], count=app.STATS_PAGE_SIZE + 1, after="1:1")
+
+        assert db_conn.execute.call_args[0][1][-1] == app.STATS_PAGE_SIZE
+
+    async def test_stats_invalid_page_size_and_cursor(self):
+        for kwargs in ({"limit": -1}, {"count": -5}, {"after": "not-a-cursor"}):
+            _, response, db_conn = await self.call_endpoint([], **kwargs)
+
+            assert response.status_code == 400, kwargs
+            db_conn.execute.assert_not_called()
+
+    async def test_stats_multiple_characters_through_connector(self):
+        rows = [stats_row(100, 20), stats_row(101, 5)]
+        cursor = StubCursor(rows)
+        with patch("backend.load.connector.connector") as mock_connector:
+            mock_connector.connect.return_value.cursor.return_value = cursor
+            db_conn = SQLConnector("test DB", 1111)
+
+        response = Response()
+        with patch.object(app, "read_pool", ImmediatePool()), patch.object(app, "db_conn", db_conn), \
+                patch.object(app, "get_character_ids", return_value=[7, 8]):
+            result = await app.get_activity_stats_by_id(1, response)
+
+        assert cursor.statements[0][0].startswith("(SELECT")
+        assert response.status_code == 200
+        assert [row["instance_id"] for row in result[0]] == [100, 101]
+        mock_connector.connect.return_value.commit.assert_not_called()
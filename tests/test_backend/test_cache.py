@@ -0,0 +1,55 @@
+import unittest
+from unittest.mock import patch
+
+from backend.cache import LRUCache
+
+class LRUCacheTestCase(unittest.TestCase):
+    def test_lru_cache_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert "b" not in cache
+        assert cache.values() == [1, 3]
+        assert cache.stats["evictions"] == 1
+
+    def test_lru_cache_on_evict(self):
+        evicted = []
+        cache = LRUCache(1, on_evict=lambda key, value: evicted.append((key, value)))
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.pop("b")
+
+        assert evicted == [("a", 1)]
+
+    @patch("backend.cache.time.monotonic")
+    def test_lru_cache_ttl_expires_entries(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        cache = LRUCache(10, ttl=60)
+        cache.put("a", 1)
+
+        mock_monotonic.return_value = 159.0
+        assert cache.get("a") == 1
+
+        mock_monotonic.return_value = 160.0
+        assert cache.get("a") is None
+        assert len(cache) == 0
+        assert cache.stats["hits"] == 1
+        assert cache.stats["misses"] == 1
+        assert cache.stats["expirations"] == 1
+
+    @patch("backend.cache.time.monotonic")
+    def test_lru_cache_put_refreshes_ttl(self, mock_monotonic):
+        mock_monotonic.return_value = 0.0
+        cache = LRUCache(10, ttl=60)
+        cache.put("a", 1)
+
+        mock_monotonic.return_value = 50.0
+        cache.put("a", 2)
+
+        mock_monotonic.return_value = 100.0
+        assert cache.get("a") == 2
+        assert cache.pop("a") == 2
+        assert cache.pop("a", "gone") == "gone"
@@ -849,3 +849,42 @@ class ActivityInstanceDataTestCase(unittest.TestCase):
             assert all_instance_stats[i].data == expected_stats_data[i]
             assert all_instance_stats[i].og_data == expected_og_data[i]
             assert all_instance_stats[i].participant == expected_participant_data[i]
+
+    def test_activity_instance_create_stats_single_pgcr_request(self):
+        manifest = DestinyManifest()
+        manifest.all_data = MagicMock()
+
+        mock_pgcr = {
+            "activityDetails": {
+                "directorActivityHash": 3782,
+            },
+            "entries": [
+                {
+                    "characterId": "1102",
+                    "extended": {
+                        "weapons": [
+                            {"referenceId": 1666},
+                            {"referenceId": 1234},
+                            {"referenceId": 2000}
+                        ]
+                    }
+                },
+                {
+                    "characterId": "7780",
+                    "extended": {
+                        "weapons": [
+                            {"referenceId": 3232},
+                            {"referenceId": 6900}
+                        ]
+                    }
+                }
+            ]
+        }
+        self.conn.get_url_request.return_value = mock_pgcr
+
+        activity_instance = ActivityInstanceData(self.conn, self.mock_instance_id)
+        activity_instance.define_data()
+        activity_instance.create_stats(manifest)
+
+        assert len(activity_instance.get_instance_stats()) == 5
+        self.conn.get_url_request.assert_called_once_with(self.pgcr_path)
@@ -1,7 +1,8 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 from backend.data.bng_data import CharacterData
+from backend.data.bng_types import ACTIVITY_TYPE
 
 class CharacterDataTestCase(unittest.TestCase):
     def setUp(self):
@@ -229,3 +230,78 @@ class CharacterDataTestCase(unittest.TestCase):
         instance_ids = self.character.get_activity_hist_instances(1, 1, test_activity_inst_path)
 
         assert instance_ids == []
+
+    def test_get_activity_inst_hist_by_mode(self):
+        self.conn.get_url_request.return_value = {
+            "activities": [
+                {"activityDetails": {"instanceId": "101", "mode": 48, "modes": [48, 5]}},
+                {"activityDetails": {"instanceId": "102", "mode": 84, "modes": [84, 5]}},
+                {"activityDetails": {"instanceId": "103", "mode": 48, "modes": [48, 5]}},
+                {"activityDetails": {"instanceId": "104", "mode": 4, "modes": [4, 7]}},
+                {"activityDetails": {"instanceId": "105", "mode": 48, "modes": [48, 5]}},
+                {"activityDetails": {"instanceId": "106", "mode": 6, "modes": [6, 7]}},
+                {"activityDetails": {"mode": 3}}
+            ]
+        }
+
+        instance_ids = self.character.get_activity_hist_by_mode(250, 2)
+
+        self.conn.get_url_request.assert_called_once_with(
+            "https://www.bungie.net/Platform/Destiny2/1/Account/1010101010101/Character/111111111/Stats/Activities/?count=250&page=1"
+        )
+        assert instance_ids[ACTIVITY_TYPE.RUMBLE] == [101, 103]
+        assert instance_ids[ACTIVITY_TYPE.TRIALS_OF_OSIRIS] == [102]
+        assert instance_ids[ACTIVITY_TYPE.RAID] == [104]
+        assert instance_ids[ACTIVITY_TYPE.STRIKE] == []
+        assert set(instance_ids.keys()) == set(ACTIVITY_TYPE)
+
+    def test_unsuccessful_get_activity_inst_hist_by_mode(self):
+        self.conn.get_url_request.return_value = None
+
+        instance_ids = self.character.get_activity_hist_by_mode(250, 5)
+
+        assert all(ids == [] for ids in instance_ids.values())
+
+class AsyncCharacterDataTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_get_activity_inst_hist_async(self):
+        conn = MagicMock()
+        conn.get_url_request = AsyncMock(return_value={
+            "activities": [
+                {
+                    "activityDetails": {
+                        "instanceId": "101010101"
+                    }
+                },
+                {
+                    "activityDetails": {
+                        "instanceId": "202020202"
+                    }
+                }
+            ]
+        })
+        character = CharacterData(conn, 1010101010101, 1, 111111111, 1)
+
+        test_activity_inst_path = "https://example.com/api/activity-instance-history"
+        instance_ids = await character.get_activity_hist_instances_async(1, 1, test_activity_inst_path)
+
+        conn.get_url_request.assert_awaited_once_with(test_activity_inst_path)
+        assert instance_ids == [101010101, 202020202]
+
+    async def test_char_def_data_async(self):
+        conn = MagicMock()
+        conn.fetch_many = AsyncMock(return_value=[
+            {"character": {"data": {"classType": 2, "dateLastPlayed": "2017-07-07T07:07:07Z"}}},
+            {"equipment": {"data": {"items": [{"itemHash": i} for i in range(8)]}}}
+        ])
+        character = CharacterData(conn, 1010101010101, 1, 111111111, 1)
+
+        await character.define_data_async()
+
+        conn.fetch_many.assert_awaited_once()
+        assert character.data == {
+            "bng_character_id": 111111111,
+            "player_id": 1,
+            "class": "WARLOCK",
+            "date_last_played": "2017-07-07"
+        }
+        assert character.equipment == {"weapons": [0, 1, 2], "armor": [3, 4, 5, 6, 7]}
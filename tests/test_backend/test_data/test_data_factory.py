@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 from backend.data.bng_data import (
     WeaponData,
@@ -388,3 +388,56 @@ class DataFactoryTestCase(unittest.TestCase):
             40404040404: [555666777, 333444555, 222333444]
         }
         assert activity_instance.participants_data == expected_instance_data
+
+class AsyncDataFactoryTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_player_factory_async(self):
+        conn = MagicMock()
+        conn.fetch_many = AsyncMock(return_value=[
+            {
+                "bungieNetUser": {
+                    "firstAccess": "2007-07-07T07:07:07Z",
+                    "membershipId": "77777777777777777",
+                    "uniqueName": "Bungie Net User"
+                }
+            },
+            {
+                "profile": {
+                    "data": {
+                        "dateLastPlayed": "2017-07-07T07:07:07Z",
+                        "characterIds": ["111111111111"]
+                    }
+                }
+            }
+        ])
+
+        player = await DataFactory.get_player_async(1412, 1, conn)
+
+        assert player.data == {
+            "date_created": "2007-07-07",
+            "date_last_played": "2017-07-07",
+            "bng_id": 77777777777777777,
+            "destiny_id": 1412,
+            "bng_username": "Bungie Net User",
+            "platform": "XBOX",
+            "character_ids": ["111111111111"]
+        }
+
+    async def test_activity_instances_factory_async(self):
+        conn = MagicMock()
+        conn.fetch_many = AsyncMock(return_value=[
+            {
+                "activityDetails": {"directorActivityHash": 1029384756},
+                "entries": [{"characterId": "10101010101", "extended": {"weapons": [{"referenceId": 111222333}]}}]
+            },
+            None
+        ])
+
+        instances = await DataFactory.get_activity_instances_async([123, 456], conn)
+
+        conn.fetch_many.assert_awaited_once_with([
+            "https://www.bungie.net/Platform/Destiny2/Stats/PostGameCarnageReport/123/",
+            "https://www.bungie.net/Platform/Destiny2/Stats/PostGameCarnageReport/456/"
+        ])
+        conn.get_url_request.assert_not_called()
+        assert instances[0].participants_data == {10101010101: [111222333]}
+        assert instances[1].participants_data == {}
@@ -1,26 +1,169 @@
-import json
+import asyncio
 import unittest
-from unittest.mock import patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from backend.extract.bng_api_connector import BungieConnector
+from backend.extract.bng_api_connector import BungieConnector, AsyncBungieConnector, RateLimiter
 
 class APIConnectorTestCase(unittest.TestCase):
-    @patch("backend.extract.bng_api_connector.urlopen")
-    def test_successful_bng_api_response(self, mock_urlopen):
+    @patch("backend.extract.bng_api_connector.Session.request")
+    def test_successful_bng_api_response(self, mock_request):
         conn = BungieConnector("test_api_key")
 
         response_data = {"Response": {"test_response": "player1"}}
-        mock_urlopen.return_value.__enter__.return_value.read.return_value = json.dumps(response_data)
+        mock_request.return_value.json.return_value = response_data
 
         test_path = "https://example.com/api"
         result = conn.get_url_request(test_path)
         assert result == response_data.get("Response")
 
-    @patch("backend.extract.bng_api_connector.urlopen")
-    def test_unsuccessful_bng_api_response(self, mock_urlopen):
+    @patch("backend.extract.bng_api_connector.Session.request")
+    def test_unsuccessful_bng_api_response(self, mock_request):
         conn = BungieConnector("test_api_key")
-        mock_urlopen.return_value.__enter__.return_value.read.return_value = json.dumps("")
+        mock_request.return_value.json.return_value = ""
 
         test_path = "https://example.com/api"
         result = conn.get_url_request(test_path)
         assert result is None
+
+    @patch("backend.extract.bng_api_connector.Session.request")
+    def test_bng_api_request_uses_timeout(self, mock_request):
+        conn = BungieConnector("test_api_key", timeout=(1.0, 2.0))
+        mock_request.return_value.json.return_value = {"Response": {}}
+
+        test_path = "https://example.com/api"
+        conn.get_url_request(test_path)
+        mock_request.assert_called_once()
+        assert mock_request.call_args.args == ("GET", test_path)
+        assert mock_request.call_args.kwargs["timeout"] == (1.0, 2.0)
+
+    @patch("backend.extract.bng_api_connector.Session.request")
+    def test_bng_api_request_with_body(self, mock_request):
+        conn = BungieConnector("test_api_key")
+        mock_request.return_value.json.return_value = {"Response": [{"membershipId": "1"}]}
+
+        test_path = "https://example.com/api"
+        body = {"displayName": "Guardian", "displayNameCode": "1234"}
+        result = conn.get_url_request(test_path, body)
+
+        mock_request.assert_called_once_with("POST", test_path, data=None, json=body, timeout=(5.0, 30.0))
+        assert result == [{"membershipId": "1"}]
+
+    def test_bng_api_connection_reuse(self):
+        conn = BungieConnector("test_api_key", pool_connections=2, pool_maxsize=5)
+        session = conn._BungieConnector__session
+        adapter = session.get_adapter("https://www.bungie.net/Platform")
+
+        assert session.headers["X-API-KEY"] == "test_api_key"
+        assert adapter._pool_connections == 2
+        assert adapter._pool_maxsize == 5
+
+    @patch("backend.extract.bng_api_connector.time.sleep")
+    @patch("backend.extract.bng_api_connector.Session.request")
+    def test_bng_api_request_retried_when_throttled(self, mock_request, mock_sleep):
+        limiter = RateLimiter(rate=10.0, burst=5)
+        conn = BungieConnector("test_api_key", limiter=limiter)
+        mock_request.return_value.json.side_effect = [
+            {"ErrorCode": 36, "ThrottleSeconds": 2, "Response": None},
+            {"ErrorCode": 1, "ThrottleSeconds": 0, "Response": {"test_response": "player1"}}
+        ]
+
+        result = conn.get_url_request("https://example.com/api")
+
+        assert result == {"test_response": "player1"}
+        assert mock_request.call_count == 2
+        assert mock_sleep.call_args_list[1].args[0] > 1.9
+        assert limiter.rate == 5.5
+
+class RateLimiterTestCase(unittest.TestCase):
+    def test_rate_limiter_burst(self):
+        limiter = RateLimiter(rate=10.0, burst=3)
+
+        waits = [limiter.reserve() for _ in range(5)]
+
+        assert waits[:3] == [0.0, 0.0, 0.0]
+        assert 0.05 < waits[3] <= 0.1
+        assert 0.15 < waits[4] <= 0.2
+
+    def test_rate_limiter_throttle_backoff_and_recovery(self):
+        limiter = RateLimiter(rate=8.0, burst=1, min_rate=1.0, recovery=1.0)
+
+        assert limiter.observe({"ErrorCode": 37, "ThrottleSeconds": 0})
+        assert limiter.rate == 4.0
+        assert limiter.reserve() > 0
+
+        assert not limiter.observe({"ErrorCode": 1, "ThrottleSeconds": 0})
+        assert limiter.rate == 5.0
+
+    def test_rate_limiter_throttle_seconds_pause(self):
+        limiter = RateLimiter(rate=10.0, burst=5)
+
+        assert not limiter.observe({"ErrorCode": 1, "ThrottleSeconds": 3})
+        assert limiter.reserve() > 2.9
+
+class AsyncAPIConnectorTestCase(unittest.IsolatedAsyncioTestCase):
+    @patch("backend.extract.bng_api_connector.AsyncClient.request", new_callable=AsyncMock)
+    async def test_successful_async_bng_api_response(self, mock_request):
+        conn = AsyncBungieConnector("test_api_key")
+
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"Response": {"test_response": "player1"}}
+        mock_request.return_value = mock_response
+
+        result = await conn.get_url_request("https://example.com/api")
+        assert result == {"test_response": "player1"}
+        await conn.close()
+
+    @patch("backend.extract.bng_api_connector.AsyncClient.request", new_callable=AsyncMock)
+    async def test_unsuccessful_async_bng_api_response(self, mock_request):
+        conn = AsyncBungieConnector("test_api_key")
+
+        mock_response = MagicMock()
+        mock_response.json.return_value = ""
+        mock_request.return_value = mock_response
+
+        result = await conn.get_url_request("https://example.com/api")
+        assert result is None
+        await conn.close()
+
+    async def test_async_fetch_many_bounded_and_ordered(self):
+        conn = AsyncBungieConnector("test_api_key", max_concurrency=2)
+        in_flight = 0
+        max_in_flight = 0
+
+        async def mock_request(client, method, url, **kwargs):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+            mock_response = MagicMock()
+            mock_response.json.return_value = {"Response": url}
+            return mock_response
+
+        paths = [f"https://example.com/api/{i}" for i in range(6)]
+        with patch("backend.extract.bng_api_connector.AsyncClient.request", new=mock_request):
+            results = await conn.fetch_many(paths)
+
+        assert results == paths
+        assert max_in_flight == 2
+        await conn.close()
+
+    def test_async_client_replaced_on_new_loop_is_closed(self):
+        conn = AsyncBungieConnector("test_api_key")
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"Response": "ok"}
+
+        async def request_then_yield():
+            result = await conn.get_url_request("https://example.com/api")
+            await asyncio.sleep(0)
+            return result
+
+        with patch("backend.extract.bng_api_connector.AsyncClient.request", new_callable=AsyncMock) as mock_request, \
+                patch("backend.extract.bng_api_connector.AsyncClient.aclose", new_callable=AsyncMock) as mock_aclose:
+            mock_request.return_value = mock_response
+            assert asyncio.run(request_then_yield()) == "ok"
+            mock_aclose.assert_not_awaited()
+
+            assert asyncio.run(request_then_yield()) == "ok"
+            mock_aclose.assert_awaited_once()
@@ -0,0 +1,104 @@
+import asyncio
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from backend.extract.bng_api_connector import AsyncBungieConnector, BungieConnector
+from backend.extract.pgcr_archive import PGCRArchive, pgcr_instance_id
+
+class PGCRArchiveTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.archive = PGCRArchive(f"{self.tmp_dir.name}/pgcr_archive.sqlite")
+        self.pgcr_path = "https://www.bungie.net/Platform/Destiny2/Stats/PostGameCarnageReport/123456789/"
+        self.mock_pgcr = {
+            "activityDetails": {"directorActivityHash": 1029384756},
+            "entries": [{"characterId": "10101010101"}]
+        }
+
+    def tearDown(self) -> None:
+        self.archive.close()
+        self.tmp_dir.cleanup()
+
+    def test_pgcr_archive_hit_and_miss(self):
+        assert self.archive.get(123456789) is None
+
+        self.archive.put(123456789, self.mock_pgcr)
+        assert self.archive.get(123456789) == self.mock_pgcr
+
+        stats = self.archive.stats
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["reports"] == 1
+
+    def test_pgcr_archive_size_eviction(self):
+        archive = PGCRArchive(f"{self.tmp_dir.name}/small_archive.sqlite", max_bytes=200)
+        big_pgcr = {"entries": [{"characterId": str(i) * 10} for i in range(20)]}
+
+        archive.put(1, big_pgcr)
+        archive.put(2, big_pgcr)
+        archive.get(1)  # 1 is now the most recently used report
+        archive.put(3, big_pgcr)
+
+        assert archive.stats["bytes"] <= 200
+        assert archive.get(3) == big_pgcr
+        assert archive.get(2) is None
+        archive.close()
+
+    def test_pgcr_archive_batches_access_times(self):
+        self.archive.put(1, self.mock_pgcr)
+        reader = sqlite3.connect(f"{self.tmp_dir.name}/pgcr_archive.sqlite")
+        stored = reader.execute("SELECT last_access FROM pgcr WHERE instance_id = 1").fetchone()[0]
+
+        self.archive.get(1)
+        assert reader.execute("SELECT last_access FROM pgcr WHERE instance_id = 1").fetchone()[0] == stored
+
+        # the next write carries the pending access times with it
+        self.archive.put(2, self.mock_pgcr)
+        assert reader.execute("SELECT last_access FROM pgcr WHERE instance_id = 1").fetchone()[0] > stored
+        reader.close()
+
+    def test_pgcr_archive_size_tracks_replaced_reports(self):
+        self.archive.put(1, self.mock_pgcr)
+        self.archive.put(2, self.mock_pgcr)
+        self.archive.put(1, {"entries": []})
+
+        stored = self.archive._PGCRArchive__db.execute("SELECT SUM(size) FROM pgcr").fetchone()[0]
+        assert self.archive.stats["bytes"] == stored
+        assert self.archive.stats["reports"] == 2
+
+    def test_pgcr_instance_id(self):
+        assert pgcr_instance_id(self.pgcr_path) == 123456789
+        assert pgcr_instance_id("https://stats.bungie.net/Platform/Destiny2/Stats/PostGameCarnageReport/42/") == 42
+        assert pgcr_instance_id("https://www.bungie.net/Platform/Destiny2/1/Profile/123/") is None
+
+    @patch("backend.extract.bng_api_connector.Session.request")
+    def test_connector_checks_archive_first(self, mock_request):
+        conn = BungieConnector("test_api_key", archive=self.archive)
+        mock_request.return_value.json.return_value = {"ErrorCode": 1, "Response": self.mock_pgcr}
+
+        assert conn.get_url_request(self.pgcr_path) == self.mock_pgcr
+        assert conn.get_url_request(self.pgcr_path) == self.mock_pgcr
+
+        mock_request.assert_called_once()
+        assert self.archive.stats["hits"] == 1
+
+    @patch("backend.extract.bng_api_connector.Session.request")
+    def test_connector_does_not_archive_failures(self, mock_request):
+        conn = BungieConnector("test_api_key", archive=self.archive)
+        mock_request.return_value.json.return_value = {"ErrorCode": 1653, "Response": {}}
+
+        conn.get_url_request(self.pgcr_path)
+        assert self.archive.stats["reports"] == 0
+
+    @patch("backend.extract.bng_api_connector.asyncio.to_thread")
+    def test_async_connector_archive_runs_off_loop(self, mock_to_thread):
+        async def to_thread(fn, *args):
+            return fn(*args)
+        mock_to_thread.side_effect = to_thread
+        self.archive.put(123456789, self.mock_pgcr)
+        conn = AsyncBungieConnector("test_api_key", archive=self.archive)
+
+        assert asyncio.run(conn.get_url_request(self.pgcr_path)) == self.mock_pgcr
+        mock_to_thread.assert_called_once()
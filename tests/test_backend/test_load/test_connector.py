@@ -1,5 +1,7 @@
+import threading
 import unittest
-from unittest.mock import patch
+from unittest.mock import MagicMock, call, patch
+from mysql.connector.errors import InterfaceError, OperationalError
 
 from backend.load.connector import SQLConnector
 
@@ -39,15 +41,28 @@ class SQLConnectorTestCase(unittest.TestCase):
     def test_successful_db_connector_commit(self, mock_connector):
         db_conn = SQLConnector("test DB", 1111)
 
-        db_conn.commit()
-        mock_connector.connect.return_value.commit.assert_called_once()
+        with db_conn.transaction():
+            db_conn.commit()
+            mock_connector.connect.return_value.commit.assert_called_once()
 
     @patch("backend.load.connector.connector")
     def test_successful_db_connector_rollback(self, mock_connector):
         db_conn = SQLConnector("test DB", 1111)
 
-        db_conn.rollback()
-        mock_connector.connect.return_value.rollback.assert_called_once()
+        with db_conn.transaction():
+            db_conn.rollback()
+            mock_connector.connect.return_value.rollback.assert_called_once()
+
+    @patch("backend.load.connector.connector")
+    def test_unsuccessful_db_connector_commit_outside_transaction(self, mock_connector):
+        db_conn = SQLConnector("test DB", 1111)
+
+        with self.assertRaises(RuntimeError):
+            db_conn.commit()
+        with db_conn.connection(), self.assertRaises(RuntimeError):
+            db_conn.rollback()
+        mock_connector.connect.return_value.commit.assert_not_called()
+        mock_connector.connect.return_value.rollback.assert_not_called()
 
     @patch("backend.load.connector.connector")
     def test_successful_db_connector_retrieve_all(self, mock_connector):
@@ -80,4 +95,197 @@ class SQLConnectorTestCase(unittest.TestCase):
         
         db_conn.execute("Query")
         mock_connector.connect.return_value.rollback.assert_called_once()
-        
\ No newline at end of file
+        
+class SQLConnectorPoolTestCase(unittest.TestCase):
+    @patch("backend.load.connector.connector")
+    def test_db_connector_pool_reuses_idle_connection(self, mock_connector):
+        db_conn = SQLConnector("test DB", 1111, pool_size=2)
+
+        db_conn.execute("SELECT 1")
+        db_conn.execute("SELECT 2")
+
+        mock_connector.connect.assert_called_once()
+        assert db_conn.pool_stats["opened"] == 1
+        assert db_conn.pool_stats["checkouts"] == 2
+
+    @patch("backend.load.connector.connector")
+    def test_db_connector_pool_concurrent_checkouts(self, mock_connector):
+        mock_connector.connect.side_effect = [MagicMock(), MagicMock()]
+        db_conn = SQLConnector("test DB", 1111, pool_size=2)
+
+        with db_conn.connection() as first:
+            with db_conn.connection() as nested:
+                assert nested is first
+
+            held = []
+            thread = threading.Thread(target=lambda: held.append(db_conn.connection().__enter__()))
+            thread.start()
+            thread.join()
+
+        assert held[0] is not first
+        assert mock_connector.connect.call_count == 2
+
+    @patch("backend.load.connector.connector")
+    def test_db_connector_pool_checkout_timeout(self, mock_connector):
+        db_conn = SQLConnector("test DB", 1111, pool_size=1, checkout_timeout=0.01)
+
+        with db_conn.connection():
+            errors = []
+            def checkout():
+                try:
+                    with db_conn.connection():
+                        pass
+                except TimeoutError as e:
+                    errors.append(e)
+
+            thread = threading.Thread(target=checkout)
+            thread.start()
+            thread.join()
+
+        assert len(errors) == 1
+
+    @patch("backend.load.connector.connector")
+    def test_db_connector_pool_health_check(self, mock_connector):
+        stale = MagicMock()
+        stale.ping.side_effect = InterfaceError("gone")
+        fresh = MagicMock()
+        mock_connector.connect.side_effect = [stale, fresh]
+        db_conn = SQLConnector("test DB", 1111, health_check_interval=0)
+
+        with db_conn.connection() as db:
+            assert db is fresh
+
+        stale.close.assert_called_once()
+        assert db_conn.pool_stats["reconnects"] == 1
+
+    @patch("backend.load.connector.connector")
+    def test_db_connector_reconnects_after_lost_connection(self, mock_connector):
+        dropped = MagicMock()
+        dropped.cursor.return_value.execute.side_effect = OperationalError("Lost connection to MySQL server during query", errno=2013)
+        fresh = MagicMock()
+        fresh.cursor.return_value.fetchall.return_value = [(1,)]
+        mock_connector.connect.side_effect = [dropped, fresh]
+        db_conn = SQLConnector("test DB", 1111)
+
+        assert db_conn.execute("SELECT 1") == [(1,)]
+        assert db_conn.execute("SELECT 1") == [(1,)]
+        assert mock_connector.connect.call_count == 2
+
+    @patch("backend.load.connector.connector")
+    def test_db_connector_reuses_prepared_cursor(self, mock_connector):
+        db = mock_connector.connect.return_value
+        db.cursor.return_value.fetchall.return_value = [(1,)]
+        db_conn = SQLConnector("test DB", 1111)
+
+        db_conn.execute("SELECT a FROM t WHERE b = %s", (1,), prepared=True)
+        db_conn.execute("SELECT a FROM t WHERE b = %s", (2,), prepared=True)
+        db_conn.execute("SELECT c FROM t WHERE b = %s", (2,), prepared=True)
+
+        assert db.cursor.call_args_list.count(call(prepared=True)) == 2
+        db.cursor.return_value.execute.assert_any_call("SELECT a FROM t WHERE b = %s", (2,))
+
+    @patch("backend.load.connector.connector")
+    def test_db_connector_closes_dropped_prepared_cursors(self, mock_connector):
+        db = mock_connector.connect.return_value
+        cursors = [MagicMock(), MagicMock(), MagicMock()]
+        db.cursor.side_effect = cursors
+        cursors[2].execute.side_effect = Exception("Unknown column")
+        db_conn = SQLConnector("test DB", 1111, statement_cache_size=1)
+
+        db_conn.execute("SELECT a FROM t WHERE b = %s", (1,), prepared=True)
+        db_conn.execute("SELECT c FROM t WHERE b = %s", (1,), prepared=True)
+        cursors[0].close.assert_called_once()
+        cursors[1].close.assert_not_called()
+
+        assert db_conn.execute("SELECT d FROM t WHERE b = %s", (1,), prepared=True) is False
+        cursors[1].close.assert_called_once()
+        cursors[2].close.assert_called_once()
+
+    @patch("backend.load.connector.connector")
+    def test_db_connector_execute_many_single_commit(self, mock_connector):
+        db = mock_connector.connect.return_value
+        db.cursor.return_value.with_rows = False
+        db_conn = SQLConnector("test DB", 1111)
+
+        rows = [(1, "a"), (2, "b")]
+        result = db_conn.execute_many("INSERT INTO t(a, b) VALUES(%s, %s)", rows)
+
+        db.cursor.return_value.executemany.assert_called_once_with("INSERT INTO t(a, b) VALUES(%s, %s)", rows)
+        db.commit.assert_called_once()
+        assert result is True
+
+    @patch("backend.load.connector.connector")
+    def test_db_connector_execute_many_failure(self, mock_connector):
+        db = mock_connector.connect.return_value
+        db.cursor.return_value.executemany.side_effect = Exception("Duplicate entry")
+        db_conn = SQLConnector("test DB", 1111)
+
+        assert db_conn.execute_many("INSERT INTO t(a) VALUES(%s)", [(1,)]) is False
+        db.rollback.assert_called_once()
+
+class SQLConnectorTransactionTestCase(unittest.TestCase):
+    @patch("backend.load.connector.connector")
+    def test_db_connector_transaction_single_commit(self, mock_connector):
+        db = mock_connector.connect.return_value
+        db_conn = SQLConnector("test DB", 1111)
+
+        with db_conn.transaction():
+            db_conn.execute("INSERT INTO t(a) VALUES(%s)", (1,))
+            db_conn.execute_many("INSERT INTO t(a) VALUES(%s)", [(2,), (3,)])
+            db.commit.assert_not_called()
+
+        db.commit.assert_called_once()
+        db.rollback.assert_not_called()
+
+    @patch("backend.load.connector.connector")
+    def test_db_connector_transaction_rolls_back_on_error(self, mock_connector):
+        db = mock_connector.connect.return_value
+        db_conn = SQLConnector("test DB", 1111)
+
+        with self.assertRaises(KeyError):
+            with db_conn.transaction():
+                db_conn.execute("INSERT INTO t(a) VALUES(%s)", (1,))
+                raise KeyError("bng_weapon_id")
+
+        db.rollback.assert_called_once()
+        db.commit.assert_not_called()
+        assert db_conn.pool_stats["idle"] == 1
+
+    @patch("backend.load.connector.connector")
+    def test_db_connector_nested_transaction_joins_outer(self, mock_connector):
+        db = mock_connector.connect.return_value
+        db_conn = SQLConnector("test DB", 1111)
+
+        with db_conn.transaction():
+            with db_conn.transaction():
+                db_conn.execute("INSERT INTO t(a) VALUES(%s)", (1,))
+            db.commit.assert_not_called()
+
+        db.commit.assert_called_once()
+
+    @patch("backend.load.connector.connector")
+    def test_db_connector_transaction_failed_statement(self, mock_connector):
+        db = mock_connector.connect.return_value
+        db.cursor.return_value.execute.side_effect = [Exception("Duplicate entry"), None]
+        db.cursor.return_value.with_rows = False
+        db_conn = SQLConnector("test DB", 1111)
+
+        with db_conn.transaction():
+            assert db_conn.execute("INSERT INTO t(a) VALUES(%s)", (1,)) is False
+            assert db_conn.execute("INSERT INTO t(a) VALUES(%s)", (2,)) is True
+
+        db.rollback.assert_not_called()
+        db.commit.assert_called_once()
+
+    @patch("backend.load.connector.connector")
+    def test_db_connector_transaction_lost_connection(self, mock_connector):
+        db = mock_connector.connect.return_value
+        db.cursor.return_value.execute.side_effect = OperationalError("Lost connection to MySQL server during query", errno=2013)
+        db_conn = SQLConnector("test DB", 1111)
+
+        with self.assertRaises(OperationalError):
+            with db_conn.transaction():
+                db_conn.execute("INSERT INTO t(a) VALUES(%s)", (1,))
+
+        db.commit.assert_not_called()
+        assert mock_connector.connect.call_count == 1
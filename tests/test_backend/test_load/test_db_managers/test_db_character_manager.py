@@ -1,6 +1,5 @@
 import unittest
 from unittest.mock import MagicMock, patch
-import json
 
 from backend.load.managers import DatabaseCharacterManager
 
@@ -12,10 +11,10 @@ class TestDatabaseCharacterManager(unittest.TestCase):
     def test_db_character_manager_init(self):
         assert self.db_manager._DatabaseCharacterManager__control == self.db_exec
         
-        assert self.db_manager._DatabaseCharacterManager__characters == []
+        assert len(self.db_manager._DatabaseCharacterManager__characters) == 0
 
-    @patch("backend.extract.bng_api_connector.urlopen")
-    def test_db_character_manager_successful_add_new_character(self, mock_urlopen):
+    @patch("backend.extract.bng_api_connector.Session.request")
+    def test_db_character_manager_successful_add_new_character(self, mock_request):
         mock_character_response = {"Response": 
             {"character": {
                 "data": {
@@ -40,11 +39,8 @@ class TestDatabaseCharacterManager(unittest.TestCase):
                 }
             }}
         }
-        mock_db_response = [
-            (1, 101)
-        ]
-        self.db_exec.select_rows.return_value = mock_db_response
-        mock_urlopen.return_value.__enter__.return_value.read.side_effect = [json.dumps(mock_character_response), json.dumps(mock_equipment_response)]
+        self.db_exec.resolve_id.return_value = 1
+        mock_request.return_value.json.side_effect = [mock_character_response, mock_equipment_response]
 
         self.db_manager.add_new_character(111, 1, 101)
 
@@ -54,12 +50,26 @@ class TestDatabaseCharacterManager(unittest.TestCase):
                 "class": "HUNTER",
                 "date_last_played": "2017-07-07",
             }
-        assert self.db_manager._DatabaseCharacterManager__characters[0].data == expected_character_data
+        assert self.db_manager._DatabaseCharacterManager__characters.values()[0].data == expected_character_data
 
-    @patch("backend.extract.bng_api_connector.urlopen")
-    def test_db_character_manager_unsuccessful_add_new_character_no_player(self, mock_urlopen):
-        self.db_exec.select_rows.return_value = []
+    @patch("backend.extract.bng_api_connector.Session.request")
+    def test_db_character_manager_unsuccessful_add_new_character_no_player(self, mock_request):
+        self.db_exec.resolve_id.return_value = None
 
         self.db_manager.add_new_character(111, 1, 101)
-        assert self.db_manager._DatabaseCharacterManager__characters[0].data == []
-        
\ No newline at end of file
+        assert len(self.db_manager._DatabaseCharacterManager__characters) == 0
+        self.db_exec.upsert_rows.assert_not_called()
+        mock_request.assert_not_called()
+        
+    def test_db_character_manager_store_characters_fills_player_id(self):
+        stored, unknown = MagicMock(_id=111, _player_id=-1, data={"player_id": -1}), MagicMock(_id=222, _player_id=-1, data={})
+        self.db_exec.resolve_ids.return_value = {111: 5}
+
+        self.db_manager.store_characters({101: stored, 202: unknown})
+
+        self.db_exec.resolve_ids.assert_called_once_with("`Player`", [111, 222])
+        assert stored._player_id == 5
+        assert stored.data["player_id"] == 5
+        self.db_exec.upsert_rows.assert_called_once_with("`Character`", [stored])
+        assert self.db_manager.find_character(101) is stored
+        assert self.db_manager.find_character(202) is None
@@ -0,0 +1,80 @@
+import unittest
+from unittest.mock import MagicMock
+
+from backend.load.executor import UpsertResult
+from backend.load.managers import DatabaseManager
+
+class DBManagerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db_exec = MagicMock()
+        self.db_exec.resolve_ids.side_effect = lambda table_name, natural_ids: {natural_id: 7 for natural_id in natural_ids}
+        self.db_manager = DatabaseManager(self.db_exec, MagicMock(), MagicMock(), MagicMock(), MagicMock(), MagicMock())
+
+        self.stats = []
+        for bng_character_id in [1, 1, 2]:
+            stat = MagicMock()
+            stat.data = {"kills": 1}
+            stat.og_data = {"bng_activity_id": 10, "bng_weapon_id": 20, "bng_character_id": bng_character_id}
+            stat.participant = {"destiny_id": 30, "member_type": 3}
+            self.stats.append(stat)
+
+        self.instance = MagicMock()
+        self.instance.instance_id = 100
+        self.instance.get_instance_stats.return_value = self.stats
+
+    def test_db_manager_add_new_stat_block_single_batch(self):
+        result = self.db_manager.add_new_stat_block(self.instance)
+
+        assert result is True
+        self.db_exec.upsert_rows.assert_called_once_with("`Activity_Stats`", self.stats)
+        assert self.stats[0].data == {"kills": 1, "activity_id": 7, "weapon_id": 7, "character_id": 7}
+
+    def test_db_manager_add_new_stat_block_single_character(self):
+        self.db_exec.upsert_rows.return_value = UpsertResult()
+        self.db_exec.upsert_rows.return_value.new.append(self.stats[2])
+
+        result = self.db_manager.add_new_stat_block(self.instance, 2)
+
+        assert result is self.stats[2]
+        self.db_exec.upsert_rows.assert_called_once_with("`Activity_Stats`", [self.stats[2]])
+        self.db_exec.select_rows.assert_not_called()
+
+    def test_db_manager_add_new_stat_block_single_character_already_stored(self):
+        self.db_exec.upsert_rows.return_value = UpsertResult()
+        self.db_exec.upsert_rows.return_value.existing.append(self.stats[2])
+
+        assert self.db_manager.add_new_stat_block(self.instance, 2) is False
+
+    def test_db_manager_add_new_stat_block_in_transaction(self):
+        self.db_exec.upsert_rows.side_effect = lambda *args: self.db_exec.transaction.return_value.__exit__.assert_not_called()
+
+        self.db_manager.add_new_stat_block(self.instance)
+
+        self.db_exec.transaction.assert_called_once()
+        self.db_exec.transaction.return_value.__exit__.assert_called_once()
+
+    def test_db_manager_add_new_stat_block_fetches_before_transaction(self):
+        p_manager = self.db_manager._DatabaseManager__p_manager
+        c_manager = self.db_manager._DatabaseManager__c_manager
+        p_manager.fetch_player.side_effect = lambda *args: self.db_exec.transaction.assert_not_called()
+        c_manager.fetch_character.side_effect = lambda *args: self.db_exec.transaction.assert_not_called()
+
+        self.db_manager.add_new_stat_block(self.instance)
+
+        # one fetch per player and character in the match, however many stat blocks they have
+        p_manager.fetch_player.assert_called_once_with(30, 3)
+        assert c_manager.fetch_character.call_count == 2
+        assert list(c_manager.store_characters.call_args[0][0]) == [1, 2]
+        self.db_exec.transaction.assert_called_once()
+
+    def test_db_manager_stat_block_cache(self):
+        self.db_exec.select_rows.return_value = [(1,)]
+        self.db_exec.delete_row.return_value = True
+        for stat in self.stats:
+            stat.data["instance_id"] = 100
+
+        self.db_manager.add_new_stat_block(self.instance)
+        assert self.db_manager._DatabaseManager__stats_data.values() == self.stats[1:]
+
+        self.db_manager.delete_stat_block(7, 100)
+        assert len(self.db_manager._DatabaseManager__stats_data) == 0
@@ -1,6 +1,5 @@
 import unittest
 from unittest.mock import MagicMock, patch
-import json
 
 from backend.load.managers import DatabasePlayerManager
 
@@ -9,8 +8,8 @@ class DBPlayerManagerTestCase(unittest.TestCase):
         self.db_exec = MagicMock()
         self.player_manager = DatabasePlayerManager(self.db_exec)
 
-    @patch("backend.extract.bng_api_connector.urlopen")
-    def test_db_player_manager_successful_read_data_single(self, mock_urlopen):
+    @patch("backend.extract.bng_api_connector.Session.request")
+    def test_db_player_manager_successful_read_data_single(self, mock_request):
         mock_member_response = {"Response": 
             {
                 "bungieNetUser": {
@@ -48,7 +47,7 @@ class DBPlayerManagerTestCase(unittest.TestCase):
         ]
 
         self.db_exec.retrieve_all.return_value = mock_retrieve_all_response
-        mock_urlopen.return_value.__enter__.return_value.read.side_effect = [json.dumps(mock_member_response), json.dumps(mock_profile_response)]
+        mock_request.return_value.json.side_effect = [mock_member_response, mock_profile_response]
 
         self.player_manager.read_data()
 
@@ -66,10 +65,11 @@ class DBPlayerManagerTestCase(unittest.TestCase):
             ]
         }
         self.db_exec.retrieve_all.assert_called_with("`Player`")
-        assert self.player_manager._DatabasePlayerManager__players[0].data == expected_player_data
+        assert self.player_manager._DatabasePlayerManager__players.values()[0].data == expected_player_data
+        mock_request.assert_not_called()
 
-    @patch("backend.extract.bng_api_connector.urlopen")
-    def test_db_player_manager_successful_read_data_multiple(self, mock_urlopen):
+    @patch("backend.extract.bng_api_connector.Session.request")
+    def test_db_player_manager_successful_read_data_multiple(self, mock_request):
         mock_retrieve_all = [
             [
                 1,
@@ -205,11 +205,9 @@ class DBPlayerManagerTestCase(unittest.TestCase):
                 }
             }
         ]
-        for i in range(len(mock_api_response)):
-            mock_api_response[i] = json.dumps(mock_api_response[i])
 
         self.db_exec.retrieve_all.return_value = mock_retrieve_all
-        mock_urlopen.return_value.__enter__.return_value.read.side_effect = mock_api_response
+        mock_request.return_value.json.side_effect = mock_api_response
 
         self.player_manager.read_data()
 
@@ -269,19 +267,40 @@ class DBPlayerManagerTestCase(unittest.TestCase):
         ]
 
         self.db_exec.retrieve_all.assert_called_with("`Player`")
-        players = self.player_manager._DatabasePlayerManager__players
+        players = self.player_manager._DatabasePlayerManager__players.values()
         for i in range(len(players)):
             assert players[i].data == expected_players_data[i]
+        mock_request.assert_not_called()
+
+    @patch("backend.extract.bng_api_connector.Session.request")
+    def test_db_player_manager_read_data_refreshes_stale_players(self, mock_request):
+        self.db_exec.retrieve_all.return_value = [
+            (1, 1010101010101, 77777777777777777, "User 1", "2007-07-07 00:00:00", "2017-07-07 00:00:00", "XBOX", "['111111111111', '222222222222']"),
+            (2, 2020202020202, 99999999999999999, "User 2", "2010-10-10 00:00:00", "2999-12-12 00:00:00", "STEAM", "['444444444444']")
+        ]
+        mock_request.return_value.json.side_effect = [
+            {"Response": {"bungieNetUser": {"firstAccess": "2007-07-07T07:07:07Z", "membershipId": "77777777777777777", "uniqueName": "User 1"}}},
+            {"Response": {"profile": {"data": {"dateLastPlayed": "2024-01-01T07:07:07Z", "characterIds": ["111111111111"]}}}}
+        ]
+
+        refresh = self.player_manager.read_data(refresh_stale_after=30)
+        refresh.join()
+
+        players = self.player_manager._DatabasePlayerManager__players
+        assert players.get(1010101010101).data["date_last_played"] == "2024-01-01"
+        assert players.get(2020202020202).data["character_ids"] == ["444444444444"]
+        assert mock_request.call_count == 2
+        self.db_exec.upsert_rows.assert_called_once_with("`Player`", [players.get(1010101010101)])
 
     def test_db_player_manager_unsuccessful_read_data(self):
         self.db_exec.retrieve_all.return_value = []
         self.player_manager.read_data()
 
         self.db_exec.retrieve_all.assert_called_with("`Player`")
-        assert self.player_manager._DatabasePlayerManager__players == []
+        assert len(self.player_manager._DatabasePlayerManager__players) == 0
 
-    @patch("backend.extract.bng_api_connector.urlopen")
-    def test_db_player_manager_successful_add_existing_player(self, mock_urlopen):
+    @patch("backend.extract.bng_api_connector.Session.request")
+    def test_db_player_manager_successful_add_existing_player(self, mock_request):
         mock_player_data = [
             1,
             1010101010101,
@@ -315,10 +334,7 @@ class DBPlayerManagerTestCase(unittest.TestCase):
                 }
             }
         }
-        mock_api_response = json.dumps(mock_api_response)
-        mock_profile_response = json.dumps(mock_profile_response)
-
-        mock_urlopen.return_value.__enter__.return_value.read.side_effect = [mock_api_response, mock_profile_response]
+        mock_request.return_value.json.side_effect = [mock_api_response, mock_profile_response]
         self.player_manager.add_existing_player(mock_player_data)
 
         expected_player_data = {
@@ -335,10 +351,10 @@ class DBPlayerManagerTestCase(unittest.TestCase):
             ]
         }
 
-        assert self.player_manager._DatabasePlayerManager__players[0].data == expected_player_data
+        assert self.player_manager._DatabasePlayerManager__players.values()[0].data == expected_player_data
 
-    @patch("backend.extract.bng_api_connector.urlopen")
-    def test_db_player_manager_unsuccessful_add_existing_player(self, mock_urlopen):
+    @patch("backend.extract.bng_api_connector.Session.request")
+    def test_db_player_manager_unsuccessful_add_existing_player(self, mock_request):
         mock_player_data = [
             1,
             1010101010101,
@@ -349,10 +365,10 @@ class DBPlayerManagerTestCase(unittest.TestCase):
             "XBOX",
             "111111111111, 222222222222, 333333333333"
         ]
-        mock_urlopen.return_value.__enter__.return_value.read.return_value = json.dumps({})
+        mock_request.return_value.json.return_value = {}
 
         self.player_manager.add_existing_player(mock_player_data)
-        assert self.player_manager._DatabasePlayerManager__players[0].data == {}
+        assert self.player_manager._DatabasePlayerManager__players.values()[0].data == {}
 
     def test_db_player_manager_successful_get_character_and_player_ids(self):
         self.db_exec.select_rows.return_value = [("[1, 2, 3]", 1)]
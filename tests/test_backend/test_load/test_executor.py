@@ -1,8 +1,8 @@
+import threading
 import unittest
 from unittest.mock import MagicMock, patch
 
 from backend.load.executor import DatabaseExecutor
-from backend.load.commands import InsertCommand, SelectCommand
 from backend.data.bng_data import PlayerData
 
 class DBExecutorTestCase(unittest.TestCase):
@@ -13,8 +13,25 @@ class DBExecutorTestCase(unittest.TestCase):
 
     def test_db_executor_init(self):
         assert self.db_exec._DatabaseExecutor__db == self.db_conn
-        assert isinstance(self.db_exec._DatabaseExecutor__insert_command, InsertCommand)
-        assert isinstance(self.db_exec._DatabaseExecutor__select_command, SelectCommand)
+
+    def test_db_executor_select_rows_concurrent_calls(self):
+        # every call builds its own statement, so threads sharing the executor never run each other's query
+        barrier = threading.Barrier(8)
+        def execute(query, params, prepared):
+            barrier.wait()
+            return [(query, params)]
+        self.db_conn.execute.side_effect = execute
+
+        results = {}
+        def select(i):
+            results[i] = self.db_exec.select_rows(f"t{i}", ["a"], {"b": i})
+        threads = [threading.Thread(target=select, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert all(results[i] == [(f"SELECT a FROM t{i} WHERE b = %s", (i,))] for i in range(8))
 
     @patch.object(PlayerData, "data", new={"col 1": 1, "col 2": "a"})
     def test_db_executor_successful_insert_row(self):
@@ -24,8 +41,8 @@ class DBExecutorTestCase(unittest.TestCase):
         self.db_conn.execute.return_value = None
         result = self.db_exec.insert_row("table_name", data_to_insert)
 
-        query = 'INSERT INTO table_name(col 1, col 2) VALUES(1, "a")'
-        self.db_conn.execute.assert_called_with(query)
+        query = "INSERT INTO table_name(col 1, col 2) VALUES(%s, %s)"
+        self.db_conn.execute.assert_called_with(query, (1, "a"), prepared=True)
         assert result is None
 
     @patch.object(PlayerData, "data", new={"col 1": 1, "col 2": "a"})
@@ -47,7 +64,7 @@ class DBExecutorTestCase(unittest.TestCase):
         result = self.db_exec.select_rows(table_name, fields, condition)
 
         query = "SELECT col_1, col_2 FROM table_name"
-        self.db_conn.execute.assert_called_with(query)
+        self.db_conn.execute.assert_called_with(query, (), prepared=True)
         assert result == mock_result
 
     def test_db_executor_successful_select_row_empty_set(self):
@@ -60,7 +77,7 @@ class DBExecutorTestCase(unittest.TestCase):
         result = self.db_exec.select_rows(table_name, fields, condition)
 
         query = "SELECT col_1, col_2 FROM table_name"
-        self.db_conn.execute.assert_called_with(query)
+        self.db_conn.execute.assert_called_with(query, (), prepared=True)
         assert result == mock_result
 
     def test_db_executor_unsuccessful_select_row(self):
@@ -73,7 +90,89 @@ class DBExecutorTestCase(unittest.TestCase):
             self.db_exec.select_rows(table_name, fields, condition)
 
         query = "SELECT col_1, col_2 FROM table_name"
-        self.db_conn.execute.assert_called_with(query)
+        self.db_conn.execute.assert_called_with(query, (), prepared=True)
+
+    def test_db_executor_update_row(self):
+        self.db_conn.execute.return_value = True
+        result = self.db_exec.update_row("`Weapon`", {"weapon_name": "Riptide", "main_stat": "500ms"}, {"bng_weapon_id": 10})
+
+        query = "UPDATE `Weapon` SET weapon_name = %s, main_stat = %s WHERE bng_weapon_id = %s"
+        self.db_conn.execute.assert_called_once_with(query, ("Riptide", "500ms", 10))
+        assert result is True
+
+    def test_db_executor_delete_row(self):
+        self.db_conn.execute.return_value = True
+        result = self.db_exec.delete_row("Activity_Stats", {"character_id": 1, "instance_id": 2})
+
+        query = "DELETE FROM Activity_Stats WHERE character_id = %s AND instance_id = %s"
+        self.db_conn.execute.assert_called_once_with(query, (1, 2))
+        assert result is True
+
+    def test_db_executor_upsert_rows_batches_and_groups_shapes(self):
+        rows = [MagicMock(data={"weapon_id": i, "character_id": 1, "instance_id": 10, "kills": i}) for i in range(5)]
+        rows += [MagicMock(data={}), MagicMock(data={"weapon_id": 9, "character_id": 1, "instance_id": 10})]
+        self.db_conn.execute.side_effect = lambda query, *args, **kwargs: [] if query.startswith("SELECT") else True
+        self.db_conn.execute_many.return_value = True
+
+        result = self.db_exec.upsert_rows("`Activity_Stats`", rows, batch_size=2)
+
+        query = "INSERT INTO `Activity_Stats`(weapon_id, character_id, instance_id, kills) VALUES(%s, %s, %s, %s) ON DUPLICATE KEY UPDATE kills = VALUES(kills)"
+        assert self.db_conn.execute_many.call_count == 2
+        self.db_conn.execute_many.assert_any_call(query, [(0, 1, 10, 0), (1, 1, 10, 1)])
+        self.db_conn.execute.assert_any_call(query, (4, 1, 10, 4), prepared=True, return_id=True)
+        self.db_conn.execute.assert_any_call("INSERT IGNORE INTO `Activity_Stats`(weapon_id, character_id, instance_id) VALUES(%s, %s, %s)", (9, 1, 10), prepared=True, return_id=True)
+        assert len(result.new) == 6
+
+    def test_db_executor_upsert_rows_reports_new_and_existing(self):
+        rows = [MagicMock(data={"destiny_id": i, "bng_username": f"player {i}"}) for i in range(3)]
+        self.db_conn.execute.side_effect = [[(1, 11)], [(0, 10), (2, 12)]]
+        self.db_conn.execute_many.return_value = True
+
+        result = self.db_exec.upsert_rows("`Player`", rows)
+
+        self.db_conn.execute.assert_any_call("SELECT destiny_id, player_id FROM `Player` WHERE destiny_id IN (%s, %s, %s)", (0, 1, 2))
+        self.db_conn.execute.assert_called_with("SELECT destiny_id, player_id FROM `Player` WHERE destiny_id IN (%s, %s)", (0, 2))
+        self.db_conn.execute_many.assert_called_once_with(
+            "INSERT INTO `Player`(destiny_id, bng_username) VALUES(%s, %s) ON DUPLICATE KEY UPDATE bng_username = VALUES(bng_username)",
+            [(0, "player 0"), (1, "player 1"), (2, "player 2")]
+        )
+        assert result.new == [rows[0], rows[2]]
+        assert result.existing == [rows[1]]
+        assert bool(result) is True
+        assert self.db_exec.resolve_id("`Player`", 1) == 11
+        assert self.db_exec.resolve_id("`Player`", 2) == 12
+        assert self.db_conn.execute.call_count == 2
+
+    def test_db_executor_upsert_rows_caches_inserted_id(self):
+        rows = [MagicMock(data={"destiny_id": 5, "bng_username": "player 5"})]
+        self.db_conn.execute.side_effect = [[], 42]
+
+        result = self.db_exec.upsert_rows("`Player`", rows)
+
+        self.db_conn.execute.assert_called_with(
+            "INSERT INTO `Player`(destiny_id, bng_username) VALUES(%s, %s) ON DUPLICATE KEY UPDATE bng_username = VALUES(bng_username)",
+            (5, "player 5"), prepared=True, return_id=True
+        )
+        self.db_conn.execute_many.assert_not_called()
+        assert result.new == rows
+        assert self.db_exec.resolve_id("`Player`", 5) == 42
+        assert self.db_conn.execute.call_count == 2
+
+    def test_db_executor_upsert_rows_ignore_and_composite_key(self):
+        rows = [MagicMock(data={"weapon_id": 1, "character_id": 2, "instance_id": 3, "kills": 4})]
+        self.db_conn.execute_many.return_value = False
+        self.db_conn.execute.side_effect = [False, False]
+
+        result = self.db_exec.upsert_rows("Activity_Stats", rows, update=False)
+
+        self.db_conn.execute.assert_any_call("SELECT weapon_id, character_id, instance_id FROM Activity_Stats WHERE (weapon_id, character_id, instance_id) IN ((%s, %s, %s))", (1, 2, 3))
+        self.db_conn.execute.assert_any_call("INSERT IGNORE INTO Activity_Stats(weapon_id, character_id, instance_id, kills) VALUES(%s, %s, %s, %s)", (1, 2, 3, 4), prepared=True, return_id=True)
+        assert result.failed == rows
+        assert bool(result) is False
+
+    def test_db_executor_upsert_rows_unknown_table(self):
+        with self.assertRaises(ValueError):
+            self.db_exec.upsert_rows("`Unknown`", [MagicMock(data={"a": 1})])
 
     def test_db_executor_successful_retrieve_all(self):
         mock_result = [
@@ -93,4 +192,33 @@ class DBExecutorTestCase(unittest.TestCase):
             self.db_exec.retrieve_all("table_name")
         
         self.db_conn.retrieve_all.assert_called_with("table_name")
-        
\ No newline at end of file
+        
+    def test_db_executor_transaction(self):
+        with self.db_exec.transaction() as db_exec:
+            assert db_exec is self.db_exec
+
+        self.db_conn.transaction.assert_called_once()
+        self.db_conn.transaction.return_value.__exit__.assert_called_once()
+
+    def test_db_executor_resolve_ids_batches_misses(self):
+        self.db_conn.execute.return_value = [(101, 1), (102, 2)]
+
+        assert self.db_exec.resolve_ids("`Weapon`", [101, 102, 103, 101]) == {101: 1, 102: 2}
+        assert self.db_exec.resolve_ids("`Weapon`", [101, 102]) == {101: 1, 102: 2}
+        assert self.db_exec.resolve_id("`Weapon`", 103) is None
+
+        self.db_conn.execute.assert_any_call("SELECT bng_weapon_id, weapon_id FROM `Weapon` WHERE bng_weapon_id IN (%s, %s, %s)", (101, 102, 103))
+        self.db_conn.execute.assert_called_with("SELECT bng_weapon_id, weapon_id FROM `Weapon` WHERE bng_weapon_id IN (%s)", (103,))
+        assert self.db_conn.execute.call_count == 2
+        assert self.db_exec.id_cache_stats["hits"] == 2
+
+    def test_db_executor_rollback_clears_resolved_ids(self):
+        self.db_conn.execute.return_value = [(101, 1)]
+
+        with self.assertRaises(KeyError):
+            with self.db_exec.transaction():
+                self.db_exec.resolve_ids("`Weapon`", [101])
+                raise KeyError("bng_weapon_id")
+
+        self.db_exec.resolve_ids("`Weapon`", [101])
+        assert self.db_conn.execute.call_count == 2
@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import MagicMock, patch
 
-from backend.load.commands import InsertCommand
+from backend.load.commands import InsertCommand, insert_statement
 from backend.data.bng_data import PlayerData
 
 class InsertCommandTestCase(unittest.TestCase):
@@ -40,19 +40,31 @@ class InsertCommandTestCase(unittest.TestCase):
     def test_successful_insert_command_execute(self):
         self.pre_set_command.execute()
 
-        query = 'INSERT INTO test_table(col 1, col 2) VALUES(1, "a"), (3, "b"), (5, "c")'
-        self.db_conn.execute.assert_called_once_with(query)
+        query = "INSERT INTO test_table(col 1, col 2) VALUES(%s, %s), (%s, %s), (%s, %s)"
+        self.db_conn.execute.assert_called_once_with(query, (1, "a", 3, "b", 5, "c"), prepared=True)
     
     def test_successful_insert_command_execute_single_data(self):
         basic_insert_command = InsertCommand(self.db_conn, self.table_name, [{"col 1": 1, "col 2": "abc", "col 3": 2.33}])
         basic_insert_command.execute()
 
-        query = 'INSERT INTO test_table(col 1, col 2, col 3) VALUES(1, "abc", 2.33)'
-        self.db_conn.execute.assert_called_once_with(query)
+        query = "INSERT INTO test_table(col 1, col 2, col 3) VALUES(%s, %s, %s)"
+        self.db_conn.execute.assert_called_once_with(query, (1, "abc", 2.33), prepared=True)
 
     def test_insert_command_execute_no_data(self):
-        self.empty_command.execute()
+        assert self.empty_command.execute() is False
+        self.db_conn.execute.assert_not_called()
 
-        query = "INSERT INTO) VALUE)"
-        self.db_conn.execute.assert_called_once_with(query)
+    def test_insert_command_execute_quotes_and_lists(self):
+        insert_command = InsertCommand(self.db_conn, self.table_name, [{"name": 'The "Last" Word', "character_ids": ["1", "2"]}])
+        insert_command.execute()
+
+        query = "INSERT INTO test_table(name, character_ids) VALUES(%s, %s)"
+        self.db_conn.execute.assert_called_once_with(query, ('The "Last" Word', "['1', '2']"), prepared=True)
+
+    def test_insert_statement_cached_by_shape(self):
+        first = insert_statement("test_table", ("col 1", "col 2"))
+        second = insert_statement("test_table", ("col 1", "col 2"))
+
+        assert first is second
+        assert insert_statement("test_table", ("col 1",)) == "INSERT INTO test_table(col 1) VALUES(%s)"
     
@@ -38,7 +38,7 @@ class SelectCommandTestCase(unittest.TestCase):
         actual_result = self.pre_set_command.execute()
 
         query = "SELECT col_1, col_2, col_3 FROM test_table"
-        self.db_conn.execute.assert_called_once_with(query)
+        self.db_conn.execute.assert_called_once_with(query, (), prepared=True)
         assert actual_result == mock_result
 
     def test_select_command_unsuccessful_execute(self):
@@ -47,7 +47,7 @@ class SelectCommandTestCase(unittest.TestCase):
             self.pre_set_command.execute()
 
         query = "SELECT col_1, col_2, col_3 FROM test_table"
-        self.db_conn.execute.assert_called_once_with(query)
+        self.db_conn.execute.assert_called_once_with(query, (), prepared=True)
 
     def test_select_command_successful_set(self):
         table_name = "table_name"
@@ -70,8 +70,8 @@ class SelectCommandTestCase(unittest.TestCase):
         self.db_conn.execute.return_value = mock_result
         actual_result = self.empty_command.execute()
 
-        query = "SELECT col_1 FROM table_name WHERE col_2 = 3"
-        self.db_conn.execute.assert_called_with(query)
+        query = "SELECT col_1 FROM table_name WHERE col_2 = %s"
+        self.db_conn.execute.assert_called_with(query, (3,), prepared=True)
         assert actual_result == mock_result
 
         table_name = "table_name"
@@ -83,8 +83,8 @@ class SelectCommandTestCase(unittest.TestCase):
         self.db_conn.execute.return_value = mock_result
         actual_result = self.empty_command.execute()
 
-        query = 'SELECT col_3 FROM table_name WHERE col_1 = "abc"'
-        self.db_conn.execute.assert_called_with(query)
+        query = "SELECT col_3 FROM table_name WHERE col_1 = %s"
+        self.db_conn.execute.assert_called_with(query, ("abc",), prepared=True)
         assert actual_result == mock_result
 
     def test_select_command_successful_execute_no_fields(self):
@@ -100,5 +100,5 @@ class SelectCommandTestCase(unittest.TestCase):
         result = simple_command.execute()
 
         query = "SELECT * FROM table_name"
-        self.db_conn.execute.assert_called_once_with(query)
+        self.db_conn.execute.assert_called_once_with(query, (), prepared=True)
         assert result == mock_result
@@ -0,0 +1,123 @@
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+import zipfile
+from unittest.mock import MagicMock, patch
+
+from backend.manifest.create_manifest import create_manifest, update_manifest, read_manifest_version, build_dict, build_in_pool, decode_table
+
+def manifest_info(version: str) -> dict:
+    return {"version": version, "mobileWorldContentPaths": {"en": f"/common/destiny2_content/sqlite/en/world_sql_content_{version}.content"}}
+
+class CreateManifestTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+        zip_bytes = io.BytesIO()
+        with zipfile.ZipFile(zip_bytes, "w") as zip:
+            zip.writestr("world_sql_content_abc.content", b"sqlite bytes")
+        self.zip_bytes = zip_bytes.getvalue()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def mock_download(self, mock_get):
+        download = MagicMock()
+        download.__enter__.return_value = download
+        download.iter_content.return_value = [self.zip_bytes[:10], self.zip_bytes[10:]]
+        mock_get.return_value = download
+        return download
+
+    @patch("backend.manifest.create_manifest.requests.get")
+    def test_create_manifest_streams_and_extracts(self, mock_get):
+        download = self.mock_download(mock_get)
+        open(f"{self.tmp_dir.name}/DestinyClassDefinition.pickle", "w").close()
+
+        create_manifest(self.tmp_dir.name, "key", manifest_info("1.0"))
+
+        mock_get.assert_called_once_with("http://www.bungie.net/common/destiny2_content/sqlite/en/world_sql_content_1.0.content", stream=True)
+        download.iter_content.assert_called_once()
+        with open(f"{self.tmp_dir.name}/Manifest.content", "rb") as content:
+            assert content.read() == b"sqlite bytes"
+
+        # only the destination files are left behind, stale tables are removed
+        assert sorted(os.listdir(self.tmp_dir.name)) == ["MANZIP", "Manifest.content", "manifest.version"]
+        assert read_manifest_version(self.tmp_dir.name) == "1.0"
+
+    @patch("backend.manifest.create_manifest.create_manifest")
+    @patch("backend.manifest.create_manifest.get_manifest_info")
+    def test_update_manifest_same_version(self, mock_info, mock_create_manifest):
+        mock_info.return_value = manifest_info("1.0")
+        open(f"{self.tmp_dir.name}/Manifest.content", "w").close()
+        with open(f"{self.tmp_dir.name}/manifest.version", "w") as version_file:
+            json.dump({"version": "1.0"}, version_file)
+
+        assert update_manifest(self.tmp_dir.name, "key") is False
+        mock_create_manifest.assert_not_called()
+
+    @patch("backend.manifest.create_manifest.create_manifest")
+    @patch("backend.manifest.create_manifest.get_manifest_info")
+    def test_update_manifest_new_version(self, mock_info, mock_create_manifest):
+        mock_info.return_value = manifest_info("2.0")
+        open(f"{self.tmp_dir.name}/Manifest.content", "w").close()
+        with open(f"{self.tmp_dir.name}/manifest.version", "w") as version_file:
+            json.dump({"version": "1.0"}, version_file)
+
+        assert update_manifest(self.tmp_dir.name, "key") is True
+        mock_create_manifest.assert_called_once_with(self.tmp_dir.name, "key", manifest_info("2.0"))
+
+    @patch("backend.manifest.create_manifest.create_manifest")
+    @patch("backend.manifest.create_manifest.get_manifest_info")
+    def test_update_manifest_missing_content(self, mock_info, mock_create_manifest):
+        mock_info.return_value = manifest_info("1.0")
+
+        assert read_manifest_version(self.tmp_dir.name) is None
+        assert update_manifest(self.tmp_dir.name, "key") is True
+        mock_create_manifest.assert_called_once()
+
+class BuildDictTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+        con = sqlite3.connect(f"{self.tmp_dir.name}/Manifest.content")
+        con.execute("CREATE TABLE DestinyClassDefinition (id INTEGER PRIMARY KEY NOT NULL, json BLOB)")
+        con.execute("CREATE TABLE DestinyHistoricalStatsDefinition (key TEXT PRIMARY KEY NOT NULL, json BLOB)")
+        for class_hash, name in [(1, "Hunter"), (2, "Titan"), (3, "Warlock")]:
+            con.execute("INSERT INTO DestinyClassDefinition VALUES(?, ?)", (class_hash, json.dumps({"hash": class_hash, "name": name})))
+        con.execute("INSERT INTO DestinyHistoricalStatsDefinition VALUES(?, ?)", ("kills", json.dumps({"statId": "kills"})))
+        con.commit()
+        con.close()
+
+        self.hash_dict = {"DestinyClassDefinition": "hash", "DestinyHistoricalStatsDefinition": "statId"}
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_build_dict_parallel_matches_serial(self):
+        parallel = build_dict(self.hash_dict, self.tmp_dir.name, max_workers=2)
+        serial = build_dict(self.hash_dict, self.tmp_dir.name, max_workers=1)
+
+        assert parallel == serial
+        assert parallel["DestinyClassDefinition"][2] == {"hash": 2, "name": "Titan"}
+        assert parallel["DestinyHistoricalStatsDefinition"] == {"kills": {"statId": "kills"}}
+
+    @patch("backend.manifest.create_manifest.ProcessPoolExecutor")
+    def test_build_dict_single_table_in_process(self, mock_pool):
+        all_data = build_dict({"DestinyClassDefinition": "hash"}, self.tmp_dir.name)
+
+        mock_pool.assert_not_called()
+        assert len(all_data["DestinyClassDefinition"]) == 3
+
+    def test_build_in_pool_reports_rows(self):
+        jobs = {table_name: (table_name, hash, self.tmp_dir.name) for table_name, hash in self.hash_dict.items()}
+
+        with patch("builtins.print") as mock_print:
+            results = build_in_pool(decode_table, jobs, max_workers=2)
+
+        printed = " ".join(str(call.args[0]) for call in mock_print.call_args_list)
+        assert set(results) == set(self.hash_dict)
+        assert "Built DestinyClassDefinition: 3 rows" in printed
+        assert "Built 2 tables" in printed
@@ -0,0 +1,97 @@
+import os
+import pickle
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from backend.manifest.destiny_manifest import DestinyManifest, LazyManifestData
+
+class DestinyManifestTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tables = {
+            "DestinyInventoryItemDefinition": {1363886209: {"displayProperties": {"name": "Gjallarhorn"}}},
+            "DestinyClassDefinition": {1: {"displayProperties": {"name": "Hunter"}}}
+        }
+        for table_name, table in self.tables.items():
+            with open(f"{self.tmp_dir.name}/{table_name}.pickle", "wb") as data:
+                pickle.dump(table, data)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_manifest_init_loads_nothing(self):
+        with patch.dict(os.environ, {"PATH_TO_MANIFEST": self.tmp_dir.name}):
+            manifest = DestinyManifest()
+
+        assert isinstance(manifest.all_data, LazyManifestData)
+        assert manifest.all_data.loaded_tables == []
+        assert len(manifest.all_data) == len(manifest.hashes)
+
+    def test_manifest_loads_table_on_first_access(self):
+        with patch.dict(os.environ, {"PATH_TO_MANIFEST": self.tmp_dir.name}):
+            manifest = DestinyManifest()
+
+        item = manifest.all_data["DestinyInventoryItemDefinition"][1363886209]
+        assert item["displayProperties"]["name"] == "Gjallarhorn"
+        assert manifest.all_data.loaded_tables == ["DestinyInventoryItemDefinition"]
+
+        stats = manifest.load_stats["DestinyInventoryItemDefinition"]
+        assert stats["rows"] == 1
+        assert stats["seconds"] >= 0
+        assert "rss_bytes" in stats
+
+        # a second read is served from memory
+        with patch("backend.manifest.serializers.pickle.load") as mock_load:
+            manifest.all_data["DestinyInventoryItemDefinition"]
+            mock_load.assert_not_called()
+
+    def test_manifest_unknown_table(self):
+        with patch.dict(os.environ, {"PATH_TO_MANIFEST": self.tmp_dir.name}):
+            manifest = DestinyManifest()
+
+        with self.assertRaises(KeyError):
+            manifest.all_data["NotADefinition"]
+
+    @patch("backend.manifest.destiny_manifest.build_dict")
+    @patch("backend.manifest.destiny_manifest.create_manifest")
+    def test_manifest_builds_missing_table_only(self, mock_create_manifest, mock_build_dict):
+        open(f"{self.tmp_dir.name}/Manifest.content", "w").close()
+        mock_build_dict.return_value = {"DestinyActivityDefinition": {3782: {"displayProperties": {"name": "Activity Name"}}}}
+
+        with patch.dict(os.environ, {"PATH_TO_MANIFEST": self.tmp_dir.name}):
+            manifest = DestinyManifest()
+
+        activity = manifest.all_data["DestinyActivityDefinition"][3782]
+
+        mock_create_manifest.assert_not_called()
+        mock_build_dict.assert_called_once_with({"DestinyActivityDefinition": "hash"}, self.tmp_dir.name)
+        assert activity["displayProperties"]["name"] == "Activity Name"
+        assert os.path.isfile(f"{self.tmp_dir.name}/DestinyActivityDefinition.pickle")
+        assert not [name for name in os.listdir(self.tmp_dir.name) if name.endswith(".tmp")]
+
+    @patch("backend.manifest.destiny_manifest.build_in_pool")
+    @patch("backend.manifest.destiny_manifest.update_manifest")
+    def test_manifest_define_data_mmap_builds_missing_tables_only(self, mock_update_manifest, mock_build_in_pool):
+        open(f"{self.tmp_dir.name}/DestinyInventoryItemDefinition.mmap", "w").close()
+
+        with patch.dict(os.environ, {"PATH_TO_MANIFEST": self.tmp_dir.name}):
+            manifest = DestinyManifest("mmap")
+            manifest.define_manifest_data()
+
+        jobs = mock_build_in_pool.call_args[0][1]
+        assert "DestinyInventoryItemDefinition" not in jobs
+        assert "DestinyHistoricalStatsDefinition" not in jobs
+        assert jobs["DestinyClassDefinition"] == ("DestinyClassDefinition", self.tmp_dir.name)
+
+    @patch("backend.manifest.destiny_manifest.build_projected_manifest")
+    @patch("backend.manifest.destiny_manifest.update_manifest")
+    def test_manifest_define_data_projected_built_once(self, mock_update_manifest, mock_build_projected_manifest):
+        with patch.dict(os.environ, {"PATH_TO_MANIFEST": self.tmp_dir.name}):
+            manifest = DestinyManifest("projected")
+            manifest.define_manifest_data()
+            mock_build_projected_manifest.assert_called_once_with(self.tmp_dir.name, None)
+
+            open(f"{self.tmp_dir.name}/manifest.projected.pickle", "w").close()
+            manifest.define_manifest_data()
+            mock_build_projected_manifest.assert_called_once()
@@ -0,0 +1,78 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from backend.manifest.destiny_manifest import DestinyManifest
+from backend.manifest.mmap_manifest import MMapManifestData, MMapManifestTable, build_table_mmap
+from backend.manifest.create_manifest import unsigned_to_signed
+
+class MMapManifestTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.item_hashes = [3236055282, 1363886209, 1, 2 ** 31]
+
+        con = sqlite3.connect(f"{self.tmp_dir.name}/Manifest.content")
+        con.execute("CREATE TABLE DestinyInventoryItemDefinition (id INTEGER PRIMARY KEY NOT NULL, json BLOB)")
+        for item_hash in self.item_hashes:
+            item = {"hash": item_hash, "displayProperties": {"name": f"Item {item_hash}"}}
+            con.execute("INSERT INTO DestinyInventoryItemDefinition VALUES(?, ?)", (unsigned_to_signed(item_hash), json.dumps(item)))
+        con.commit()
+        con.close()
+
+        hashes = {"DestinyInventoryItemDefinition": "hash", "DestinyHistoricalStatsDefinition": "statId"}
+        self.manifest_data = MMapManifestData(self.tmp_dir.name, hashes, cache_size=2)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_mmap_manifest_point_lookup(self):
+        items = self.manifest_data["DestinyInventoryItemDefinition"]
+
+        for item_hash in self.item_hashes:
+            assert items[item_hash] == {"hash": item_hash, "displayProperties": {"name": f"Item {item_hash}"}}
+
+        with self.assertRaises(KeyError):
+            items[1234]
+        assert os.path.isfile(f"{self.tmp_dir.name}/DestinyInventoryItemDefinition.mmap")
+
+    def test_mmap_manifest_sorted_index(self):
+        items = self.manifest_data["DestinyInventoryItemDefinition"]
+
+        assert len(items) == len(self.item_hashes)
+        assert list(items) == sorted(self.item_hashes)
+
+    def test_mmap_manifest_hash_tables_only(self):
+        assert list(self.manifest_data) == ["DestinyInventoryItemDefinition"]
+        with self.assertRaises(KeyError):
+            self.manifest_data["DestinyHistoricalStatsDefinition"]
+
+    def test_mmap_manifest_decodes_each_definition_once(self):
+        items = self.manifest_data["DestinyInventoryItemDefinition"]
+
+        with patch("backend.manifest.mmap_manifest.json.loads", wraps=json.loads) as mock_loads:
+            items[1]
+            items[1]
+            assert mock_loads.call_count == 1
+
+        stats = self.manifest_data.load_stats["DestinyInventoryItemDefinition"]
+        assert stats["rows"] == len(self.item_hashes)
+        assert stats["hits"] == 1
+
+    def test_mmap_manifest_rejects_other_files(self):
+        bad_path = f"{self.tmp_dir.name}/bad.mmap"
+        with open(bad_path, "wb") as data:
+            data.write(b"\0" * 64)
+
+        with self.assertRaises(ValueError):
+            MMapManifestTable(bad_path, 1)
+
+    def test_destiny_manifest_mmap_backend(self):
+        with patch.dict(os.environ, {"PATH_TO_MANIFEST": self.tmp_dir.name}):
+            manifest = DestinyManifest("mmap")
+        build_table_mmap("DestinyInventoryItemDefinition", self.tmp_dir.name)
+
+        assert isinstance(manifest.all_data, MMapManifestData)
+        assert manifest.all_data["DestinyInventoryItemDefinition"][3236055282]["hash"] == 3236055282
@@ -0,0 +1,92 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from backend.data.bng_data import WeaponData
+from backend.manifest.destiny_manifest import DestinyManifest
+from backend.manifest.projected_manifest import ProjectedManifestData, PROJECTIONS, PROJECTED_FILE
+from backend.manifest.create_manifest import unsigned_to_signed
+
+class ProjectedManifestTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.riptide_hash = 3236055282
+        self.activity_hash = 2693136600
+        self.riptide = {
+            "hash": self.riptide_hash,
+            "displayProperties": {"name": "Riptide", "description": "unused", "icon": "/riptide.jpg"},
+            "flavorText": "unused",
+            "itemTypeDisplayName": "Fusion Rifle",
+            "itemTypeAndTierDisplayName": "Legendary Fusion Rifle",
+            "equippingBlock": {"ammoType": 2, "equipmentSlotTypeHash": 2465295065, "uniqueLabelHash": 0},
+            "damageTypes": [4],
+            "stats": {"stats": {"2961396640": {"statHash": 2961396640, "value": 500}, "155624089": {"value": 10}}}
+        }
+        self.activity = {
+            "hash": self.activity_hash,
+            "displayProperties": {"name": "Deep Stone Crypt"},
+            "matchmaking": {"maxPlayers": 6, "isMatchmade": False},
+            "activityTypeHash": 2043403989,
+            "modifiers": [{"activityModifierHash": 1783825372}, {"activityModifierHash": 4226469317}],
+            "rewards": [{"rewardItems": []}]
+        }
+
+        con = sqlite3.connect(f"{self.tmp_dir.name}/Manifest.content")
+        for table_name in PROJECTIONS:
+            con.execute(f"CREATE TABLE {table_name} (id INTEGER PRIMARY KEY NOT NULL, json BLOB)")
+        for table_name, definition in [("DestinyInventoryItemDefinition", self.riptide), ("DestinyActivityDefinition", self.activity)]:
+            con.execute(f"INSERT INTO {table_name} VALUES(?, ?)", (unsigned_to_signed(definition["hash"]), json.dumps(definition)))
+        con.execute("INSERT INTO DestinyInventoryItemDefinition VALUES(?, ?)", (1, json.dumps({"hash": 1})))
+        con.commit()
+        con.close()
+
+        self.manifest_data = ProjectedManifestData(self.tmp_dir.name)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_projected_manifest_keeps_used_fields(self):
+        riptide = self.manifest_data["DestinyInventoryItemDefinition"][self.riptide_hash]
+
+        assert riptide["displayProperties"] == {"name": "Riptide"}
+        assert riptide["itemTypeDisplayName"] == "Fusion Rifle"
+        assert riptide["equippingBlock"] == {"ammoType": 2, "equipmentSlotTypeHash": 2465295065}
+        assert riptide["damageTypes"] == [4]
+        assert riptide["stats"] == {"stats": {"2961396640": {"value": 500}}}
+        assert "flavorText" not in riptide
+        assert os.path.isfile(f"{self.tmp_dir.name}/{PROJECTED_FILE}")
+        assert not [name for name in os.listdir(self.tmp_dir.name) if name.endswith(".tmp")]
+
+    def test_projected_manifest_lists_of_records(self):
+        activity = self.manifest_data["DestinyActivityDefinition"][self.activity_hash]
+
+        assert activity["modifiers"] == [{"activityModifierHash": 1783825372}, {"activityModifierHash": 4226469317}]
+        assert activity["matchmaking"] == {"maxPlayers": 6}
+        assert "rewards" not in activity
+
+    def test_projected_manifest_lookup(self):
+        items = self.manifest_data["DestinyInventoryItemDefinition"]
+
+        assert sorted(items) == [1, self.riptide_hash]
+        assert items[1] == {"hash": 1}
+        with self.assertRaises(KeyError):
+            items[1234]
+        with self.assertRaises(KeyError):
+            self.manifest_data["DestinyRaceDefinition"]
+
+    def test_projected_manifest_matches_full_definitions(self):
+        with patch.dict(os.environ, {"PATH_TO_MANIFEST": self.tmp_dir.name}):
+            manifest = DestinyManifest("projected")
+        full_manifest = MagicMock()
+        full_manifest.all_data = {"DestinyInventoryItemDefinition": {self.riptide_hash: self.riptide}}
+
+        projected = WeaponData(MagicMock(), self.riptide_hash, manifest)
+        full = WeaponData(MagicMock(), self.riptide_hash, full_manifest)
+        projected.define_data()
+        full.define_data()
+
+        assert isinstance(manifest.all_data, ProjectedManifestData)
+        assert projected.data and projected.data == full.data
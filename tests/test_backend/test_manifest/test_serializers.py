@@ -0,0 +1,47 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from backend.manifest.destiny_manifest import DestinyManifest
+from backend.manifest.serializers import SERIALIZERS, get_serializer
+
+class SerializersTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.table = {
+            3236055282: {"hash": 3236055282, "displayProperties": {"name": "Riptide"}, "damageTypes": [4], "redacted": False},
+            1: {"hash": 1, "displayProperties": {"name": "Hunter"}, "equippingBlock": None}
+        }
+
+    def test_serializers_round_trip(self):
+        for serializer in SERIALIZERS.values():
+            if serializer.available is False:
+                continue
+
+            data = io.BytesIO()
+            serializer.dump(self.table, data)
+            data.seek(0)
+
+            assert serializer.load(data) == self.table, serializer.name
+
+    def test_get_serializer_unknown_format(self):
+        with self.assertRaises(ValueError):
+            get_serializer("json")
+
+    def test_get_serializer_missing_library(self):
+        with patch("backend.manifest.serializers.msgpack", None):
+            with self.assertRaises(ValueError):
+                get_serializer("msgpack")
+
+    @patch("backend.manifest.destiny_manifest.build_dict")
+    def test_destiny_manifest_format(self, mock_build_dict):
+        mock_build_dict.return_value = {"DestinyClassDefinition": self.table}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            open(f"{tmp_dir}/Manifest.content", "w").close()
+            with patch.dict(os.environ, {"PATH_TO_MANIFEST": tmp_dir}):
+                manifest = DestinyManifest(format="marshal")
+
+            assert manifest.all_data["DestinyClassDefinition"][1]["displayProperties"]["name"] == "Hunter"
+            assert os.path.isfile(f"{tmp_dir}/DestinyClassDefinition.marshal")
@@ -0,0 +1,72 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from backend.manifest.destiny_manifest import DestinyManifest
+from backend.manifest.sqlite_manifest import SQLiteManifestData
+from backend.manifest.create_manifest import unsigned_to_signed
+
+class SQLiteManifestTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.riptide_hash = 3236055282  # larger than a signed 32-bit integer
+        self.ghorn_hash = 1363886209
+
+        con = sqlite3.connect(f"{self.tmp_dir.name}/Manifest.content")
+        con.execute("CREATE TABLE DestinyInventoryItemDefinition (id INTEGER PRIMARY KEY NOT NULL, json BLOB)")
+        con.execute("CREATE TABLE DestinyHistoricalStatsDefinition (key TEXT PRIMARY KEY NOT NULL, json BLOB)")
+        for item_hash, name in [(self.riptide_hash, "Riptide"), (self.ghorn_hash, "Gjallarhorn")]:
+            item = {"hash": item_hash, "displayProperties": {"name": name}}
+            con.execute("INSERT INTO DestinyInventoryItemDefinition VALUES(?, ?)", (unsigned_to_signed(item_hash), json.dumps(item)))
+        con.execute("INSERT INTO DestinyHistoricalStatsDefinition VALUES(?, ?)", ("kills", json.dumps({"statId": "kills"})))
+        con.commit()
+        con.close()
+
+        hashes = {"DestinyInventoryItemDefinition": "hash", "DestinyHistoricalStatsDefinition": "statId"}
+        self.manifest_data = SQLiteManifestData(self.tmp_dir.name, hashes, cache_size=1)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_sqlite_manifest_point_lookup(self):
+        items = self.manifest_data["DestinyInventoryItemDefinition"]
+
+        assert items[self.riptide_hash]["displayProperties"]["name"] == "Riptide"
+        assert items[self.ghorn_hash]["displayProperties"]["name"] == "Gjallarhorn"
+        assert self.manifest_data["DestinyHistoricalStatsDefinition"]["kills"] == {"statId": "kills"}
+
+        with self.assertRaises(KeyError):
+            items[1234]
+
+    def test_sqlite_manifest_iterates_unsigned_hashes(self):
+        items = self.manifest_data["DestinyInventoryItemDefinition"]
+
+        assert len(items) == 2
+        assert sorted(items) == sorted([self.riptide_hash, self.ghorn_hash])
+
+    def test_sqlite_manifest_bounded_cache(self):
+        items = self.manifest_data["DestinyInventoryItemDefinition"]
+
+        items[self.riptide_hash]
+        items[self.riptide_hash]
+        items[self.ghorn_hash]
+
+        stats = self.manifest_data.load_stats["DestinyInventoryItemDefinition"]
+        assert stats["size"] == 1
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+
+    def test_destiny_manifest_sqlite_backend(self):
+        with patch.dict(os.environ, {"PATH_TO_MANIFEST": self.tmp_dir.name}):
+            manifest = DestinyManifest("sqlite")
+
+        assert isinstance(manifest.all_data, SQLiteManifestData)
+        assert manifest.all_data["DestinyInventoryItemDefinition"][self.riptide_hash]["hash"] == self.riptide_hash
+
+    def test_unsigned_to_signed(self):
+        assert unsigned_to_signed(2 ** 31 - 1) == 2 ** 31 - 1
+        assert unsigned_to_signed(2 ** 31) == -(2 ** 31)
+        assert unsigned_to_signed(self.riptide_hash) == self.riptide_hash - 2 ** 32
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import unittest
+
+from backend.workers import BoundedExecutor
+
+class BoundedExecutorTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.pool = BoundedExecutor("test", 1, 1)
+        self.release = threading.Event()
+
+    async def asyncTearDown(self) -> None:
+        self.release.set()
+        self.pool.shutdown()
+
+    async def test_bounded_executor_runs_off_loop(self):
+        result = await self.pool.run(lambda a, b=0: (threading.current_thread().name, a + b), 1, b=2)
+
+        assert result[0].startswith("test")
+        assert result[1] == 3
+        assert self.pool.stats["completed"] == 1
+        assert self.pool.stats["active"] == 0
+
+    async def test_bounded_executor_rejects_when_saturated(self):
+        running = asyncio.ensure_future(self.pool.run(self.release.wait))
+        queued = asyncio.ensure_future(self.pool.run(self.release.wait))
+        await asyncio.sleep(0.05)
+
+        stats = self.pool.stats
+        assert stats["active"] == 1
+        assert stats["queued"] == 1
+        assert stats["saturation"] == 1.0
+        with self.assertRaises(TimeoutError):
+            await self.pool.run(self.release.wait)
+        assert self.pool.stats["rejected"] == 1
+
+        self.release.set()
+        await asyncio.gather(running, queued)
+        assert self.pool.stats["completed"] == 2
+        assert self.pool.stats["saturation"] == 0.0
+
+    async def test_bounded_executor_counts_failures(self):
+        with self.assertRaises(ValueError):
+            await self.pool.run(int, "not a number")
+
+        assert self.pool.stats["failed"] == 1
+        assert self.pool.stats["completed"] == 1
+
+    async def test_bounded_executor_cancelled_call_holds_slot_until_done(self):
+        running = asyncio.ensure_future(self.pool.run(self.release.wait))
+        queued = asyncio.ensure_future(self.pool.run(self.release.wait))
+        await asyncio.sleep(0.05)
+
+        running.cancel()
+        queued.cancel()
+        await asyncio.sleep(0.05)
+
+        # the queued call never reached a worker and is gone, the running one keeps its worker until it returns
+        stats = self.pool.stats
+        assert stats["active"] == 1
+        assert stats["queued"] == 0
+        assert stats["saturation"] == 0.5
+
+        self.release.set()
+        await asyncio.sleep(0.05)
+        assert self.pool.stats["saturation"] == 0.0
+        assert self.pool.stats["completed"] == 1